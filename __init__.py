@@ -29,5 +29,11 @@ def classFactory(iface):  # pylint: disable=invalid-name
     :param iface: A QGIS interface instance.
     :type iface: QgsInterface
     """
-    from .main import Giswater
+    from . import global_vars
+    from .core.utils.startup_profiler import GwStartupProfiler
+
+    # Record the import time of the plugin modules if option 'startup_profiler' of giswater.config is enabled
+    global_vars.startup_profiler = GwStartupProfiler.from_config(os.path.join(plugin_path, 'config', 'giswater.config'))
+    with global_vars.startup_profiler.record_imports(__name__):
+        from .main import Giswater
     return Giswater(iface)
@@ -2037,7 +2037,7 @@ class GwAdminButton:
             self.task1.setProgress(0)
 
             # Insert inp values into database
-            self._insert_inp_into_db(self.file_inp)
+            self._insert_inp_into_db(self.file_inp, project_name)
 
             # Get the debugMode. If it's None it will be False
             debug_mode = tools_gw.get_config_parser('system', 'import_inp_debug_mode', "user", "init", force_reload=True) or False
@@ -2850,8 +2850,8 @@ class GwAdminButton:
         self.folder_software = os.path.join(self.sql_dir, self.project_type_selected)
 
 
-    def _insert_inp_into_db(self, folder_path=None):
-        """"""
+    def _insert_inp_into_db(self, folder_path=None, schema_name=None):
+        """ Load the rows of the inp file into table temp_csv of the schema @schema_name being created """
 
         # Convert any file codec to utf-8
         BLOCKSIZE = 1048576  # This is the number of bytes that will be read at a time (for handling big files)
@@ -2874,102 +2874,91 @@ class GwAdminButton:
         except UnicodeEncodeError:
             tools_qgis.show_warning('Encode error reading inp file')
 
-        # Read the file
-        _file = open(folder_path, "r+", encoding='utf8')
-        full_file = _file.readlines()
-        sql = ""
-        progress = 0
-        target = ""
-        for row in full_file:
-            progress += 1
-            row = row.rstrip()
-            if len(row) == 0:
-                continue
-            if str(row[0]) == "[":
-                target = str(row)
-            if target in ('[TRANSECTS]', '[CONTROLS]', '[RULES]'):
-                sp_n = [row]
-            elif target in ('[EVAPORATION]', '[TEMPERATURE]'):
-                sp_n = re.split(' |\t', row, 1)
-            else:
-                if str(row[0]) != ';':
-                    list_aux = row.split("\t")
-                    dirty_list = []
-                    for x in range(0, len(list_aux)):
-                        # If text in between double-quotes, put all the text in a single column (if tab-separated)
-                        if str(list_aux[x]).startswith('"') and str(list_aux[x]).endswith('"'):
-                            dirty_list.append(list_aux[x].strip('"'))
-                            continue
-
-                        aux = list_aux[x].split(" ")
-                        str_aux = ""
-                        for i in range(len(aux)):
-                            # If the text starts with `;` it means it's the annotation for that line, so we put all
-                            # the annotation text in a single string to then insert it to csv39
-                            if str(aux[i]).startswith(';'):
-                                final_col = ' '.join(aux[i:])
-                                dirty_list.append(final_col)
-                                break
-                            # If text is between double-quotes, insert it without the quotes
-                            #     This includes "xxxx" and ""
-                            if str(aux[i]).startswith('"') and str(aux[i]).endswith('"'):
-                                if aux[i] == '""':
-                                    aux[i] = '\n'
-                                dirty_list.append(aux[i].strip('"'))
-                                continue
-
-                            # If text starts with '"', initialize str_aux variable
-                            #     This will insert "xxx yy" as a single string
-                            if str(aux[i]).startswith('"'):
-                                str_aux = str(aux[i])
-                                continue
-                            if str_aux:
-                                str_aux = f'{str_aux} {str(aux[i])}'
-                                if str(aux[i]).endswith('"'):
-                                    dirty_list.append(str_aux.strip('"'))
-                                    str_aux = ""
+        # Load the parsed rows into temp_csv with COPY. Without @schema_name the table is found through the search_path
+        # TODO:: Use dev_commit or dev_user?
+        total = tools_gw.copy_rows('temp_csv', self._iter_inp_rows(folder_path), schema_name=schema_name or '',
+                                   commit=self.dev_commit)
+        if total is None:
+            tools_qgis.show_warning("Error loading inp file into temp_csv", parameter=folder_path)
+
+
+    def _iter_inp_rows(self, folder_path):
+        """ Read the inp file line by line and yield its rows as dicts {temp_csv column: value} """
+
+        with open(folder_path, "r", encoding='utf8') as _file:
+            target = ""
+            for row in _file:
+                row = row.rstrip()
+                if len(row) == 0:
+                    continue
+                if str(row[0]) == "[":
+                    target = str(row)
+                if target in ('[TRANSECTS]', '[CONTROLS]', '[RULES]'):
+                    sp_n = [row]
+                elif target in ('[EVAPORATION]', '[TEMPERATURE]'):
+                    sp_n = re.split(' |\t', row, 1)
+                else:
+                    if str(row[0]) != ';':
+                        list_aux = row.split("\t")
+                        dirty_list = []
+                        for x in range(0, len(list_aux)):
+                            # If text in between double-quotes, put all the text in a single column (if tab-separated)
+                            if str(list_aux[x]).startswith('"') and str(list_aux[x]).endswith('"'):
+                                dirty_list.append(list_aux[x].strip('"'))
                                 continue
 
-                            # Text without quotes is inserted as-is
-                            dirty_list.append(aux[i])
-                else:
-                    dirty_list = [row]
-
-                for x in range(len(dirty_list) - 1, -1, -1):
-                    if dirty_list[x] == '' or "**" in dirty_list[x] or "--" in dirty_list[x] or dirty_list[x] == '; '\
-                            or dirty_list[x] == ';' or dirty_list[x] == ';\n':
-                        dirty_list.pop(x)
-                sp_n = dirty_list
-
-            if len(sp_n) > 0:
-                sql += "INSERT INTO temp_csv (fid, source, "
-                values = "VALUES(239, $$" + target + "$$, "
-                for x in range(0, len(sp_n)):
-                    csv_col = str(x + 1)
-                    if sp_n[x] != "''":
-                        if sp_n[x].strip().replace("\n", "").startswith(';') and x == len(sp_n)-1:
-                            csv_col = "39"
-                        sql += "csv" + csv_col + ", "
-                        value = "$$" + sp_n[x].strip().replace("\n", "") + "$$, "
-                        values += value.replace("$$$$", "null")
+                            aux = list_aux[x].split(" ")
+                            str_aux = ""
+                            for i in range(len(aux)):
+                                # If the text starts with `;` it means it's the annotation for that line, so we put all
+                                # the annotation text in a single string to then insert it to csv39
+                                if str(aux[i]).startswith(';'):
+                                    final_col = ' '.join(aux[i:])
+                                    dirty_list.append(final_col)
+                                    break
+                                # If text is between double-quotes, insert it without the quotes
+                                #     This includes "xxxx" and ""
+                                if str(aux[i]).startswith('"') and str(aux[i]).endswith('"'):
+                                    if aux[i] == '""':
+                                        aux[i] = '\n'
+                                    dirty_list.append(aux[i].strip('"'))
+                                    continue
+
+                                # If text starts with '"', initialize str_aux variable
+                                #     This will insert "xxx yy" as a single string
+                                if str(aux[i]).startswith('"'):
+                                    str_aux = str(aux[i])
+                                    continue
+                                if str_aux:
+                                    str_aux = f'{str_aux} {str(aux[i])}'
+                                    if str(aux[i]).endswith('"'):
+                                        dirty_list.append(str_aux.strip('"'))
+                                        str_aux = ""
+                                    continue
+
+                                # Text without quotes is inserted as-is
+                                dirty_list.append(aux[i])
                     else:
-                        sql += "csv" + csv_col + ", "
-                        values = "VALUES(null, "
-                sql = sql[:-2] + ") "
-                values = values[:-2] + ");\n"
-                sql += values
-
-            if progress % 500 == 0:
-                # TODO:: Use dev_commit or dev_user?
-                tools_db.execute_sql(sql, commit=self.dev_commit)
-                sql = ""
-
-        if sql != "":
-            # TODO:: Use dev_commit or dev_user?
-            tools_db.execute_sql(sql, commit=self.dev_commit)
-
-        _file.close()
-        del _file
+                        dirty_list = [row]
+
+                    for x in range(len(dirty_list) - 1, -1, -1):
+                        if dirty_list[x] == '' or "**" in dirty_list[x] or "--" in dirty_list[x] or dirty_list[x] == '; '\
+                                or dirty_list[x] == ';' or dirty_list[x] == ';\n':
+                            dirty_list.pop(x)
+                    sp_n = dirty_list
+
+                if len(sp_n) > 0:
+                    csv_row = {"fid": 239, "source": target}
+                    for x in range(0, len(sp_n)):
+                        csv_col = str(x + 1)
+                        value = sp_n[x].strip().replace("\n", "")
+                        if sp_n[x] != "''":
+                            if value.startswith(';') and x == len(sp_n)-1:
+                                csv_col = "39"
+                            csv_row[f"csv{csv_col}"] = value if value != "" else None
+                        else:
+                            csv_row[f"csv{csv_col}"] = None
+                    yield csv_row
 
 
     def _select_file_inp(self):
@@ -15,6 +15,7 @@ from qgis.PyQt.QtWidgets import QToolBar, QActionGroup, QDockWidget, QLabel, QAp
 from .models.plugin_toolbar import GwPluginToolbar
 from .toolbars import buttons
 from .utils import tools_gw
+from .utils.step_timer import GwStepTimer
 from .threads.project_layers_config import GwProjectLayersConfig
 from .threads.project_check import GwProjectCheckTask
 from .. import global_vars
@@ -31,14 +32,19 @@ class GwLoadProject(QObject):
         self.plugin_toolbars = {}
         self.buttons_to_hide = []
         self.buttons = {}
+        self.project_info = None
+        self.startup_timer = None
 
 
     def project_read(self, show_warning=True, main=None):
         """ Function executed when a user opens a QGIS project (*.qgs) """
 
         global_vars.project_loaded = False
+        global_vars.checked_functions = set()
+        global_vars.user_roles = None
         if show_warning:
             tools_log.log_info("Project read started")
+        self.startup_timer = GwStepTimer("Project read")
 
         self._get_user_variables()
         # Get variables from qgis project
@@ -51,6 +57,7 @@ class GwLoadProject(QObject):
         # Force commit before opening project and set new database connection
         if not self._check_database_connection(show_warning):
             return
+        self.startup_timer.lap("Check project and connection")
 
         # Get SRID from table node
         lib_vars.data_epsg = tools_db.get_srid('v_edit_node', lib_vars.schema_name)
@@ -65,10 +72,12 @@ class GwLoadProject(QObject):
         # Set PostgreSQL parameter 'search_path'
         tools_db.set_search_path(layer_source['schema'])
 
-        # Get water software from table 'sys_version'
-        global_vars.project_type = tools_gw.get_project_type()
+        # Get water software and version from table 'sys_version' (in the same query)
+        self.project_info = tools_gw.get_project_info()
+        global_vars.project_type = self.project_info['project_type'] if self.project_info else None
         if global_vars.project_type is None:
             return
+        self.startup_timer.lap("Get SRID, user and project info")
 
         # Check if loaded project is ud or ws
         if not self._check_project_type():
@@ -92,7 +101,7 @@ class GwLoadProject(QObject):
         # Manage locale and corresponding 'i18n' file
         lib_vars.plugin_name = tools_qgis.get_plugin_metadata('name', 'giswater', lib_vars.plugin_dir)
         tools_qt.manage_translation(lib_vars.plugin_name)
-
+        self.startup_timer.lap("Get role and user config files")
 
         # Check if schema exists
         schema_exists = tools_db.check_schema(lib_vars.schema_name)
@@ -120,20 +129,33 @@ class GwLoadProject(QObject):
         except AttributeError:
             pass
 
-        # Get feature cat
-        global_vars.feature_cat = tools_gw.manage_feature_cat()
+        # Read catalog tables (sys_style, sys_table, cat_feature) once for the whole session
+        tools_gw.reset_metadata_cache(warm=True)
+        tools_gw.reset_network_graph()
+        self.startup_timer.lap("Read catalog tables")
+
+        # Get feature cat and mapzones styles in the same round trip, they don't depend on each other.
+        # If one of them fails, they are requested again one by one so that feature cat is still loaded
+        extras = f'"mapzones":""'
+        calls = [('gw_fct_getcatfeaturevalues', tools_gw.create_body()),
+                 ('gw_fct_getstylemapzones', tools_gw.create_body(extras=extras))]
+        feature_cat_result, mapzones_result = tools_gw.execute_procedures(calls, retry_single=True)
+        global_vars.feature_cat = tools_gw.manage_feature_cat(feature_cat_result)
+        self.startup_timer.lap("Get feature cat and mapzones")
 
         # Create menu
         tools_gw.create_giswater_menu(True)
 
         # Manage actions of the different plugin_toolbars
         self._manage_toolbars()
+        self.startup_timer.lap("Create menu and toolbars")
 
         # Manage "btn_updateall" from attribute table
         self._manage_attribute_table()
 
         # call dynamic mapzones repaint
-        tools_gw.set_style_mapzones()
+        if mapzones_result is not None:
+            tools_gw.set_style_mapzones(mapzones_result)
 
         # Check roles of this user to show or hide toolbars
         self._check_user_roles()
@@ -155,9 +177,11 @@ class GwLoadProject(QObject):
         # Set indexing strategy for snapping so that it uses less memory if possible
         self.iface.mapCanvas().snappingUtils().setIndexingStrategy(QgsSnappingUtils.IndexHybrid)
 
+        self.startup_timer.lap("Set mapzones, roles and epa world")
+
         # Manage versions of Giswater and PostgreSQL
         plugin_version = tools_qgis.get_plugin_metadata('version', 0, lib_vars.plugin_dir)
-        project_version = tools_gw.get_project_version(schema_name)
+        project_version = self.project_info['project_version']
         # Only get the x.y.zzz, not x.y.zzz.n
         try:
             plugin_version_l = str(plugin_version).split('.')
@@ -192,6 +216,8 @@ class GwLoadProject(QObject):
 
         # Call gw_fct_setcheckproject and create GwProjectLayersConfig thread
         self._config_layers()
+        self.startup_timer.lap("Check version and project")
+        tools_log.log_info("\n".join(self.startup_timer.get_lines()))
 
     # region private functions
 
@@ -397,31 +423,33 @@ class GwLoadProject(QObject):
             return
 
         # Call each of the functions that configure the toolbars 'def toolbar_xxxxx(self, toolbar_id, x=0, y=0):'
+        profiler = tools_gw.get_startup_profiler()
         toolbars_order = toolbars_order.replace(' ', '').split(',')
         for tb in toolbars_order:
-            self._create_toolbar(tb)
+            with profiler.toolbar(f"{tb}: create toolbar"):
+                self._create_toolbar(tb)
 
         # Manage action group of every toolbar
         icon_folder = f"{lib_vars.plugin_dir}{os.sep}icons{os.sep}toolbars{os.sep}"
         parent = self.iface.mainWindow()
         for plugin_toolbar in list(self.plugin_toolbars.values()):
-            ag = QActionGroup(parent)
-            ag.setProperty('gw_name', 'gw_QActionGroup')
-            for index_action in plugin_toolbar.list_actions:
-                successful = False
-                attempt = 0
-                while not successful and attempt < 10:
-                    button_def = tools_gw.get_config_parser('buttons_def', str(index_action), "project", "giswater")
-                    if button_def not in (None, 'None'):
-                        # Check if the class associated to the button definition exists
-                        if hasattr(buttons, button_def):
-                            text = tools_qt.tr(f'{button_def}')
-                            icon_path = f"{icon_folder}{plugin_toolbar.toolbar_id}{os.sep}{index_action}.png"
-                            button_class = getattr(buttons, button_def)
-                            button = button_class(icon_path, button_def, text, plugin_toolbar.toolbar, ag)
-                            self.buttons[index_action] = button
-                        successful = True
-                    attempt = attempt + 1
+            with profiler.toolbar(f"{plugin_toolbar.toolbar_id}: create buttons"):
+                ag = QActionGroup(parent)
+                ag.setProperty('gw_name', 'gw_QActionGroup')
+                for index_action in plugin_toolbar.list_actions:
+                    successful = False
+                    attempt = 0
+                    while not successful and attempt < 10:
+                        button_def = tools_gw.get_config_parser('buttons_def', str(index_action), "project", "giswater")
+                        if button_def not in (None, 'None'):
+                            # Check if the class associated to the button definition exists
+                            if buttons.has_button(button_def):
+                                text = tools_qt.tr(f'{button_def}')
+                                icon_path = f"{icon_folder}{plugin_toolbar.toolbar_id}{os.sep}{index_action}.png"
+                                button = buttons.create_button(button_def, icon_path, text, plugin_toolbar.toolbar, ag)
+                                self.buttons[index_action] = button
+                            successful = True
+                        attempt = attempt + 1
 
         # Disable buttons which are project type exclusive
         project_exclude = None
@@ -559,6 +587,11 @@ class GwLoadProject(QObject):
         description = f"ConfigLayerFields"
         params = {"project_type": global_vars.project_type, "schema_name": lib_vars.schema_name, "db_layers": rows,
                   "qgis_project_infotype": lib_vars.project_vars['info_type']}
+        # Reuse the configuration of the layers stored on disk while the schema version and config_form_fields don't change
+        use_cache = tools_gw.get_config_parser('system', 'layers_config_cache', "user", "init", prefix=False)
+        if tools_os.set_boolean(use_cache, default=False):
+            params['use_cache'] = True
+            params['project_version'] = self.project_info['project_version']
         self.task_get_layers = GwProjectLayersConfig(description, params)
         QgsApplication.taskManager().addTask(self.task_get_layers)
         QgsApplication.taskManager().triggerTask(self.task_get_layers)
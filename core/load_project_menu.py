@@ -6,6 +6,7 @@ or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
 import configparser
+import glob
 import os
 from functools import partial
 
@@ -14,8 +15,9 @@ from qgis.PyQt.QtGui import QIcon, QKeySequence
 from qgis.PyQt.QtWidgets import QActionGroup, QMenu, QPushButton, QTreeWidget, QTreeWidgetItem
 from qgis.core import QgsApplication
 
-from .ui.ui_manager import GwLoadMenuUi
+from .ui.ui_manager import GwLoadMenuUi, GwDialogTextUi
 from .utils import tools_gw
+from .utils.startup_profiler import GwStartupProfiler
 from .. import global_vars
 from ..libs import lib_vars, tools_qt, tools_qgis, tools_os, tools_db
 from .threads.project_layers_config import GwProjectLayersConfig
@@ -93,6 +95,11 @@ class GwMenuLoad(QObject):
             action_set_log_sql.setShortcuts(QKeySequence(f"{log_sql_shortcut}"))
             action_set_log_sql.triggered.connect(self._set_log_sql)
 
+            # Action 'Show startup profile'
+            if tools_gw.get_startup_profiler().enabled:
+                action_startup_profile = actions_menu.addAction(f"Show startup profile")
+                action_startup_profile.triggered.connect(self._open_startup_profile)
+
             # endregion
 
         # region Open plugin folder
@@ -205,6 +212,7 @@ class GwMenuLoad(QObject):
         self.tree_config_files.itemDoubleClicked.connect(partial(self._double_click_event))
         self.tree_config_files.itemChanged.connect(partial(self._set_config_value))
 
+        tools_gw.flush_config_parsers()
         path = f"{lib_vars.user_folder_dir}{os.sep}core{os.sep}config"
         files = [f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)) and f != 'user_params.config'
                  and '.bak' not in f]
@@ -277,6 +285,25 @@ class GwMenuLoad(QObject):
         tools_qgis.show_info(message)
 
 
+    def _open_startup_profile(self):
+        """ Show the last report of the startup profiler """
+
+        log_folder = f"{lib_vars.user_folder_dir}{os.sep}core{os.sep}log"
+        reports = sorted(glob.glob(f"{log_folder}{os.sep}startup_profile_*.json"))
+        if not reports:
+            tools_qgis.show_warning("No startup profile found", parameter=log_folder)
+            return
+
+        self.dlg_startup_profile = GwDialogTextUi()
+        self.dlg_startup_profile.setWindowTitle("Startup profile")
+        self.dlg_startup_profile.btn_accept.hide()
+        lines = GwStartupProfiler.get_report_lines(reports[-1])
+        tools_qt.set_widget_text(self.dlg_startup_profile, 'lbl_text', reports[-1])
+        tools_qt.set_widget_text(self.dlg_startup_profile, 'txt_infolog', "\n".join(lines))
+        self.dlg_startup_profile.btn_close.clicked.connect(self.dlg_startup_profile.close)
+        tools_gw.open_dialog(self.dlg_startup_profile, dlg_name='dialog_text')
+
+
     def _open_current_selections(self):
 
         if lib_vars.session_vars['current_selections']:
@@ -317,6 +344,12 @@ class GwMenuLoad(QObject):
         description = f"ConfigLayerFields"
         params = {"project_type": global_vars.project_type, "schema_name": lib_vars.schema_name, "db_layers": rows,
                   "qgis_project_infotype": lib_vars.project_vars['info_type']}
+        # Get the configuration of the layers from the database again and store it in the disk cache
+        use_cache = tools_gw.get_config_parser('system', 'layers_config_cache', "user", "init", prefix=False)
+        if tools_os.set_boolean(use_cache, default=False):
+            params['use_cache'] = True
+            params['reload_cache'] = True
+            params['project_version'] = tools_gw.get_project_version(schema_name)
         self.task_get_layers = GwProjectLayersConfig(description, params)
         QgsApplication.taskManager().addTask(self.task_get_layers)
         QgsApplication.taskManager().triggerTask(self.task_get_layers)
@@ -416,7 +416,7 @@ class GwInfo(QObject):
         layer = self.layer
         fid = self.feature_id = complet_result['body']['feature']['id']
         new_feature = False
-        can_edit = tools_os.set_boolean(tools_db.check_role_user('role_edit'))
+        can_edit = tools_gw.check_role_user('role_edit')
         if layer:
             if layer.isEditable() and can_edit:
                 tools_gw.enable_all(self.dlg_generic, complet_result['body']['data'])
@@ -791,7 +791,7 @@ class GwInfo(QObject):
         dlg_cf = self.dlg_cf
         layer = self.layer
         fid = self.feature_id
-        can_edit = tools_os.set_boolean(tools_db.check_role_user('role_edit'))
+        can_edit = tools_gw.check_role_user('role_edit')
         if layer:
             if layer.isEditable() and can_edit:
                 tools_gw.enable_all(dlg_cf, complet_result['body']['data'])
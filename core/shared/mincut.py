@@ -29,7 +29,7 @@ from ..utils import tools_gw
 from ..utils.snap_manager import GwSnapManager
 from ..ui.ui_manager import GwDialogTextUi, GwMincutComposerUi, GwMincutConnecUi, GwMincutEndUi, GwMincutHydrometerUi
 from ... import global_vars
-from ...libs import lib_vars, tools_qt, tools_qgis, tools_log, tools_db
+from ...libs import lib_vars, tools_qt, tools_qgis, tools_log, tools_db, tools_os
 
 
 class GwMincut:
@@ -67,6 +67,13 @@ class GwMincut:
         self.vertex_marker = None
         self.snapper_manager = None
 
+        # Local preview of the mincut computed with the network graph
+        value = tools_gw.get_config_parser('system', 'network_graph_preview', "user", "init", prefix=False)
+        self.preview_enabled = tools_os.set_boolean(value, default=False)
+        self.preview_arc_id = None      # Arc of the last automatic mincut
+        self.preview_unaccess = []      # Valves set as unaccessible by custom mincut
+        self.preview_element_id = None  # Element under the mouse
+
         # Other variables
         self.col1 = "customer_code"
         self.col2 = "hydrometer_customer_code"
@@ -1775,6 +1782,7 @@ class GwMincut:
             # Disconnect snapping and related signals
             tools_qgis.disconnect_snapping(False, self.emit_point, self.vertex_marker)
             tools_gw.disconnect_signal('mincut')
+            self._clear_mincut_preview()
             # Recover snapping options, refresh canvas & set visible layers
             return
 
@@ -1799,8 +1807,11 @@ class GwMincut:
         self.previous_snapping = self.snapper_manager.get_snapping_options()
 
         # Set signals
-        tools_gw.connect_signal(self.canvas.xyCoordinates, self._mouse_move_node_arc, 'mincut',
-                                'auto_mincut_xyCoordinates_mouse_move_node_arc')
+        if self.preview_enabled:
+            # Start loading the network graph, the preview is shown once it's loaded
+            tools_gw.get_network_graph()
+        tools_gw.connect_signal(self.canvas.xyCoordinates, self._mouse_move_auto_mincut, 'mincut',
+                                'auto_mincut_xyCoordinates_mouse_move_auto_mincut')
         tools_gw.connect_signal(self.emit_point.canvasClicked, self._auto_mincut_snapping,
                                 'mincut', 'auto_mincut_ep_canvasClicked_auto_mincut_snapping')
 
@@ -1876,6 +1887,53 @@ class GwMincut:
         if result.isValid():
             self.snapper_manager.add_marker(result, self.vertex_marker)
 
+        return result
+
+
+    def _mouse_move_auto_mincut(self, point):
+        """ Automatic mincut: show the local preview of the mincut of the arc under the mouse """
+
+        result = self._mouse_move_node_arc(point)
+        if not self.preview_enabled or result is None or not result.isValid():
+            return
+
+        snapped_feat = self.snapper_manager.get_snapped_feature(result)
+        if snapped_feat is None:
+            return
+        self._preview_mincut(snapped_feat.attribute('arc_id'))
+
+
+    def _preview_mincut(self, arc_id, unaccess=None):
+        """ Select the arcs that the mincut of @arc_id would isolate, computed with the network graph.
+            It's only a preview: gw_fct_setmincut still calculates the mincut when the user clicks
+        """
+
+        element_id = (arc_id, unaccess)
+        if element_id == self.preview_element_id:
+            return
+        self.preview_element_id = element_id
+
+        graph = tools_gw.get_network_graph()
+        if graph is None or graph.stale or self.layer_arc is None:
+            return
+
+        isolation = graph.get_isolation(arc_id, self.preview_unaccess + ([unaccess] if unaccess else []))
+        if isolation is None:
+            return
+
+        self.layer_arc.selectByIds(isolation['fids'])
+        msg = f"Mincut preview: {len(isolation['arcs'])} arcs isolated, {len(isolation['valves'])} valves to close"
+        self.iface.mainWindow().statusBar().showMessage(msg, 5000)
+
+
+    def _clear_mincut_preview(self):
+
+        if self.preview_element_id is None:
+            return
+        self.preview_element_id = None
+        if self.layer_arc is not None and not isdeleted(self.layer_arc):
+            self.layer_arc.removeSelection()
+
 
     def _auto_mincut_snapping(self, point, btn):
         """ Automatic mincut: Snapping to 'node' and 'arc' layers """
@@ -1890,6 +1948,7 @@ class GwMincut:
             except RuntimeError:
                 pass
 
+        self._clear_mincut_preview()
         if btn == Qt.RightButton:
             self.action_mincut.setChecked(False)
             tools_qgis.disconnect_snapping(False, self.emit_point, self.vertex_marker)
@@ -1922,6 +1981,8 @@ class GwMincut:
             snapped_point = self.snapper_manager.get_snapped_point(result)
             element_id = snapped_feat.attribute(f'{elem_type}_id')
             layer.select([feature_id])
+            self.preview_arc_id = element_id
+            self.preview_unaccess = []
 
             # Ensure that Mincut layers are loaded
             tools_gw.load_missing_layers('v_om_mincut%', "OM", "Mincut")
@@ -2191,6 +2252,7 @@ class GwMincut:
             # Disconnect snapping and related signals
             tools_qgis.disconnect_snapping(False, self.emit_point, self.vertex_marker)
             tools_gw.disconnect_signal('mincut')
+            self._clear_mincut_preview()
             # Recover snapping options, refresh canvas & set visible layers
             return
 
@@ -2207,8 +2269,8 @@ class GwMincut:
         self.current_layer = self.layer
 
         # Waiting for signals
-        tools_gw.connect_signal(self.canvas.xyCoordinates, self._mouse_move_valve, 'mincut',
-                                'custom_mincut_xyCoordinates_mouse_move_valve')
+        tools_gw.connect_signal(self.canvas.xyCoordinates, self._mouse_move_custom_mincut, 'mincut',
+                                'custom_mincut_xyCoordinates_mouse_move_custom_mincut')
         tools_gw.connect_signal(self.emit_point.canvasClicked, partial(self._custom_mincut_snapping, action),
                                 'mincut', 'custom_mincut_ep_canvasClicked_custom_mincut_snapping')
 
@@ -2223,10 +2285,28 @@ class GwMincut:
             self.snapper_manager.add_marker(result, self.vertex_marker)
 
 
+    def _mouse_move_custom_mincut(self, point):
+        """ Custom mincut: show the local preview of the mincut if the valve under the mouse is unaccessible """
+
+        event_point = self.snapper_manager.get_event_point(point=point)
+        result = self.snapper_manager.snap_to_current_layer(event_point)
+        if not result.isValid():
+            return
+
+        self.snapper_manager.add_marker(result, self.vertex_marker)
+        if not self.preview_enabled or self.preview_arc_id is None:
+            return
+
+        snapped_feat = self.snapper_manager.get_snapped_feature(result)
+        if snapped_feat is not None:
+            self._preview_mincut(self.preview_arc_id, snapped_feat.attribute('node_id'))
+
+
     # noinspection PyUnusedLocal
     def _custom_mincut_snapping(self, action, point, btn):
         """ Custom mincut snapping function """
 
+        self._clear_mincut_preview()
         if btn == Qt.RightButton:
             self.action_custom_mincut.setChecked(False)
             self.action_change_valve_status.setChecked(False)
@@ -2270,6 +2350,8 @@ class GwMincut:
             if result is not None and result['status'] == 'Accepted' and result['message']:
                 level = int(result['message']['level']) if 'level' in result['message'] else 1
                 tools_qgis.show_message(result['message']['text'], level)
+            if result is not None and result['status'] == 'Accepted':
+                self.preview_unaccess.append(elem_id)
 
         # Disconnect snapping and related signals
         tools_qgis.disconnect_snapping(False, self.emit_point, self.vertex_marker)
@@ -2600,6 +2682,8 @@ class GwMincut:
             extras = f'"nodeId":{elem_id}, "mincutId":{result_mincut_id}, "usePsectors":"{use_planified}"'
             body = tools_gw.create_body(extras=extras)
             result = tools_gw.execute_procedure('gw_fct_setchangevalvestatus', body)
+            if result is not None and result['status'] == 'Accepted':
+                tools_gw.invalidate_network_graph()
             if result is not None and result['status'] == 'Accepted' and result['message']:
                 level = int(result['message']['level']) if 'level' in result['message'] else 1
                 tools_qgis.show_message(result['message']['text'], level)
@@ -23,6 +23,7 @@ from .document import GwDocument
 from .info import GwInfo
 from .psector import GwPsector
 from .visit import GwVisit
+from ..threads.search_engine import GwSearchEngine, GwSearchRequest
 from ..ui.ui_manager import GwInfoGenericUi, GwSearchWorkcatUi
 from ..utils import tools_gw
 from ... import global_vars
@@ -45,6 +46,13 @@ class GwSearch:
         self.is_mincut = False
         self.rubber_band = tools_gw.create_rubberband(self.canvas)
         self.aux_rubber_band = tools_gw.create_rubberband(self.canvas)
+        self.result_data = None
+        delay = tools_gw.get_config_parser('system', 'search_delay', "user", "init", prefix=False)
+        try:
+            delay = int(delay)
+        except (TypeError, ValueError):
+            delay = 300
+        self.search_engine = GwSearchEngine(delay)
 
 
     def open_search(self, dlg_search, dlg_mincut=None):
@@ -61,6 +69,7 @@ class GwSearch:
             self.is_mincut = True
             form = f'"singleTab":"tab_address"'
 
+        self.search_engine.clear()
         self.dlg_search.lbl_msg.setStyleSheet("QLabel{color:red;}")
         self.dlg_search.lbl_msg.setVisible(False)
         qgis_project_add_schema = lib_vars.project_vars['add_schema']
@@ -231,6 +240,7 @@ class GwSearch:
 
     def _close_search(self):
 
+        self.search_engine.close()
         self.dlg_search = None
 
 
@@ -384,21 +394,25 @@ class GwSearch:
 
 
     def _make_list(self, completer, model, widget):
-        """ Create a list of ids and populate widget (QLineEdit) """
+        """ Search the text of the current tab when the user stops typing and populate widget (QLineEdit) """
+
+        self.search_engine.search(self._get_search_request, partial(self._set_search_list, completer, model, widget))
+
+
+    def _get_search_request(self):
+        """ Get the request of 'gw_fct_setsearch' for the values of the widgets of the current tab """
+
+        if self.dlg_search is None:
+            return None
 
-        # Create 2 json, one for first QLineEdit and other for second QLineEdit
         form_search = ''
         extras_search = ''
-        form_search_add = ''
-        extras_search_add = ''
-        result = None
-        line_edit = None
+        context = ''
         index = self.dlg_search.main_tab.currentIndex()
         combo_list = self.dlg_search.main_tab.widget(index).findChildren(QComboBox)
         line_list = self.dlg_search.main_tab.widget(index).findChildren(QLineEdit)
         chk_list = self.dlg_search.main_tab.widget(index).findChildren(QCheckBox)
         form_search += f'"tabName":"{self.dlg_search.main_tab.widget(index).objectName()}"'
-        form_search_add += f'"tabName":"{self.dlg_search.main_tab.widget(index).objectName()}"'
 
         if combo_list:
             combo = combo_list[0]
@@ -410,73 +424,98 @@ class GwSearch:
             except IndexError:
                 pass
             extras_search += f'"{combo.property("columnname")}":{{"id":"{id}", "name":"{name}"}}, '
-            extras_search_add += f'"{combo.property("columnname")}":{{"id":"{id}", "name":"{name}"}}, '
 
-        if line_list:
-            line_edit = line_list[0]
-            # If current tab have more than one QLineEdit, clear second QLineEdit
-            if len(line_list) == 2:
-                line_edit.textChanged.connect(partial(self._clear_line_edit_add, line_list))
+        if not line_list:
+            return None
 
-            value = tools_qt.get_text(self.dlg_search, line_edit, return_string_null=False)
-            if str(value) == '':
-                return
+        line_edit = line_list[0]
+        # If current tab have more than one QLineEdit, clear second QLineEdit
+        if len(line_list) == 2:
+            line_edit.textChanged.connect(partial(self._clear_line_edit_add, line_list))
+
+        value = tools_qt.get_text(self.dlg_search, line_edit, return_string_null=False)
+        if str(value) == '':
+            return None
 
-            qgis_project_add_schema = lib_vars.project_vars['add_schema']
-            extras_search += f'"{line_edit.property("columnname")}":{{"text":"{value}"}}, '
-            extras_search += f'"addSchema":"{qgis_project_add_schema}"'
-            if chk_list:
-                chk_list = chk_list[0]
-                extras_search += f', "{chk_list.property("columnname")}":"{chk_list.isChecked()}"'
-            extras_search_add += f'"{line_edit.property("columnname")}":{{"text":"{value}"}}'
-            body = tools_gw.create_body(form=form_search, extras=extras_search)
-            result = tools_gw.execute_procedure('gw_fct_setsearch', body, rubber_band=self.rubber_band)
-            if not result or result['status'] == 'Failed':
-                return False
-
-            if result:
-                self.result_data = result
+        qgis_project_add_schema = lib_vars.project_vars['add_schema']
+        context = f'{form_search}, {extras_search}"addSchema":"{qgis_project_add_schema}"'
+        extras_search += f'"{line_edit.property("columnname")}":{{"text":"{value}"}}, '
+        extras_search += f'"addSchema":"{qgis_project_add_schema}"'
+        if chk_list:
+            chk_list = chk_list[0]
+            extras_search += f', "{chk_list.property("columnname")}":"{chk_list.isChecked()}"'
+            context += f', {chk_list.isChecked()}'
+        body = tools_gw.create_body(form=form_search, extras=extras_search)
+        return GwSearchRequest('gw_fct_setsearch', body, context, str(value), self.rubber_band)
+
+
+    def _set_search_list(self, completer, model, widget, result):
+        """ Populate widget (QLineEdit) with the result of 'gw_fct_setsearch' and search the second QLineEdit """
+
+        if self.dlg_search is None or not result or result['status'] == 'Failed':
+            return
+
+        self.result_data = result
+        index = self.dlg_search.main_tab.currentIndex()
+        line_list = self.dlg_search.main_tab.widget(index).findChildren(QLineEdit)
 
         # Set label visible
         display_list = []
-        if result:
-            if self.result_data['data'] == {} and self.lbl_visible:
-                self.dlg_search.lbl_msg.setVisible(True)
-                if len(line_list) == 2:
-                    widget_add = line_list[1]
-                    widget_add.setReadOnly(True)
-                    widget_add.setStyleSheet("QLineEdit { background: rgb(242, 242, 242); color: rgb(100, 100, 100)}")
-            else:
-                self.lbl_visible = True
-                self.dlg_search.lbl_msg.setVisible(False)
+        if not self.result_data['data'] and self.lbl_visible:
+            self.dlg_search.lbl_msg.setVisible(True)
+            if len(line_list) == 2:
+                widget_add = line_list[1]
+                widget_add.setReadOnly(True)
+                widget_add.setStyleSheet("QLineEdit { background: rgb(242, 242, 242); color: rgb(100, 100, 100)}")
+        else:
+            self.lbl_visible = True
+            self.dlg_search.lbl_msg.setVisible(False)
 
-            # Get list of items from returned json from database and make a list for completer
-            for data in self.result_data['data']:
-                display_list.append(data['display_name'])
-            tools_qt.set_completer_object(completer, model, widget, sorted(display_list))
+        # Get list of items from returned json from database and make a list for completer
+        for data in self.result_data['data']:
+            display_list.append(data['display_name'])
+        tools_qt.set_completer_object(completer, model, widget, sorted(display_list))
+
+        if len(line_list) != 2:
+            return
+
+        line_edit = line_list[0]
+        line_edit_add = line_list[1]
+        value = tools_qt.get_text(self.dlg_search, line_edit_add)
+        if str(value) in display_list:
+            line_edit.setText(value)
+            return
+        if str(value) == 'null':
+            return
+
+        form_search_add = f'"tabName":"{self.dlg_search.main_tab.widget(index).objectName()}"'
+        value_search = tools_qt.get_text(self.dlg_search, line_edit, return_string_null=False)
+        extras_search_add = ''
+        combo_list = self.dlg_search.main_tab.widget(index).findChildren(QComboBox)
+        if combo_list:
+            combo = combo_list[0]
+            id = tools_qt.get_combo_value(self.dlg_search, combo, 0)
+            name = tools_qt.get_combo_value(self.dlg_search, combo, 1)
+            extras_search_add += f'"{combo.property("columnname")}":{{"id":"{id}", "name":"{name}"}}, '
+        extras_search_add += f'"{line_edit.property("columnname")}":{{"text":"{value_search}"}}'
+        context = f'{form_search_add}, {extras_search_add}'
+        extras_search_add += f', "{line_edit_add.property("columnname")}":{{"text":"{value}"}}'
+        body = tools_gw.create_body(form=form_search_add, extras=extras_search_add)
+        request = GwSearchRequest('gw_fct_setsearchadd', body, context, str(value), self.rubber_band)
+        self.search_engine.submit(request, partial(self._set_search_add_list, completer, model, line_edit_add))
 
-        if len(line_list) == 2:
-            line_edit_add = line_list[1]
-            value = tools_qt.get_text(self.dlg_search, line_edit_add)
-            if str(value) in display_list:
-                if line_edit:
-                    line_edit.setText(value)
-                return
-            if str(value) == 'null':
-                return
 
-            extras_search_add += f', "{line_edit_add.property("columnname")}":{{"text":"{value}"}}'
-            body = tools_gw.create_body(form=form_search_add, extras=extras_search_add)
-            result = tools_gw.execute_procedure('gw_fct_setsearchadd', body, rubber_band=self.rubber_band)
-            if not result or result['status'] == 'Failed':
-                return False
-
-            self.result_data = result
-            if result is not None:
-                display_list = []
-                for data in self.result_data['data']:
-                    display_list.append(data['display_name'])
-                tools_qt.set_completer_object(completer, model, line_edit_add, sorted(display_list))
+    def _set_search_add_list(self, completer, model, widget, result):
+        """ Populate the second QLineEdit of the tab with the result of 'gw_fct_setsearchadd' """
+
+        if self.dlg_search is None or not result or result['status'] == 'Failed':
+            return
+
+        self.result_data = result
+        display_list = []
+        for data in self.result_data['data']:
+            display_list.append(data['display_name'])
+        tools_qt.set_completer_object(completer, model, widget, sorted(display_list))
 
 
     def _clear_line_edit_add(self, line_list):
@@ -0,0 +1,263 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import os
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+
+from qgis.PyQt.QtCore import pyqtSignal
+
+from ..utils import tools_gw
+from ...libs import tools_db, tools_log, tools_qgis
+from .epa_file_manager import GwEpaFileManager
+from .task import GwTask
+
+
+class GwEpaBatchRun:
+    """ Values of one result of the batch, with the same attributes that GwEpaFileManager reads from Go2Epa """
+
+    def __init__(self, go2epa, item, folder_inp, folder_rpt):
+
+        self.dlg_go2epa = go2epa.dlg_go2epa
+        self.result_name = item['resultId']
+        self.file_inp = os.path.join(folder_inp, f"{self.result_name}.inp")
+        self.file_rpt = os.path.join(folder_rpt, f"{self.result_name}.rpt")
+        self.export_inp = go2epa.export_inp
+        self.exec_epa = go2epa.exec_epa
+        self.import_result = go2epa.import_result
+        self.export_subcatch = go2epa.export_subcatch
+        self.dscenarios = item.get('dscenarios')
+        self.netscenario = item.get('netscenario')
+        self.status = None
+        self.error_msg = None
+
+
+    def check_result_id(self):
+        pass
+
+
+class GwEpaBatchManager(GwTask):
+    """ Run Go2Epa for a queue of results. Inp files are exported one after another (database selectors are set
+        for every result), EPA engines run concurrently up to @pool_size processes and every rpt file is imported
+        as soon as its engine finishes """
+
+    step_completed = pyqtSignal(dict, str)
+    run_progress = pyqtSignal(str, int, str)
+
+    def __init__(self, description, go2epa, batch, folder_inp, folder_rpt, pool_size=None, timer=None):
+
+        super().__init__(description)
+        self.go2epa = go2epa
+        self.timer = timer
+        self.pool_size = pool_size or os.cpu_count() or 1
+        self.runs = []
+        # Workers are created from the main thread but never scheduled: they share the connection and
+        # the cancel state of this task and report their progress as the progress of their run
+        for item in batch:
+            run = GwEpaBatchRun(go2epa, item, folder_inp, folder_rpt)
+            worker = GwEpaFileManager(f"Go2Epa {run.result_name}", run, is_canceled=self.isCanceled,
+                                      set_progress=partial(self._set_run_progress, run))
+            worker.step_completed.connect(self.step_completed)
+            self.runs.append((run, worker))
+
+
+    def run(self):
+
+        super().run()
+
+        self.step_completed.emit({"message": {"level": 1, "text": f"GO2EPA BATCH - {len(self.runs)} results"}}, "\n")
+        self.step_completed.emit({"message": {"level": 1, "text": "-------------------------"}}, "\n")
+
+        selectors = None
+        try:
+            # The selectors of the user are changed for every result, they are restored when the batch ends
+            selectors = self._get_selectors()
+            pending = {}
+            with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+                for run, worker in self.runs:
+                    if self.isCanceled():
+                        break
+
+                    worker.aux_conn = self.aux_conn
+                    worker.initialize_variables()
+                    if not self._export_run(run, worker):
+                        continue
+
+                    if run.exec_epa:
+                        self.run_progress.emit(run.result_name, 0, "Execute EPA software")
+                        pending[executor.submit(worker._execute_epa)] = (run, worker)
+                    else:
+                        self._import_run(run, worker, True)
+
+                    # Import the results whose engine has already finished before exporting the next one
+                    self._import_finished(pending, block=False)
+
+                self._import_finished(pending, block=True)
+
+            return not self.isCanceled() and all(run.status for run, worker in self.runs)
+
+        except Exception as e:
+            self.exception = e
+            return False
+
+        finally:
+            if selectors:
+                self._restore_selectors(selectors)
+
+
+    def finished(self, result):
+
+        super().finished(result)
+
+        self.go2epa.dlg_go2epa.btn_cancel.setEnabled(False)
+        self.go2epa.dlg_go2epa.btn_accept.setEnabled(True)
+        if self.timer:
+            self.timer.stop()
+        if self.isCanceled():
+            return
+
+        if self.exception:
+            tools_qgis.show_warning(f"Go2Epa batch aborted: {self.exception}")
+
+        accepted = 0
+        for run, worker in self.runs:
+            if run.status:
+                accepted += 1
+                text = f"{run.result_name}: {worker.common_msg}"
+            else:
+                text = f"{run.result_name}: FAILED {run.error_msg or ''}"
+            self.go2epa.step_completed({"message": {"level": 1, "text": text}})
+            worker.manage_step_timer()
+        tools_qgis.show_info(f"Go2Epa batch finished: {accepted} of {len(self.runs)} results done")
+
+
+    # region private functions
+
+    def _set_run_progress(self, run, progress):
+        self.run_progress.emit(run.result_name, int(progress), "")
+
+
+    def _set_run_selectors(self, run):
+        """ Set the dscenario and netscenario selectors of @run """
+
+        if run.dscenarios is not None:
+            self._set_dscenarios(run.dscenarios)
+        if run.netscenario is not None:
+            self._set_netscenario(run.netscenario)
+
+
+    def _set_dscenarios(self, dscenarios):
+        """ Select only the dscenarios of list @dscenarios """
+
+        extras = '"selectorType":"selector_basic", "tabName":"tab_dscenario", "checkAll":"False", "addSchema":"None"'
+        body = tools_gw.create_body(extras=extras)
+        tools_gw.execute_procedure('gw_fct_setselectors', body, aux_conn=self.aux_conn, is_thread=True)
+        for dscenario_id in dscenarios:
+            extras = (f'"selectorType":"selector_basic", "tabName":"tab_dscenario", "id":"{dscenario_id}", '
+                      f'"isAlone":"False", "value":"True", "addSchema":"None"')
+            body = tools_gw.create_body(extras=extras)
+            tools_gw.execute_procedure('gw_fct_setselectors', body, aux_conn=self.aux_conn, is_thread=True)
+
+
+    def _set_netscenario(self, netscenario_id, value=True):
+
+        extras = (f'"selectorType":"None", "tabName":"tab_netscenario", "checkAll":null, "addSchema":"None", '
+                  f'"id":"{netscenario_id}", "value":"{value}", "isAlone":"True"')
+        body = tools_gw.create_body(extras=extras)
+        tools_gw.execute_procedure('gw_fct_setselectors', body, aux_conn=self.aux_conn, is_thread=True)
+
+
+    def _get_selectors(self):
+        """ Get the dscenarios and the netscenario selected by the user, only of the selectors the batch changes """
+
+        selectors = {}
+        if any(run.dscenarios is not None for run, worker in self.runs):
+            sql = "SELECT json_agg(dscenario_id) FROM selector_inp_dscenario WHERE cur_user = current_user"
+            row = tools_db.get_row(sql, log_sql=False, aux_conn=self.aux_conn)
+            selectors['dscenarios'] = (row[0] if row else None) or []
+
+        netscenarios = [run.netscenario for run, worker in self.runs if run.netscenario is not None]
+        if netscenarios:
+            sql = "SELECT netscenario_id FROM selector_netscenario WHERE cur_user = current_user LIMIT 1"
+            row = tools_db.get_row(sql, log_sql=False, aux_conn=self.aux_conn)
+            selectors['netscenario'] = row[0] if row else None
+            selectors['netscenarios'] = netscenarios
+
+        return selectors
+
+
+    def _restore_selectors(self, selectors):
+        """ Select again the dscenarios and the netscenario of @selectors (the ones of the user before the batch) """
+
+        try:
+            # A cancel leaves the transaction of the connection aborted
+            tools_db.dao.rollback(self.aux_conn)
+            if 'dscenarios' in selectors:
+                self._set_dscenarios(selectors['dscenarios'])
+            if 'netscenarios' in selectors:
+                if selectors['netscenario'] is not None:
+                    self._set_netscenario(selectors['netscenario'])
+                else:
+                    for netscenario_id in set(selectors['netscenarios']):
+                        self._set_netscenario(netscenario_id, False)
+        except Exception as e:
+            tools_log.log_warning(f"Exception restoring the selectors after Go2Epa batch [{type(e).__name__}]: {e}")
+
+
+    def _export_run(self, run, worker):
+        """ Set the selectors of @run, execute gw_fct_pg2epa_main and write its inp file """
+
+        if not (run.export_inp or run.exec_epa):
+            return True
+
+        self.run_progress.emit(run.result_name, 0, "Export INP")
+        tools_log.log_info(f"Task 'Go2Epa batch' export result '{run.result_name}'")
+        self._set_run_selectors(run)
+        status = worker._exec_function_pg2epa()
+        if status and run.export_inp:
+            status = worker._export_inp()
+        if not status:
+            self._set_run_status(run, worker, False)
+
+        return status
+
+
+    def _import_finished(self, pending, block):
+        """ Import the rpt files of the engines that have finished. If @block, wait until all of them finish """
+
+        while pending:
+            done, not_done = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                run, worker = pending.pop(future)
+                try:
+                    status = future.result()
+                except Exception as e:
+                    worker.error_msg = str(e)
+                    status = False
+                self._import_run(run, worker, status)
+            if not block:
+                break
+
+
+    def _import_run(self, run, worker, status):
+
+        if status and run.import_result and not self.isCanceled():
+            self.run_progress.emit(run.result_name, 0, "Import RPT")
+            status = worker._import_rpt()
+        self._set_run_status(run, worker, status)
+
+
+    def _set_run_status(self, run, worker, status):
+
+        run.status = status
+        run.error_msg = worker.error_msg
+        if not status and run.error_msg is None and worker.json_result:
+            run.error_msg = worker.json_result.get('message', {}).get('text')
+        self.run_progress.emit(run.result_name, 100, "Finished" if status else "Failed")
+
+    # endregion
@@ -5,29 +5,57 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
+import io
 import json
 import os
 import re
+import shutil
 import subprocess
+import sys
+import threading
+import time
+
+from datetime import datetime
+from functools import partial
 
 from qgis.PyQt.QtCore import pyqtSignal
 
 from ..utils import tools_gw
+from ..utils.cursor_batches import iter_batches
+from ..utils.rpt_tokenizer import GwRptTokenizer, GwRptLineError
+from ..utils.step_timer import GwStepTimer
 from ... import global_vars
 from ...libs import lib_vars, tools_log, tools_qt, tools_db, tools_qgis, tools_os
 from .task import GwTask
 
 
+# Targets of the inp file that are written into the aditional .dat file (ud networkmode 2) instead
+INP_DAT_TARGETS = ('GULLY', 'LINK', 'GRATE', 'LXSECTIONS')
+INP_BUFFER_SIZE = 1048576
+INP_CURSOR_BATCH_SIZE = 10000
+re_inp_target = re.compile(r'\[(.*?)\]')
+re_multiple_spaces = re.compile(' +')
+EPA_POLL_INTERVAL = 0.5
+re_epa_separators = re.compile(r'[\r\n\b]+')
+re_epa_percent = re.compile(r'(\d{1,3})\s*%')
+re_epa_day_hour = re.compile(r'day:\s*(\d+)\s+hour:\s*(\d+)', re.IGNORECASE)
+re_epa_hour = re.compile(r'hour\s+(\d+):\d{2}', re.IGNORECASE)
+
+
 class GwEpaFileManager(GwTask):
     """ This shows how to subclass QgsTask """
 
     fake_progress = pyqtSignal()
     step_completed = pyqtSignal(dict, str)
 
-    def __init__(self, description, go2epa, timer=None):
+    def __init__(self, description, go2epa, timer=None, is_canceled=None, set_progress=None):
+        """ @is_canceled and @set_progress replace isCanceled and setProgress of the task when its steps are run by
+            another task (Go2Epa batch) """
 
         super().__init__(description)
         self.go2epa = go2epa
+        self.is_canceled = is_canceled or self.isCanceled
+        self.set_progress = set_progress or self.setProgress
         self.json_result = None
         self.rpt_result = None
         self.fid = 140
@@ -46,6 +74,11 @@ class GwEpaFileManager(GwTask):
         self.function_failed = False
         self.complet_result = None
         self.replaced_velocities = False
+        self.rpt_chunk = None
+        self.epa_process = None
+        self.inp_cursor_rows = 0
+        self.function_keys = {}
+        self.step_timer = GwStepTimer("Go2Epa")
 
 
     def set_variables_from_go2epa(self):
@@ -59,6 +92,13 @@ class GwEpaFileManager(GwTask):
         self.go2epa_execute_epa = self.go2epa.exec_epa
         self.go2epa_import_result = self.go2epa.import_result
         self.export_subcatch = self.go2epa.export_subcatch
+        inp_cursor_export = tools_gw.get_config_parser('btn_go2epa', 'inp_cursor_export', "user", "init", prefix=False)
+        self.inp_cursor_export = tools_os.set_boolean(inp_cursor_export, default=False)
+        self.epa_opener = tools_gw.get_epa_software()
+        # Read from the main thread, database calls from the task must use its own connection
+        self.networkmode = None
+        if global_vars.project_type == 'ud' and self.go2epa_export_inp:
+            self.networkmode = tools_gw.get_config_value('inp_options_networkmode')
 
 
     def run(self):
@@ -106,6 +146,8 @@ class GwEpaFileManager(GwTask):
         if self.isCanceled():
             return
 
+        self.manage_step_timer()
+
         # If PostgreSQL function returned null
         if (self.go2epa_export_inp or self.go2epa_export_inp) and self.complet_result is None:
             msg = f"Database returned null. Check postgres function '{self.function_name}'"
@@ -182,10 +224,36 @@ class GwEpaFileManager(GwTask):
             tools_qt.show_exception_message(msg=lib_vars.session_vars['last_error_msg'])
 
 
+    def manage_step_timer(self):
+        """ Show the timing of the steps in the log tab and append it to the history file 'go2epa_timing.csv' """
+
+        if not self.step_timer.steps:
+            return
+
+        self.step_completed.emit({"message": {"level": 1, "text": "\n".join(self.step_timer.get_lines())}}, "\n")
+        if not lib_vars.user_folder_dir:
+            return
+        try:
+            log_folder = f"{lib_vars.user_folder_dir}{os.sep}core{os.sep}log"
+            os.makedirs(log_folder, exist_ok=True)
+            plugin_version, message = tools_qgis.get_plugin_version()
+            self.step_timer.save_csv(f"{log_folder}{os.sep}go2epa_timing.csv", plugin_version=plugin_version,
+                                     project_type=global_vars.project_type, result_id=self.result_name)
+        except Exception as e:
+            tools_log.log_warning(f"Exception saving Go2Epa timing [{type(e).__name__}]: {e}")
+
+
     def cancel(self):
 
         tools_qgis.show_info(f"Task canceled - {self.description()}")
         self._close_file()
+        # The worker thread sets self.epa_process to None when the process finishes
+        epa_process = self.epa_process
+        if epa_process is not None:
+            try:
+                epa_process.kill()
+            except (ProcessLookupError, OSError):
+                pass
         super().cancel()
 
 
@@ -208,7 +276,7 @@ class GwEpaFileManager(GwTask):
 
         self.json_result = None
         status = False
-        self.setProgress(0)
+        self.set_progress(0)
 
         extras = f'"resultId":"{self.result_name}"'
         if global_vars.project_type == 'ud':
@@ -217,15 +285,21 @@ class GwEpaFileManager(GwTask):
         # 7 steps
         main_json_result = None
         for step in range(1, 8):
-            self.body = tools_gw.create_body(extras=(extras + f', "step": {step}'))
+            step_extras = extras + f', "step": {step}'
+            if step == 6 and self.inp_cursor_export:
+                step_extras += ', "fileTable": true'
+            self.body = tools_gw.create_body(extras=step_extras)
             tools_log.log_info(f"Task 'Go2Epa' execute procedure 'gw_fct_pg2epa_main' step {step} with parameters: "
                                f"'gw_fct_pg2epa_main', '{self.body}', 'aux_conn={self.aux_conn}', 'is_thread=True'")
-            json_result = tools_gw.execute_procedure('gw_fct_pg2epa_main', self.body,
-                                                     aux_conn=self.aux_conn, is_thread=True)
+            with self.step_timer.step(f"gw_fct_pg2epa_main step {step}") as timing:
+                json_result = tools_gw.execute_procedure('gw_fct_pg2epa_main', self.body,
+                                                         aux_conn=self.aux_conn, is_thread=True)
+                if json_result and 'file' in json_result.get('body', {}):
+                    timing['rows'] = len(json_result['body']['file'])
             self.step_completed.emit(json_result, "\n")
             if step == 6:
                 main_json_result = json_result
-            if self.isCanceled() or json_result is None:
+            if self.is_canceled() or json_result is None:
                 return False
             if json_result.get('status') == 'Failed':
                 tools_log.log_warning(json_result)
@@ -244,7 +318,7 @@ class GwEpaFileManager(GwTask):
                 self.function_failed = True
             else:
                 status = True
-        if self.isCanceled():
+        if self.is_canceled():
             return False
 
         return status
@@ -252,20 +326,35 @@ class GwEpaFileManager(GwTask):
 
     def _export_inp(self):
 
-        if self.isCanceled():
+        if self.is_canceled():
             return False
 
         tools_log.log_info(f"Export INP file into PostgreSQL")
 
-        # Get values from complet_result['body']['file'] and insert into INP file
-        if 'file' not in self.complet_result['body']:
-            return False
-
         if self.file_inp == "null":
             message = "You have to set this parameter"
             self.error_msg = f"{message}: INP file"
             return False
 
+        # Get inp lines from the staging table through a server-side cursor and write them while they are fetched.
+        # Servers that don't support "fileTable" still return the lines in complet_result['body']['file']
+        if self.inp_cursor_export and not self.complet_result.get('body', {}).get('file'):
+            tools_log.log_info(f"Task 'Go2Epa' execute function 'def _fill_inp_file' with parameters: '{self.file_inp}', 'cursor'")
+            self.inp_cursor_rows = 0
+            self._fill_inp_file(self.file_inp, self._iter_inp_rows_cursor())
+            if self.is_canceled() or self.error_msg:
+                return False
+            if self.inp_cursor_rows == 0:
+                self.error_msg = "No inp lines found in temp_csv. Check that gw_fct_pg2epa_main supports 'fileTable'"
+                return False
+            self.message = self.complet_result['message']['text']
+            self.common_msg += "Export INP finished. "
+            return True
+
+        # Get values from complet_result['body']['file'] and insert into INP file
+        if 'file' not in self.complet_result['body']:
+            return False
+
         tools_log.log_info(f"Task 'Go2Epa' execute function 'def _fill_inp_file' with parameters: '{self.file_inp}', '{self.complet_result['body']['file']}'")
         self._fill_inp_file(self.file_inp, self.complet_result['body']['file'])
         self.message = self.complet_result['message']['text']
@@ -274,66 +363,92 @@ class GwEpaFileManager(GwTask):
         return True
 
 
+    def _iter_inp_rows_cursor(self):
+        """ Yield the inp lines left by step 6 of gw_fct_pg2epa_main in temp_csv (fid 141, line in csv1), fetching them
+            in batches of INP_CURSOR_BATCH_SIZE rows through a named server-side cursor of the task connection
+            (a plain cursor if the connection is in autocommit mode) """
+
+        sql = (f"SELECT csv1 FROM {lib_vars.schema_name}.temp_csv "
+               f"WHERE fid = 141 AND cur_user = current_user ORDER BY id")
+        batches = iter_batches(self.aux_conn, sql, INP_CURSOR_BATCH_SIZE, name=f"gw_inp_export_{id(self)}")
+        try:
+            for rows in batches:
+                if self.is_canceled():
+                    break
+                self.inp_cursor_rows += len(rows)
+                for row in rows:
+                    yield {"text": row[0]}
+        except Exception as e:
+            self.error_msg = f"Error reading inp lines from database [{type(e).__name__}]: {e}"
+            tools_log.log_warning(self.error_msg)
+        finally:
+            batches.close()
+
+
     def _fill_inp_file(self, folder_path=None, all_rows=None):
+        """ Write the inp file and, for ud projects with networkmode 2, the additional .dat file in one pass.
+            @all_rows can be any iterable of rows {"text": line}, so they can be consumed while they are fetched """
 
         tools_log.log_info(f"Write inp file........: {folder_path}")
 
-        # Generate generic INP file
-        file_inp = open(folder_path, "w", errors='replace')
-        read = True
-        for row in all_rows:
-            # Use regexp to check which targets to read (everyone except GULLY)
-            if bool(re.match('\[(.*?)\]', row['text'])) and \
-                    ('GULLY' in row['text'] or 'LINK' in row['text'] or
-                     'GRATE' in row['text'] or 'LXSECTIONS' in row['text']):
-                read = False
-            elif bool(re.match('\[(.*?)\]', row['text'])):
-                read = True
-            if row.get('text') is not None and read:
-                line = row['text'].rstrip() + "\n"
-                file_inp.write(line)
+        with self.step_timer.step("Write inp file") as timing:
+            timing['rows'] = self._write_inp_file(folder_path, all_rows)
+            timing['bytes'] = os.path.getsize(folder_path)
 
-        self._close_file(file_inp)
 
-        networkmode = tools_gw.get_config_value('inp_options_networkmode')
-        if global_vars.project_type == 'ud' and networkmode and networkmode[0] == "2":
+    def _write_inp_file(self, folder_path, all_rows):
+        """ Write the files of _fill_inp_file. Returns the number of rows written into the inp file """
 
+        # Generate generic INP file and the aditional file with the targets excluded from it
+        file_inp = open(folder_path, "w", errors='replace', buffering=INP_BUFFER_SIZE)
+        aditional_file = None
+        if global_vars.project_type == 'ud' and self.networkmode and self.networkmode[0] == "2":
             # Replace extension .inp
             aditional_path = folder_path.replace('.inp', f'.dat')
-            aditional_file = open(aditional_path, "w", errors='replace')
-            read = True
-            save_file = False
-            for row in all_rows:
-                # Use regexp to check which targets to read (only TITLE and aditional target)
-                if bool(re.match('\[(.*?)\]', row['text'])) and \
-                        ('GULLY' in row['text'] or 'LINK' in row['text'] or
-                         'GRATE' in row['text'] or 'LXSECTIONS' in row['text']):
-
-                    read = True
-                    if 'GULLY' in row['text'] or 'LINK' in row['text'] or \
-                       'GRATE' in row['text'] or 'LXSECTIONS' in row['text']:
-                        save_file = True
-                elif bool(re.match('\[(.*?)\]', row['text'])):
-                    read = False
-
-                if row.get('text') is not None and read:
-
-                    line = row['text'].rstrip() + "\n"
-
-                    if not bool(re.match(';;-(.*?)', row['text'])) and not bool(re.match('\[(.*?)', row['text'])):
-                        line = re.sub(';;', '', line)
-                        line = re.sub(' +', ' ', line)
-                        aditional_file.write(line)
+            aditional_file = open(aditional_path, "w", errors='replace', buffering=INP_BUFFER_SIZE)
+
+        # Everyone except GULLY targets goes to the inp file, only GULLY targets (and lines before the first target)
+        # go to the aditional file
+        read_inp = True
+        read_dat = True
+        save_file = False
+        is_dat_target = {}
+        row_count = 0
+        for row in all_rows:
+            text = row.get('text')
+            if text is None:
+                continue
 
-            self._close_file(aditional_file)
+            is_target = re_inp_target.match(text) is not None
+            if is_target:
+                if text not in is_dat_target:
+                    is_dat_target[text] = any(target in text for target in INP_DAT_TARGETS)
+                read_inp = not is_dat_target[text]
+                read_dat = is_dat_target[text]
+                save_file = save_file or read_dat
+
+            line = text.rstrip() + "\n"
+            if read_inp:
+                file_inp.write(line)
+                row_count += 1
+            if aditional_file and read_dat and not text.startswith(';;-') and not text.startswith('['):
+                line = line.replace(';;', '')
+                line = re_multiple_spaces.sub(' ', line)
+                aditional_file.write(line)
+
+        self._close_file(file_inp)
 
+        if aditional_file:
+            self._close_file(aditional_file)
             if save_file is False:
                 os.remove(aditional_path)
 
+        return row_count
+
 
     def _execute_epa(self):
 
-        if self.isCanceled():
+        if self.is_canceled():
             return False
 
         tools_log.log_info(f"Execute EPA software")
@@ -354,26 +469,129 @@ class GwEpaFileManager(GwTask):
             return False
 
         # Set file to execute
-        opener = None
-        if global_vars.project_type in 'ws':
-            opener = f"{lib_vars.plugin_dir}{os.sep}resources{os.sep}epa{os.sep}epanet{os.sep}epanet.exe"
-        elif global_vars.project_type in 'ud':
-            opener = f"{lib_vars.plugin_dir}{os.sep}resources{os.sep}epa{os.sep}swmm{os.sep}swmm5.exe"
-
+        opener = self.epa_opener
         if opener is None:
+            self.error_msg = f"EPA software not found for project type '{global_vars.project_type}'"
             return False
 
-        if not os.path.exists(opener):
-            self.error_msg = f"File not found: {opener}"
+        with self.step_timer.step("EPA software") as timing:
+            status = self._run_epa_process([opener, self.file_inp, self.file_rpt])
+            if os.path.exists(self.file_rpt):
+                timing['bytes'] = os.path.getsize(self.file_rpt)
+        if not status:
             return False
-
-        subprocess.call([opener, self.file_inp, self.file_rpt], shell=False)
         self.common_msg += "EPA model finished. "
         self.step_completed.emit({"message": {"level": 1, "text": "EPA model finished."}}, "\n")
 
         return True
 
 
+    def _run_epa_process(self, args):
+        """ Run the EPA software as a child process that is killed if the task is canceled.
+            Its output is read in a separate thread to set the progress of the task """
+
+        total_hours = self._get_simulation_hours(self.file_inp)
+        try:
+            # Don't open a console window for the EPA software on Windows
+            creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+            self.epa_process = subprocess.Popen(args, shell=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                creationflags=creationflags)
+        except OSError as e:
+            self.error_msg = f"Error executing EPA software '{args[0]}': {e}"
+            return False
+
+        reader = threading.Thread(target=self._read_epa_output, args=(self.epa_process.stdout, total_hours),
+                                  daemon=True)
+        reader.start()
+        while self.epa_process.poll() is None:
+            if self.is_canceled():
+                self.epa_process.kill()
+                self.epa_process.wait()
+                break
+            time.sleep(EPA_POLL_INTERVAL)
+        reader.join(EPA_POLL_INTERVAL)
+
+        returncode = self.epa_process.returncode
+        self.epa_process = None
+        if self.is_canceled():
+            return False
+        if returncode != 0:
+            tools_log.log_warning(f"EPA software finished with return code {returncode}")
+
+        return True
+
+
+    def _read_epa_output(self, stdout, total_hours):
+        """ Set the progress of the task from the output of the EPA software.
+            Lines are separated by '\\r' and '\\b' too, because engines rewrite the same console line """
+
+        buffer = ""
+        for data in iter(partial(stdout.read1, 1024), b''):
+            buffer += data.decode(errors='replace')
+            lines = re_epa_separators.split(buffer)
+            buffer = lines.pop()
+            for line in lines:
+                progress = self._get_epa_progress(line, total_hours)
+                if progress is not None:
+                    self.set_progress(min(progress, 100))
+        stdout.close()
+
+
+    def _get_epa_progress(self, line, total_hours):
+        """ Get the progress of the simulation (0-100) from one output line of the EPA software, or None """
+
+        match = re_epa_percent.search(line)
+        if match:
+            return int(match.group(1))
+        if not total_hours:
+            return None
+
+        # SWMM: 'Simulating day: 12  hour: 3'. EPANET: 'Computing hydraulics at hour 12:00:00'
+        match = re_epa_day_hour.search(line)
+        if match:
+            return (int(match.group(1)) * 24 + int(match.group(2))) * 100 / total_hours
+        match = re_epa_hour.search(line)
+        if match:
+            return int(match.group(1)) * 100 / total_hours
+
+        return None
+
+
+    def _get_simulation_hours(self, file_inp):
+        """ Get the duration in hours of the simulation from [OPTIONS] (SWMM) or [TIMES] (EPANET) of the inp file """
+
+        options = {}
+        target = None
+        try:
+            with open(file_inp, "r", errors='replace') as file:
+                for row in file:
+                    row = row.split(';')[0].strip()
+                    if row.startswith('['):
+                        target = row.upper()
+                        continue
+                    if target in ('[OPTIONS]', '[TIMES]') and row:
+                        values = row.split(None, 1)
+                        if len(values) == 2:
+                            options[values[0].upper()] = values[1].strip()
+        except OSError:
+            return None
+
+        try:
+            if 'START_DATE' in options and 'END_DATE' in options:
+                start = datetime.strptime(f"{options['START_DATE']} {options.get('START_TIME', '00:00:00')}",
+                                          "%m/%d/%Y %H:%M:%S")
+                end = datetime.strptime(f"{options['END_DATE']} {options.get('END_TIME', '00:00:00')}",
+                                        "%m/%d/%Y %H:%M:%S")
+                return (end - start).total_seconds() / 3600
+            if 'DURATION' in options:
+                duration = options['DURATION'].split()[0].split(':')
+                return int(duration[0]) + (int(duration[1]) / 60 if len(duration) > 1 else 0)
+        except (ValueError, IndexError):
+            pass
+
+        return None
+
+
     def _import_rpt(self):
         """ Import result file """
 
@@ -383,6 +601,24 @@ class GwEpaFileManager(GwTask):
         self.json_rpt = None
         status = False
         try:
+            copy = tools_gw.get_config_parser('btn_go2epa', 'rpt_copy_import', "user", "init", prefix=False)
+            if tools_os.set_boolean(copy, default=False):
+                if self._check_function_key('gw_fct_rpt2pg_main', 'stagedRows'):
+                    tools_log.log_info(f"Task 'Go2Epa' execute function 'def _import_rpt_copy' with parameters: '{self.file_rpt}'")
+                    status = self._import_rpt_copy(self.file_rpt)
+                    return status
+                tools_log.log_warning("Function 'gw_fct_rpt2pg_main' of the database doesn't read staged rows "
+                                      "(option 'rpt_copy_import'), the rpt file is imported in a single call")
+
+            chunked = tools_gw.get_config_parser('btn_go2epa', 'rpt_chunked_import', "user", "init", prefix=False)
+            if tools_os.set_boolean(chunked, default=False):
+                if self._check_function_key('gw_fct_rpt2pg_main', 'chunk'):
+                    tools_log.log_info(f"Task 'Go2Epa' execute function 'def _import_rpt_chunked' with parameters: '{self.file_rpt}'")
+                    status = self._import_rpt_chunked(self.file_rpt)
+                    return status
+                tools_log.log_warning("Function 'gw_fct_rpt2pg_main' of the database doesn't support chunked imports "
+                                      "(option 'rpt_chunked_import'), the rpt file is imported in a single call")
+
             # Call import function
             tools_log.log_info(f"Task 'Go2Epa' execute function 'def _read_rpt_file' with parameters: '{self.file_rpt}'")
             status = self._read_rpt_file(self.file_rpt)
@@ -397,167 +633,375 @@ class GwEpaFileManager(GwTask):
 
 
     def _read_rpt_file(self, file_path=None):
+        """ Parse the rpt file into self.json_rpt, the payload of the single call to gw_fct_rpt2pg_main.
+            The whole payload is kept in memory, so it grows with the size of the file. Only the chunked import
+            (option 'rpt_chunked_import', if the database supports it) keeps memory independent of the file size
+        """
+
+        self._manage_rpt_velocities(file_path)
+
+        # Each chunk is written to the payload as soon as it is parsed and then dropped, so the parsed rows are not
+        # kept along with their text
+        payload = io.StringIO()
+        payload.write('[')
+        separator = ''
+        for chunk in self._iter_rpt_chunks(file_path, self._get_rpt_chunk_size()):
+            if chunk:
+                payload.write(separator)
+                payload.write(json.dumps(chunk)[1:-1])
+                separator = ', '
+            del chunk
+
+        if self.is_canceled() or self.error_msg:
+            return False
+
+        # Manage JSON
+        payload.write(']')
+        self.json_rpt = payload.getvalue()
+
+        return True
+
+
+    def _import_rpt_chunked(self, file_path):
+        """ Import the rpt file calling step 1 of gw_fct_rpt2pg_main once per chunk of parsed rows and step 2 once.
+            Parsed chunks are spooled into '{file_path}.chunks' and the number of imported chunks is saved into
+            '{file_path}.import', so an interrupted import resumes from there without parsing the file again """
+
+        spool_path = f"{file_path}.chunks"
+        state = self._get_rpt_import_state(file_path)
+        if state is None:
+            self._manage_rpt_velocities(file_path)
+            chunk_count = self._spool_rpt_file(file_path, spool_path)
+            if chunk_count is None:
+                return False
+            state = {"file": file_path, "resultId": self.result_name, "size": os.path.getsize(file_path),
+                     "mtime": os.path.getmtime(file_path), "chunks": chunk_count, "imported": 0}
+            self._save_rpt_import_state(file_path, state)
+        else:
+            msg = f"Resume rpt import from chunk {state['imported'] + 1} of {state['chunks']}"
+            tools_log.log_info(msg)
+            self.step_completed.emit({"message": {"level": 1, "text": msg}}, "\n")
+
+        self.rpt_chunk = state['imported']
+        with open(spool_path, "r", encoding='utf-8') as spool:
+            for chunk_index, json_chunk in enumerate(spool):
+                if chunk_index < state['imported']:
+                    continue
+                if self.is_canceled():
+                    return False
+
+                extras = f'"chunk": {{"index": {chunk_index}, "count": {state["chunks"]}}}, "file": {json_chunk.rstrip()}'
+                if not self._exec_rpt2pg_step(1, extras, emit=False):
+                    return False
+
+                # Record the reached chunk so that a failed or canceled import can be resumed
+                state['imported'] = chunk_index + 1
+                self.rpt_chunk = state['imported']
+                self._save_rpt_import_state(file_path, state)
+                self.set_progress(state['imported'] * 100 / state['chunks'])
+
+        msg = f"Imported {state['chunks']} chunks of rpt rows"
+        self.step_completed.emit({"message": {"level": 1, "text": msg}}, "\n")
+
+        if not self._exec_rpt2pg_step(2):
+            return False
+
+        self._remove_rpt_import_state(file_path)
+        # final message
+        self.common_msg += "Import RPT file finished."
+
+        return True
+
+
+    def _import_rpt_copy(self, file_path):
+        """ Load the parsed rpt rows into temp_csv with COPY and call gw_fct_rpt2pg_main telling it to read them
+            from there ("stagedRows") instead of receiving them in the "file" parameter """
+
+        self._manage_rpt_velocities(file_path)
+
+        sql = f"DELETE FROM temp_csv WHERE fid = {self.fid} AND cur_user = current_user;"
+        tools_db.execute_sql(sql, aux_conn=self.aux_conn, is_thread=True)
+
+        rows = self._iter_rpt_csv_rows(file_path)
+        with self.step_timer.step("Copy rpt rows into temp_csv") as timing:
+            total = tools_gw.copy_rows('temp_csv', rows, aux_conn=self.aux_conn, batch_size=self._get_rpt_chunk_size())
+            timing['rows'] = total
+        if self.is_canceled() or self.error_msg:
+            return False
+        if total is None:
+            self.error_msg = f"Error loading rpt file into temp_csv: {lib_vars.session_vars['last_error']}"
+            return False
+
+        # Step 1 reads the rows from temp_csv: there must be rows staged for the current user
+        sql = f"SELECT count(*) FROM temp_csv WHERE fid = {self.fid} AND cur_user = current_user;"
+        row = tools_db.get_row(sql, log_sql=False, aux_conn=self.aux_conn)
+        if not row or not row[0]:
+            self.error_msg = f"No rpt rows staged in temp_csv to import ({total} rows loaded)"
+            return False
+
+        msg = f"Loaded {total} rpt rows into temp_csv"
+        tools_log.log_info(msg)
+        self.step_completed.emit({"message": {"level": 1, "text": msg}}, "\n")
+
+        for step in range(1, 3):
+            extras = None
+            if step == 1:
+                extras = f'"stagedRows": true'
+            if not self._exec_rpt2pg_step(step, extras):
+                return False
+        # final message
+        self.common_msg += "Import RPT file finished."
+
+        return True
+
+
+    def _iter_rpt_csv_rows(self, file_path):
+        """ Yield the parsed rpt rows as dicts {temp_csv column: value} """
+
+        for chunk in self._iter_rpt_chunks(file_path, self._get_rpt_chunk_size()):
+            for rpt_row in chunk:
+                csv_row = {"fid": self.fid, "source": rpt_row.pop("target"), "csv40": rpt_row.pop("col40")}
+                for column, value in rpt_row.items():
+                    csv_row[column.replace("col", "csv")] = value
+                yield csv_row
+
+
+    def _spool_rpt_file(self, file_path, spool_path):
+        """ Parse the rpt file writing one json array per line into @spool_path. Returns the number of chunks """
+
+        chunk_count = 0
+        with open(spool_path, "w", encoding='utf-8') as spool:
+            for chunk in self._iter_rpt_chunks(file_path, self._get_rpt_chunk_size()):
+                spool.write(json.dumps(chunk) + "\n")
+                chunk_count += 1
+            # Step 1 is always called at least once, as in the not chunked import
+            if chunk_count == 0:
+                spool.write("[]\n")
+                chunk_count = 1
+
+        if self.is_canceled() or self.error_msg:
+            os.remove(spool_path)
+            return None
+
+        return chunk_count
+
+
+    def _get_rpt_import_state(self, file_path):
+        """ Get the state of a previous interrupted chunked import of @file_path, if it can be resumed """
+
+        state_path = f"{file_path}.import"
+        if not os.path.exists(state_path) or not os.path.exists(f"{file_path}.chunks"):
+            return None
+
+        try:
+            with open(state_path, "r", encoding='utf-8') as state_file:
+                state = json.load(state_file)
+            # The rpt file or the result must not have changed since the interrupted import
+            if state['resultId'] != self.result_name or state['size'] != os.path.getsize(file_path) \
+                    or state['mtime'] != os.path.getmtime(file_path) or state['imported'] > state['chunks']:
+                return None
+        except Exception as e:
+            tools_log.log_warning(f"Exception reading rpt import state [{type(e).__name__}]: {e}")
+            return None
+
+        return state
+
+
+    def _save_rpt_import_state(self, file_path, state):
+
+        with open(f"{file_path}.import", "w", encoding='utf-8') as state_file:
+            json.dump(state, state_file)
+
+
+    def _remove_rpt_import_state(self, file_path):
+
+        for path in (f"{file_path}.import", f"{file_path}.chunks"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+    def _check_function_key(self, function_name, key):
+        """ Check if the database function @function_name reads the key @key of its parameters.
+            Optional import/export modes are only used when the function of the database supports them """
+
+        if (function_name, key) not in self.function_keys:
+            schema_name = lib_vars.schema_name.replace('"', '')
+            # The key is read as ->>'key' or in a path #>>'{data,key}'
+            sql = (f"SELECT bool_or(p.prosrc ~ '[''{{,]{key}['',}}]') FROM pg_proc p "
+                   f"JOIN pg_namespace n ON n.oid = p.pronamespace "
+                   f"WHERE p.proname = '{function_name}' AND n.nspname = '{schema_name}'")
+            row = tools_db.get_row(sql, log_sql=False, aux_conn=self.aux_conn)
+            self.function_keys[(function_name, key)] = bool(row and row[0])
+
+        return self.function_keys[(function_name, key)]
+
+
+    def _get_rpt_chunk_size(self):
+
+        chunk_size = tools_gw.get_config_parser('btn_go2epa', 'rpt_chunk_size', "user", "init", prefix=False)
+        try:
+            chunk_size = max(int(chunk_size), 1)
+        except (TypeError, ValueError):
+            chunk_size = 5000
+
+        return chunk_size
+
+
+    def _manage_rpt_velocities(self, file_path):
 
         replace = tools_gw.get_config_parser('btn_go2epa', 'force_import_velocity_higher_50ms', "user", "init", prefix=False)
         if tools_os.set_boolean(replace, default=False) and global_vars.project_type == 'ud':
-            # Replace the velocities
-            try:
-                # Read the contents of the file
-                with open(file_path, "r+", errors='replace') as file:
-                    contents = file.read()
-                # Save a backup of the file
-                with open(f"{file_path}.old", 'w', encoding='utf-8', errors='replace') as file:
-                    file.write(contents)
-                # Replace the words
-                old_contents = contents
-                contents = tools_os.ireplace('>50', '50', contents)
-                if contents != old_contents:
-                    self.replaced_velocities = True
-                # Write the file with new contents
-                with open(file_path, "r+", errors='replace') as file:
-                    file.write(contents)
-                with open(f"{file_path}", 'w', encoding='utf-8', errors='replace') as file:
-                    file.write(contents)
-            except Exception as e:
-                tools_log.log_error(f"Exception when replacing rpt velocities: {e}")
-
-        self.file_rpt = open(file_path, "r+", errors='replace')
-        full_file = self.file_rpt.readlines()
-        progress = 0
-
-        # Create dict with sources
+            self._replace_rpt_velocities(file_path)
+
+
+    def _replace_rpt_velocities(self, file_path):
+        """ Replace '>50' velocities of the rpt file line by line, keeping a backup in '{file_path}.old' """
+
+        try:
+            backup_path = f"{file_path}.old"
+            shutil.copyfile(file_path, backup_path)
+            with open(backup_path, "r", errors='replace') as backup_file, \
+                    open(file_path, "w", encoding='utf-8', errors='replace') as file:
+                for row in backup_file:
+                    new_row = tools_os.ireplace('>50', '50', row)
+                    if new_row != row:
+                        self.replaced_velocities = True
+                    file.write(new_row)
+        except Exception as e:
+            tools_log.log_error(f"Exception when replacing rpt velocities: {e}")
+
+
+    def _get_rpt_sources(self):
+        """ Get dict of rpt targets {first tokens of the line: tablename} from config_fprocess """
+
         sql = f"SELECT tablename, target FROM config_fprocess WHERE fid = {self.fid};"
         rows = tools_db.get_rows(sql)
         sources = {}
-        for row in rows:
-            json_elem = row[1].replace('{', '').replace('}', '')
-            item = json_elem.split(',')
-            for i in item:
-                sources[i.strip()] = row[0].strip()
-
-        # While we don't find a match with the target, target and col40 must be null
-        target = "null"
-        col40 = "null"
-        json_rpt = ""
-        # noinspection PyUnusedLocal
-        row_count = sum(1 for rows in full_file)
-
-        for line_number, row in enumerate(full_file):
-
-            if self.isCanceled():
-                return False
+        if rows:
+            for row in rows:
+                json_elem = row[1].replace('{', '').replace('}', '')
+                item = json_elem.split(',')
+                for i in item:
+                    sources[i.strip()] = row[0].strip()
 
-            progress += 1
-            if '**' in row or '--' in row:
-                continue
+        return sources
+
+
+    def _iter_rpt_chunks(self, file_path, chunk_size):
+        """ Read the rpt file line by line and yield its parsed rows in lists of at most @chunk_size rows.
+            Stops yielding when the task is canceled or the file is not valid (self.error_msg is set) """
+
+        tokenizer = GwRptTokenizer(self._get_rpt_sources())
+        chunk = []
+        file_size = os.path.getsize(file_path) or 1
+        read_size = 0
+        # Only the time spent parsing is recorded, not the time the consumer of the chunks spends with them
+        self.step_timer.add("Parse rpt file", 0, bytes=file_size)
+        t0 = time.perf_counter()
+
+        with open(file_path, "r", errors='replace') as file:
+            for line_number, row in enumerate(file):
+
+                if self.is_canceled():
+                    return
+
+                # Update progress bar
+                read_size += len(row)
+                if line_number % 1000 == 0:
+                    self.set_progress(min(read_size * 100 / file_size, 100))
+
+                if '**' in row or '--' in row:
+                    continue
 
-            row = row.rstrip()
-            dirty_list = row.split(' ')
-
-            # Clean unused items
-            for x in range(len(dirty_list) - 1, -1, -1):
-                if dirty_list[x] == '':
-                    dirty_list.pop(x)
-
-            sp_n = []
-            if len(dirty_list) > 0:
-                for x in range(0, len(dirty_list)):
-                    if bool(re.search('[0-9][-]\d{1,2}[.]]*', str(dirty_list[x]))):
-                        last_index = 0
-                        for i, c in enumerate(dirty_list[x]):
-                            if "-" == c:
-                                json_elem = dirty_list[x][last_index:i]
-                                last_index = i
-                                sp_n.append(json_elem)
-
-                        # noinspection PyUnboundLocalVariable
-                        json_elem = dirty_list[x][last_index:i]
-                        sp_n.append(json_elem)
-
-                    elif bool(re.search('(\d\..*\.\d)', str(dirty_list[x]))):
-                        if 'Version' not in dirty_list and 'VERSION' not in dirty_list:
-                            error_near = f"Error near line {line_number+1} -> {dirty_list}"
-                            tools_log.log_info(error_near)
-                            message = (f"The rpt file is not valid to import. "
-                                       f"Because columns on rpt file are overlaped, it seems you need to improve your simulation. "
-                                       f"Please ckeck and fix it before continue. \n"
-                                       f"{error_near}")
-                            self.error_msg = message
-                            return False
-                    elif bool(re.search('>50', str(dirty_list[x]))):
-                        error_near = f"Error near line {line_number+1} -> {dirty_list}"
-                        tools_log.log_info(error_near)
-                        message = (f"The rpt file is not valid to import. "
-                                   f"Because velocity has not numeric value (>50), it seems you need to improve your simulation. "
-                                   f"Please ckeck and fix it before continue. \n"
-                                   f"{error_near}")
-                        self.error_msg = message
-                        return False
-                    else:
-                        sp_n.append(dirty_list[x])
-
-            # Find strings into dict and set target column
-            for k, v in sources.items():
                 try:
-                    if k in (f'{sp_n[0]} {sp_n[1]}', f'{sp_n[0]}'):
-                        target = "'" + v + "'"
-                        _time = re.compile('^([012]?[0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]$')
-                        if _time.search(sp_n[3]):
-                            col40 = "'" + sp_n[3] + "'"
-                except IndexError:
-                    pass
-                except Exception as e:
-                    tools_log.log_info(type(e).__name__)
-
-            if len(sp_n) > 0:
-                json_elem = f'"target": "{target}", "col40": "{col40}", '
-                for x in range(0, len(sp_n)):
-                    json_elem += f'"col{x + 1}":'
-                    if "''" not in sp_n[x]:
-                        value = '"' + sp_n[x].strip().replace("\n", "") + '", '
-                        value = value.replace("''", "null")
-                    else:
-                        value = 'null, '
-                    json_elem += value
-
-                json_elem = '{' + str(json_elem[:-2]) + '}, '
-                json_rpt += json_elem
-
-            # Update progress bar
-            if progress % 1000 == 0:
-                self.setProgress((line_number * 100) / row_count)
+                    sp_n = tokenizer.tokenize(row)
+                except GwRptLineError as e:
+                    self._set_rpt_line_error(e, line_number)
+                    return
 
-        # Manage JSON
-        json_rpt = '[' + str(json_rpt[:-2]) + ']'
-        self.json_rpt = json_rpt
+                if len(sp_n) > 0:
+                    chunk.append(self._build_rpt_row(sp_n, tokenizer.target, tokenizer.col40))
+                    if len(chunk) >= chunk_size:
+                        self._add_parse_time(t0, len(chunk))
+                        yield chunk
+                        t0 = time.perf_counter()
+                        chunk = []
 
-        self._close_file()
+        self._add_parse_time(t0, len(chunk))
+        if chunk:
+            yield chunk
 
-        return True
+
+    def _add_parse_time(self, t0, rows):
+
+        record = self.step_timer.steps["Parse rpt file"]
+        record['seconds'] += time.perf_counter() - t0
+        record['rows'] = (record['rows'] or 0) + rows
+
+
+    def _set_rpt_line_error(self, error, line_number):
+
+        error_near = f"Error near line {line_number+1} -> {error.tokens}"
+        tools_log.log_info(error_near)
+        if error.reason == 'overlap':
+            reason = "Because columns on rpt file are overlaped"
+        else:
+            reason = "Because velocity has not numeric value (>50)"
+        message = (f"The rpt file is not valid to import. "
+                   f"{reason}, it seems you need to improve your simulation. "
+                   f"Please ckeck and fix it before continue. \n"
+                   f"{error_near}")
+        self.error_msg = message
+
+
+    def _build_rpt_row(self, sp_n, target, col40):
+        """ Build the dict of one rpt row as expected by gw_fct_rpt2pg_main """
+
+        rpt_row = {"target": target, "col40": col40}
+        for x, value in enumerate(sp_n):
+            rpt_row[f"col{x + 1}"] = value.strip() if "''" not in value else None
+
+        return rpt_row
 
 
     def _exec_import_function(self):
         """ Call function gw_fct_rpt2pg_main """
 
         for step in range(1, 3):
-            extras = f'"step":"{step}", "resultId":"{self.result_name}"'
+            extras = None
             if step == 1 and self.json_rpt:
-                extras += f', "file": {self.json_rpt}'
-            self.body = tools_gw.create_body(extras=extras)
+                extras = f'"file": {self.json_rpt}'
+            if not self._exec_rpt2pg_step(step, extras):
+                return False
+        # final message
+        self.common_msg += "Import RPT file finished."
+
+        return True
+
+
+    def _exec_rpt2pg_step(self, step, extras=None, emit=True):
+        """ Call step @step of function gw_fct_rpt2pg_main, with optional @extras """
+
+        step_extras = f'"step":"{step}", "resultId":"{self.result_name}"'
+        if extras:
+            step_extras += f', {extras}'
+        self.body = tools_gw.create_body(extras=step_extras)
+        with self.step_timer.step(f"gw_fct_rpt2pg_main step {step}"):
             self.json_result = tools_gw.execute_procedure('gw_fct_rpt2pg_main', self.body,
                                                           aux_conn=self.aux_conn, is_thread=True)
-            self.rpt_result = self.json_result
-            if self.json_result is None or not self.json_result:
-                self.function_failed = True
-                return False
+        self.rpt_result = self.json_result
+        if self.json_result is None or not self.json_result:
+            self.function_failed = True
+            return False
 
-            if self.json_result.get('status') == 'Failed':
-                tools_log.log_warning(self.json_result)
-                self.function_failed = True
-                return False
+        if self.json_result.get('status') == 'Failed':
+            tools_log.log_warning(self.json_result)
+            self.function_failed = True
+            return False
+        if emit:
             self.step_completed.emit(self.json_result, "\n")
-        # final message
-        self.common_msg += "Import RPT file finished."
 
         return True
 
@@ -0,0 +1,67 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsFeatureRequest, QgsVectorLayerFeatureSource
+
+from .task import GwTask
+from ..utils.network_graph import GwNetworkGraph
+from ...libs import tools_db, tools_log
+
+
+class GwNetworkGraphLoad(GwTask):
+    """ Build the network graph from the arcs of layer 'v_edit_arc' (and the valves of table 'man_valve' in WS) """
+
+    graph_loaded = pyqtSignal(object)
+
+    def __init__(self, description, layer_arc, project_type):
+
+        super().__init__(description)
+        self.project_type = project_type
+        self.graph = None
+        # The feature source is a snapshot of the layer that can be read from the task thread
+        self.source = QgsVectorLayerFeatureSource(layer_arc)
+        self.fields = layer_arc.fields()
+
+
+    def run(self):
+
+        super().run()
+
+        try:
+            valves = []
+            if self.project_type == 'ws':
+                sql = "SELECT json_agg(json_build_array(node_id, closed, broken)) FROM man_valve"
+                row = tools_db.get_row(sql, log_sql=False, aux_conn=self.aux_conn)
+                valves = row[0] or [] if row else []
+
+            request = QgsFeatureRequest()
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+            request.setSubsetOfAttributes(['arc_id', 'node_1', 'node_2'], self.fields)
+            arcs = []
+            for feature in self.source.getFeatures(request):
+                if self.isCanceled():
+                    return False
+                # NULL values of the layer are falsy
+                arcs.append((feature['arc_id'], feature['node_1'] or None, feature['node_2'] or None, feature.id()))
+
+            self.graph = GwNetworkGraph().build(arcs, valves)
+            return True
+
+        except Exception as e:
+            self.exception = e
+            return False
+
+
+    def finished(self, result):
+
+        super().finished(result)
+
+        if result and self.graph is not None:
+            tools_log.log_info(f"Network graph loaded: {len(self.graph)} arcs, {len(self.graph.node_ids)} nodes")
+            self.graph_loaded.emit(self.graph)
+
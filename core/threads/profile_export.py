@@ -0,0 +1,240 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from qgis.PyQt.QtCore import pyqtSignal
+
+from .task import GwTask
+from ..utils import tools_gw
+from ...libs import tools_log, tools_qgis
+
+PROFILE_POLL_INTERVAL = 0.2     # Seconds between checks of the worker processes for a cancel of the task
+
+
+class GwProfileExportItem:
+    """ Saved profile to export: its values (result of gw_fct_getprofilevalues), or the body to get them """
+
+    def __init__(self, profile_id, key, body, result=None, title=None, date=None):
+
+        self.profile_id = profile_id
+        self.key = key
+        self.body = body
+        self.result = result
+        self.title = title
+        self.date = date
+        self.files = []
+        self.status = None
+        self.error_msg = None
+        self.none_values = []
+
+
+class GwProfileExport(GwTask):
+    """ Export saved profiles to png and/or pdf files in @folder, without the profile window.
+        Values of the profiles are got one after another, and every profile is drawn as soon as its values are
+        received by a worker process (with the Agg backend), up to @pool_size processes at the same time.
+        An index of the profiles and their files is written to 'index.csv' in @folder
+    """
+
+    profile_progress = pyqtSignal(str, int, str)
+    values_loaded = pyqtSignal(object, object)
+
+    def __init__(self, description, items, folder, formats=('png',), dpi=300, pool_size=None, python_path=None):
+
+        super().__init__(description)
+        self.items = items
+        self.folder = folder
+        self.formats = formats
+        self.dpi = dpi
+        self.pool_size = pool_size or os.cpu_count() or 1
+        self.python_path = python_path or _get_python_path()
+        self.renderer_path = os.path.join(os.path.dirname(__file__), os.pardir, 'utils', 'profile_renderer.py')
+        self.index_path = os.path.join(folder, 'index.csv')
+        self.done = 0
+        self.names = set()          # Names of the files already used, in lower case
+
+
+    def run(self):
+
+        super().run()
+
+        try:
+            pending = {}
+            with tempfile.TemporaryDirectory(prefix='gw_profiles_') as temp_folder, \
+                    ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+                for item in self.items:
+                    if self.isCanceled():
+                        break
+
+                    job_path = self._write_job(item, temp_folder)
+                    if job_path is not None:
+                        self.profile_progress.emit(item.profile_id, 50, "Draw")
+                        pending[executor.submit(self._run_worker, item, job_path)] = item
+
+                    # Collect the profiles already drawn before getting the values of the next one
+                    self._collect_finished(pending, block=False)
+
+                self._collect_finished(pending, block=True)
+
+            self._write_index()
+            return not self.isCanceled() and all(item.status for item in self.items)
+
+        except Exception as e:
+            self.exception = e
+            return False
+
+
+    def finished(self, result):
+
+        super().finished(result)
+
+        if self.isCanceled():
+            return
+
+        exported = sum(1 for item in self.items if item.status)
+        for item in self.items:
+            if not item.status:
+                tools_log.log_warning(f"Profile '{item.profile_id}' not exported: {item.error_msg}")
+        tools_qgis.show_info(f"Profile export finished: {exported} of {len(self.items)} profiles exported",
+                             parameter=self.index_path)
+
+
+    # region private functions
+
+    def _write_job(self, item, temp_folder):
+        """ Get the values of @item if they are not cached and write the job of its worker process.
+            Return the path of the job file or None if the profile can't be drawn
+        """
+
+        if item.result is None:
+            self.profile_progress.emit(item.profile_id, 0, "Get values")
+            item.result = tools_gw.execute_procedure('gw_fct_getprofilevalues', item.body, log_sql=False,
+                                                     aux_conn=self.aux_conn, is_thread=True)
+            self.values_loaded.emit(item.key, item.result)
+
+        result = item.result
+        if not result or result.get('status') == 'Failed':
+            self._set_item_status(item, False, "gw_fct_getprofilevalues failed")
+            return None
+        message = result.get('message')
+        if message and int(message.get('level', 3)) != 3:
+            self._set_item_status(item, False, message.get('text'))
+            return None
+
+        name = self._get_file_name(item.profile_id)
+        item.files = [os.path.join(self.folder, f"{name}.{file_format}") for file_format in self.formats]
+        job = {'data': result['body']['data'], 'title': item.title, 'date': item.date, 'files': item.files,
+               'dpi': self.dpi}
+        job_path = os.path.join(temp_folder, f"{name}.json")
+        with open(job_path, 'w', encoding='utf-8') as job_file:
+            json.dump(job, job_file)
+        return job_path
+
+
+    def _run_worker(self, item, job_path):
+        """ Draw the profile of @job_path in a child process that is killed if the task is canceled.
+            Return the output of the process """
+
+        # Don't open a console window for every worker on Windows
+        creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+        process = subprocess.Popen([self.python_path, self.renderer_path, job_path], shell=False,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=creationflags)
+        while process.poll() is None:
+            if self.isCanceled():
+                process.kill()
+                process.wait()
+                raise RuntimeError("Canceled")
+            time.sleep(PROFILE_POLL_INTERVAL)
+
+        stdout, stderr = process.communicate()
+        if process.returncode != 0:
+            error = stderr.decode(errors='replace').strip().splitlines()
+            raise RuntimeError(error[-1] if error else f"Return code {process.returncode}")
+        return json.loads(stdout.decode(errors='replace').strip().splitlines()[-1])
+
+
+    def _get_file_name(self, profile_id):
+        """ Get the name of the files of @profile_id, adding a counter if another profile already uses it
+            (different ids can give the same name once their invalid characters are replaced) """
+
+        base_name = re.sub(r'[^\w\-. ]', '_', str(profile_id))
+        name = base_name
+        counter = 1
+        # File names are compared in lower case, as in case insensitive file systems
+        while name.lower() in self.names:
+            counter += 1
+            name = f"{base_name}_{counter}"
+        self.names.add(name.lower())
+        return name
+
+
+    def _collect_finished(self, pending, block):
+        """ Set the status of the profiles whose worker has finished. If @block, wait until all of them finish """
+
+        while pending:
+            done, not_done = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    output = future.result()
+                    item.none_values = output.get('none_values', [])
+                    self._set_item_status(item, True)
+                except Exception as e:
+                    self._set_item_status(item, False, str(e))
+            if not block:
+                break
+
+
+    def _set_item_status(self, item, status, error_msg=None):
+
+        item.status = status
+        item.error_msg = error_msg
+        self.done += 1
+        self.setProgress(self.done * 100 / len(self.items))
+        self.profile_progress.emit(item.profile_id, 100, "Finished" if status else f"Failed: {error_msg}")
+
+
+    def _write_index(self):
+        """ Write the list of profiles, with their files and status, to self.index_path """
+
+        with open(self.index_path, 'w', encoding='utf-8', newline='') as index_file:
+            writer = csv.writer(index_file)
+            writer.writerow(['profile_id', 'title', 'date', 'init_node', 'end_node', 'mid_nodes', 'links_distance',
+                             'status', 'files', 'missing_values', 'message'])
+            for item in self.items:
+                init_node, end_node, mid_nodes, links_distance = item.key
+                files = [os.path.basename(path) for path in item.files if item.status]
+                writer.writerow([item.profile_id, item.title or '', item.date or '', init_node, end_node,
+                                 ' '.join(mid_nodes), links_distance, 'OK' if item.status else 'FAILED',
+                                 ' '.join(files), ' '.join(str(code) for code in item.none_values),
+                                 item.error_msg or ''])
+
+    # endregion
+
+
+def _get_python_path():
+    """ Get the Python executable of QGIS. Inside QGIS sys.executable can be the QGIS executable itself """
+
+    names = ('python.exe', 'python3.exe') if sys.platform == 'win32' else ('python3', 'python')
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    for folder in (sys.exec_prefix, os.path.join(sys.exec_prefix, 'bin')):
+        for name in names:
+            path = os.path.join(folder, name)
+            if os.path.isfile(path):
+                return path
+    return shutil.which('python3') or shutil.which('python') or 'python'
@@ -0,0 +1,45 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from qgis.PyQt.QtCore import pyqtSignal
+
+from .task import GwTask
+from ..utils import tools_gw
+
+
+class GwProfileValues(GwTask):
+    """ Execute gw_fct_getprofilevalues for a list of profiles. @requests is a list of (key, body) and the result of
+        every profile is emitted with its key as soon as it's received
+    """
+
+    values_loaded = pyqtSignal(object, object)
+
+    def __init__(self, description, requests):
+
+        super().__init__(description)
+        self.requests = requests
+        self.results = {}
+
+
+    def run(self):
+
+        super().run()
+
+        try:
+            for i, (key, body) in enumerate(self.requests):
+                if self.isCanceled():
+                    return False
+                result = tools_gw.execute_procedure('gw_fct_getprofilevalues', body, log_sql=False,
+                                                    aux_conn=self.aux_conn, is_thread=True)
+                self.results[key] = result
+                self.values_loaded.emit(key, result)
+                self.setProgress((i + 1) * 100 / len(self.requests))
+            return True
+
+        except Exception as e:
+            self.exception = e
+            return False
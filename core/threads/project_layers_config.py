@@ -5,18 +5,26 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
+import json
+import os
+import re
+
 from qgis.PyQt.QtCore import pyqtSignal
 from qgis.core import Qgis, QgsEditFormConfig
 
 from .task import GwTask
 from ..utils import tools_gw
-from ...libs import tools_log, tools_qgis, tools_qt, tools_db
+from ...libs import lib_vars, tools_log, tools_qgis, tools_qt, tools_db
+
+LAYERS_CONFIG_BATCH_SIZE = 20   # Number of calls to gw_fct_getinfofromid sent to the database in the same query
 
 
 class GwProjectLayersConfig(GwTask):
     """ This shows how to subclass QgsTask """
 
     fake_progress = pyqtSignal()
+    layers_config_ready = pyqtSignal(list)
+    form_suppress_ready = pyqtSignal(list)
 
     def __init__(self, description, params):
 
@@ -28,10 +36,16 @@ class GwProjectLayersConfig(GwTask):
         self.schema_name = params['schema_name']
         self.qgis_project_infotype = params['qgis_project_infotype']
         self.db_layers = params['db_layers']
+        self.project_version = params.get('project_version')
+        self.use_cache = params.get('use_cache', False)
+        self.reload_cache = params.get('reload_cache', False)
         self.body = None
         self.json_result = None
         self.vr_errors = None
         self.vr_missing = None
+        # Layers are configured in the main thread, as soon as the worker has prepared a batch of them
+        self.layers_config_ready.connect(self._apply_layers_config)
+        self.form_suppress_ready.connect(self._set_form_suppress)
 
 
     def run(self):
@@ -86,7 +100,7 @@ class GwProjectLayersConfig(GwTask):
 
         self.available_layers = [layer[0] for layer in self.db_layers]
 
-        self._set_form_suppress(self.available_layers)
+        self.form_suppress_ready.emit(list(self.available_layers))
         all_layers_toc = tools_qgis.get_project_layers()
         for layer in all_layers_toc:
             layer_source = tools_qgis.get_layer_source(layer)
@@ -99,7 +113,7 @@ class GwProjectLayersConfig(GwTask):
 
 
     def _set_form_suppress(self, layers_list):
-        """ Set form suppress on "Hide form on add feature (global settings) """
+        """ Set form suppress on "Hide form on add feature (global settings) (main thread) """
 
         for layer_name in layers_list:
             layer = tools_qgis.get_layer_by_tablename(layer_name)
@@ -124,45 +138,153 @@ class GwProjectLayersConfig(GwTask):
             tools_qgis.show_warning("Function not found in database", parameter='gw_fct_getinfofromid')
             return False
 
-        msg_failed = ""
-        msg_key = ""
-        total_layers = len(layers)
-        layer_number = 0
+        project_layers = []
         for layer_name in layers:
+            layer = tools_qgis.get_layer_by_tablename(layer_name)
+            if layer:
+                project_layers.append((layer_name, layer))
+
+        # Request the configuration of the layers not found in the disk cache, several layers per query
+        fingerprint = self._get_fingerprint() if self.use_cache else None
+        layers_config = self._get_cache(fingerprint) if self.use_cache and not self.reload_cache else {}
+        pending = [layer_name for layer_name, layer in project_layers if layer_name not in layers_config]
+        total_steps = len(pending) + len(project_layers)
+        for i in range(0, len(pending), LAYERS_CONFIG_BATCH_SIZE):
 
             if self.isCanceled():
                 return False
 
-            layer = tools_qgis.get_layer_by_tablename(layer_name)
-            if not layer:
-                continue
+            batch = pending[i:i + LAYERS_CONFIG_BATCH_SIZE]
+            calls = [('gw_fct_getinfofromid', self._get_body(layer_name)) for layer_name in batch]
+            results = tools_gw.execute_procedures(calls, aux_conn=self.aux_conn, is_thread=True, check_function=False,
+                                                  retry_single=True)
+            for layer_name, json_result in zip(batch, results):
+                if self._check_result(json_result):
+                    layers_config[layer_name] = json_result
+            self.setProgress(((i + len(batch)) * 100) / total_steps)
+
+        if self.use_cache and fingerprint and pending:
+            self._save_cache(layers_config, fingerprint)
+
+        # Prepare the configuration of the fields here and send it to the main thread to apply it
+        layer_number = len(pending)
+        batch = []
+        for layer_name, layer in project_layers:
+
+            if self.isCanceled():
+                return False
 
             layer_number = layer_number + 1
-            self.setProgress((layer_number * 100) / total_layers)
+            self.setProgress((layer_number * 100) / total_steps)
 
-            feature = f'"tableName":"{layer_name}", "isLayer":true'
-            self.body = tools_gw.create_body(feature=feature)
-            self.json_result = tools_gw.execute_procedure('gw_fct_getinfofromid', self.body, aux_conn=self.aux_conn,
-                                                          is_thread=True, check_function=False)
-            if not self.json_result:
-                continue
-            if 'status' not in self.json_result:
-                continue
-            if self.json_result['status'] == 'Failed':
-                continue
-            if 'body' not in self.json_result:
-                tools_log.log_info("Not 'body'")
-                continue
-            if 'data' not in self.json_result['body']:
-                tools_log.log_info("Not 'data'")
+            self.json_result = layers_config.get(layer_name)
+            if self.json_result is None:
                 continue
 
-            tools_gw.config_layer_attributes(self.json_result, layer, layer_name, thread=self)
+            self.body = self._get_body(layer_name)
+            batch.append((layer_name, tools_gw.get_layer_attributes_config(self.json_result)))
+            if len(batch) == LAYERS_CONFIG_BATCH_SIZE:
+                self.layers_config_ready.emit(batch)
+                batch = []
+
+        if batch:
+            self.layers_config_ready.emit(batch)
+
+
+    def _apply_layers_config(self, batch):
+        """ Apply the fields configuration of every layer of @batch [(layer_name, fields_config)] (main thread) """
+
+        for layer_name, fields_config in batch:
+            if self.isCanceled():
+                return
+            layer = tools_qgis.get_layer_by_tablename(layer_name)
+            if layer:
+                tools_gw.set_layer_attributes_config(layer, fields_config, layer_name, thread=self)
+
+
+    def _get_body(self, layer_name):
+
+        feature = f'"tableName":"{layer_name}", "isLayer":true'
+        return tools_gw.create_body(feature=feature)
+
+
+    def _check_result(self, json_result):
+        """ Check if @json_result of gw_fct_getinfofromid has the configuration of the layer """
+
+        if not json_result:
+            return False
+        if 'status' not in json_result:
+            return False
+        if json_result['status'] == 'Failed':
+            return False
+        if 'body' not in json_result:
+            tools_log.log_info("Not 'body'")
+            return False
+        if 'data' not in json_result['body']:
+            tools_log.log_info("Not 'data'")
+            return False
+
+        return True
 
-        if msg_failed != "":
-            tools_qt.show_exception_message("Execute failed.", msg_failed)
 
-        if msg_key != "":
-            tools_qt.show_exception_message("Key on returned json from ddbb is missed.", msg_key)
+    def _get_cache_path(self):
+        """ Get the path of the cache file of the current database, schema, schema version, info type and user """
+
+        credentials = tools_db.dao_db_credentials or {}
+        key = (f"{credentials.get('host')}_{credentials.get('db')}_{self.schema_name}_{self.project_version}_"
+               f"{self.qgis_project_infotype}_{credentials.get('user')}")
+        key = re.sub(r'[^\w.-]', '_', key)
+        return os.path.join(lib_vars.user_folder_dir, 'core', 'cache', f"layers_config_{key}.json")
+
+
+    def _get_fingerprint(self):
+        """ Get a fingerprint of the data the responses of gw_fct_getinfofromid depend on: a hash of table
+            'config_form_fields' and the number of rows changed in the tables the values of the combos come from
+            (catalogs, value domains and the tables of dv_querytext), taken from the statistics of the server.
+            The cache is only valid while none of them change, even if the schema version is the same
+        """
+
+        schema_name = self.schema_name.replace('"', '')
+        sql = (f"SELECT (SELECT count(*)::text || '_' || md5(string_agg(t::text, '' ORDER BY t::text)) "
+               f"FROM config_form_fields t) || '_' || "
+               f"(SELECT coalesce(sum(s.n_tup_ins + s.n_tup_upd + s.n_tup_del), 0)::text "
+               f"FROM pg_stat_user_tables s "
+               f"WHERE s.schemaname = '{schema_name}' AND (s.relname LIKE 'cat\\_%' OR s.relname LIKE '%typevalue' "
+               f"OR EXISTS (SELECT 1 FROM config_form_fields f "
+               f"WHERE f.dv_querytext ~* ('\\m' || s.relname || '\\M'))))")
+        row = tools_db.get_row(sql, log_sql=False, aux_conn=self.aux_conn)
+        return row[0] if row else None
+
+
+    def _get_cache(self, fingerprint):
+        """ Get the cached responses of gw_fct_getinfofromid {tablename: json_result}
+            if they were stored with the same @fingerprint
+        """
+
+        path = self._get_cache_path()
+        if fingerprint is None or not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, encoding='utf-8') as file:
+                cache = json.load(file)
+        except (OSError, ValueError) as e:
+            tools_log.log_warning(f"Error reading layers config cache: {path}", parameter=e)
+            return {}
+
+        if not isinstance(cache, dict) or cache.get('fingerprint') != fingerprint:
+            return {}
+        return cache.get('layers') or {}
+
+
+    def _save_cache(self, layers_config, fingerprint):
+
+        path = self._get_cache_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({'fingerprint': fingerprint, 'layers': layers_config}, file)
+        except (OSError, TypeError) as e:
+            tools_log.log_warning(f"Error writing layers config cache: {path}", parameter=e)
 
     # endregion
@@ -77,6 +77,9 @@ class GwCreateSchemaTask(GwTask):
         # Disable dlg_readsql buttons
         self.admin.dlg_readsql.btn_close.setEnabled(True)
 
+        # Catalog tables and functions may have changed
+        tools_gw.reset_metadata_cache()
+
         if self.isCanceled():
             if self.timer:
                 self.timer.stop()
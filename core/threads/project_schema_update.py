@@ -66,6 +66,9 @@ class GwUpdateSchemaTask(GwTask):
         # Show Message Info in tab log
         self.admin.infolog_updates.setText(self.admin.message_infolog)
 
+        # Catalog tables and functions may have changed
+        tools_gw.reset_metadata_cache()
+
         if self.timer:
             self.timer.stop()
 
@@ -0,0 +1,243 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import threading
+
+from collections import OrderedDict
+
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
+
+from ..utils import tools_gw
+from ...libs import tools_db, tools_log
+
+
+class GwSearchRequest:
+    """ Call of a search function. @context identifies everything that filters the search except @text """
+
+    def __init__(self, function_name, body, context, text, rubber_band=None):
+
+        self.function_name = function_name
+        self.body = body
+        self.context = context
+        self.text = text
+        self.rubber_band = rubber_band
+        self.request_id = None
+        self.result = None
+
+
+class GwSearchEngine(QObject):
+    """ Run the searches of a dialog out of the UI thread.
+        - Keystrokes are coalesced: the search is only sent when the user stops typing for @delay milliseconds
+        - Queries run in a worker thread with its own connection. A query that is outdated by a newer one is cancelled
+          and responses of outdated queries are dropped
+        - Results are kept in a LRU cache of @cache_size entries. If the server reports that a result is complete
+          (key 'complete' of the response), longer texts of the same context are filtered from it without a query
+    """
+
+    result_ready = pyqtSignal(object)
+
+    def __init__(self, delay=300, cache_size=50, idle_timeout=30):
+
+        super().__init__()
+        self.delay = delay
+        self.cache_size = cache_size
+        self.idle_timeout = idle_timeout
+        self.cache = OrderedDict()          # {(function_name, context, text): result}
+        self.request_id = 0                 # Id of the last request, responses of other requests are dropped
+        self.callbacks = {}                 # {request_id: callback}
+        self.get_request = None
+        self.callback = None
+
+        self.condition = threading.Condition()
+        self.next_request = None            # Request waiting for the worker
+        self.running_request = None         # Request being executed by the worker
+        self.aux_conn = None
+        self.thread = None
+        self.closed = False
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._submit_pending)
+        self.result_ready.connect(self._deliver_result)
+
+
+    def search(self, get_request, callback):
+        """ Schedule a search. When the user stops typing, @get_request is called to build the GwSearchRequest
+            (it can return None to skip the search) and @callback is called with the result of the function
+        """
+
+        # Outdate the queries already sent
+        self.request_id += 1
+        self.get_request = get_request
+        self.callback = callback
+        self.timer.start(self.delay)
+
+
+    def submit(self, request, callback):
+        """ Send @request now, without waiting for the user to stop typing """
+
+        self.timer.stop()
+        self.request_id += 1
+        request.request_id = self.request_id
+
+        self.callbacks = {request.request_id: callback}
+        result = self._get_cached_result(request)
+        if result is not None:
+            # Cached results are delivered as the results of the worker
+            request.result = result
+            self._deliver_result(request)
+            return
+
+        with self.condition:
+            self.next_request = request
+            self._cancel_running()
+            if self.thread is None:
+                self.closed = False
+                self.thread = threading.Thread(target=self._run, name="GwSearchEngine", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+
+    def clear(self):
+        """ Forget the cached results """
+
+        self.cache.clear()
+
+
+    def close(self):
+        """ Drop the pending searches and stop the worker, which closes its connection """
+
+        self.timer.stop()
+        self.request_id += 1
+        self.callbacks = {}
+        with self.condition:
+            self.next_request = None
+            self.closed = True
+            self._cancel_running()
+            self.condition.notify()
+
+
+    # region private functions
+
+    def _submit_pending(self):
+
+        get_request, callback = self.get_request, self.callback
+        self.get_request = None
+        self.callback = None
+        if get_request is None:
+            return
+
+        request = get_request()
+        if request is not None:
+            self.submit(request, callback)
+
+
+    def _cancel_running(self):
+        """ Cancel the query of the worker if it's outdated. Must be called holding self.condition """
+
+        if self.running_request is None or self.running_request.request_id == self.request_id:
+            return
+        try:
+            pid = self.aux_conn.get_backend_pid()
+            if isinstance(pid, int):
+                tools_db.cancel_pid(pid)
+        except Exception as e:
+            tools_log.log_info(f"Exception cancelling search: {e}")
+
+
+    def _run(self):
+        """ Worker: execute the requests until the engine is closed or it's idle for self.idle_timeout seconds """
+
+        conn = None
+        try:
+            while True:
+                with self.condition:
+                    if self.next_request is None and not self.closed:
+                        self.condition.wait(self.idle_timeout)
+                    request = self.next_request
+                    self.next_request = None
+                    if request is None:
+                        self.thread = None
+                        self.aux_conn = None
+                        return
+                    if conn is None:
+                        conn = tools_db.dao.get_aux_conn()
+                        self.aux_conn = conn
+                    self.running_request = request
+
+                request.result = tools_gw.execute_procedure(request.function_name, request.body, log_sql=False,
+                                                            aux_conn=conn, is_thread=True)
+
+                with self.condition:
+                    self.running_request = None
+                    outdated = request.request_id != self.request_id
+                if outdated and request.result is None:
+                    # The query has probably been cancelled, leave the connection ready for the next one
+                    tools_db.dao.rollback(conn)
+                self.result_ready.emit(request)
+        except Exception as e:
+            tools_log.log_warning(f"Exception in search worker: {e}")
+            with self.condition:
+                self.running_request = None
+                self.thread = None
+                self.aux_conn = None
+        finally:
+            if conn is not None:
+                tools_db.dao.delete_aux_con(conn)
+
+
+    def _deliver_result(self, request):
+        """ Cache the result of @request and pass it to its callback if it's still the last request (UI thread) """
+
+        result = request.result
+        if result and result.get('status') != 'Failed':
+            self._add_cached_result(request, result)
+
+        callback = self.callbacks.pop(request.request_id, None)
+        if callback is None or request.request_id != self.request_id:
+            return
+
+        if result and result.get('status') != 'Failed':
+            tools_gw.manage_json_response(result, None, request.rubber_band)
+        callback(result)
+
+
+    def _add_cached_result(self, request, result):
+
+        key = (request.function_name, request.context, request.text)
+        self.cache[key] = result
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+    def _get_cached_result(self, request):
+        """ Get the result of @request from the cache: the result of the same text, or the complete result of
+            the longest prefix of the text filtered by the display names that contain it
+        """
+
+        key = (request.function_name, request.context, request.text)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        text = request.text.lower()
+        for length in range(len(request.text) - 1, 0, -1):
+            key = (request.function_name, request.context, request.text[:length])
+            result = self.cache.get(key)
+            if result is None:
+                continue
+            if not result.get('complete') or not isinstance(result.get('data'), list):
+                continue
+            self.cache.move_to_end(key)
+            result = dict(result)
+            result['data'] = [item for item in result['data'] if text in str(item.get('display_name', '')).lower()]
+            return result
+
+        return None
+
+    # endregion
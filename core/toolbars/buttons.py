@@ -5,64 +5,178 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
+import importlib
+import os
 
-# Basic
-from .basic.info_button import GwInfoButton
-from .basic.search_button import GwSearchButton
-from .basic.selector_button import GwSelectorButton
-
-# Om
-from .om.mincut_button import GwMincutButton
-from .om.mincut_manager_button import GwMincutManagerButton
-from .om.flow_trace_button import GwFlowTraceButton
-from .om.flow_exit_button import GwFlowExitButton
-from .om.profile_button import GwProfileButton
-from .om.visit_button import GwVisitButton
-from .om.visit_manager_button import GwVisitManagerButton
-from .om.date_selector_button import GwDateSelectorButton
-
-# Edit
-from .edit.point_add_btn import GwPointAddButton
-from .edit.arc_add_button import GwArcAddButton
-from .edit.feature_replace_button import GwFeatureReplaceButton
-from .edit.arc_divide_button import GwArcDivideButton
-from .edit.arc_fusion_button import GwArcFusionButton
-from .edit.featuretype_change_button import GwFeatureTypeChangeButton
-from .edit.connect_link_button import GwConnectLinkButton
-from .edit.feature_end_button import GwFeatureEndButton
-from .edit.feature_delete_button import GwFeatureDeleteButton
-from .edit.dimensioning_button import GwDimensioningButton
-from .edit.document_button import GwDocumentButton
-from .edit.document_manager_button import GwDocumentManagerButton
-from .edit.element_button import GwElementButton
-from .edit.element_manager_button import GwElementManagerButton
-
-# Cad
-from .cad.aux_circle_add_button import GwAuxCircleAddButton
-from .cad.aux_point_add_button import GwAuxPointAddButton
-
-# Epa
-from .epa.go2epa_button import GwGo2EpaButton
-from .epa.go2epa_manager_button import GwGo2EpaManagerButton
-from .epa.go2epa_selector_button import GwGo2EpaSelectorButton
-from .epa.dscenario_manager_btn import GwDscenarioManagerButton
-from .epa.nonvisual_manager_button import GwNonVisualManagerButton
-
-# Plan
-from .plan.psector_button import GwPsectorButton
-from .plan.psector_manager_button import GwPsectorManagerButton
-from .plan.price_manager_button import GwPriceManagerButton
-from .plan.netscenario_manager_btn import GwNetscenarioManagerButton
-
-# Utilities
-from .utilities.toolbox_btn import GwToolBoxButton
-from .utilities.config_btn import GwConfigButton
-from .utilities.csv_btn import GwCSVButton
-from .utilities.print_btn import GwPrintButton
-from .utilities.project_check_btn import GwProjectCheckButton
-from .utilities.workspace_manager_btn import GwWorkspaceManagerButton
-from .utilities.utils_manager_btn import GwUtilsManagerButton
-
-# ToC
-from .toc.add_child_layer_button import GwAddChildLayerButton
-from .toc.epa_world_button import GwEpaWorldButton
+from qgis.PyQt.QtWidgets import QAction
+from qgis.PyQt.QtGui import QIcon
+
+from ...libs import tools_log, tools_qgis
+
+
+# Module of every button class. Modules are imported the first time their class is requested,
+# so heavy dependencies (i.e. matplotlib of the profile) are not loaded until the button is used
+button_modules = {
+    # Basic
+    'GwInfoButton': '.basic.info_button',
+    'GwSearchButton': '.basic.search_button',
+    'GwSelectorButton': '.basic.selector_button',
+
+    # Om
+    'GwMincutButton': '.om.mincut_button',
+    'GwMincutManagerButton': '.om.mincut_manager_button',
+    'GwFlowTraceButton': '.om.flow_trace_button',
+    'GwFlowExitButton': '.om.flow_exit_button',
+    'GwProfileButton': '.om.profile_button',
+    'GwVisitButton': '.om.visit_button',
+    'GwVisitManagerButton': '.om.visit_manager_button',
+    'GwDateSelectorButton': '.om.date_selector_button',
+
+    # Edit
+    'GwPointAddButton': '.edit.point_add_btn',
+    'GwArcAddButton': '.edit.arc_add_button',
+    'GwFeatureReplaceButton': '.edit.feature_replace_button',
+    'GwArcDivideButton': '.edit.arc_divide_button',
+    'GwArcFusionButton': '.edit.arc_fusion_button',
+    'GwFeatureTypeChangeButton': '.edit.featuretype_change_button',
+    'GwConnectLinkButton': '.edit.connect_link_button',
+    'GwFeatureEndButton': '.edit.feature_end_button',
+    'GwFeatureDeleteButton': '.edit.feature_delete_button',
+    'GwDimensioningButton': '.edit.dimensioning_button',
+    'GwDocumentButton': '.edit.document_button',
+    'GwDocumentManagerButton': '.edit.document_manager_button',
+    'GwElementButton': '.edit.element_button',
+    'GwElementManagerButton': '.edit.element_manager_button',
+
+    # Cad
+    'GwAuxCircleAddButton': '.cad.aux_circle_add_button',
+    'GwAuxPointAddButton': '.cad.aux_point_add_button',
+
+    # Epa
+    'GwGo2EpaButton': '.epa.go2epa_button',
+    'GwGo2EpaManagerButton': '.epa.go2epa_manager_button',
+    'GwGo2EpaSelectorButton': '.epa.go2epa_selector_button',
+    'GwDscenarioManagerButton': '.epa.dscenario_manager_btn',
+    'GwNonVisualManagerButton': '.epa.nonvisual_manager_button',
+
+    # Plan
+    'GwPsectorButton': '.plan.psector_button',
+    'GwPsectorManagerButton': '.plan.psector_manager_button',
+    'GwPriceManagerButton': '.plan.price_manager_button',
+    'GwNetscenarioManagerButton': '.plan.netscenario_manager_btn',
+
+    # Utilities
+    'GwToolBoxButton': '.utilities.toolbox_btn',
+    'GwConfigButton': '.utilities.config_btn',
+    'GwCSVButton': '.utilities.csv_btn',
+    'GwPrintButton': '.utilities.print_btn',
+    'GwProjectCheckButton': '.utilities.project_check_btn',
+    'GwWorkspaceManagerButton': '.utilities.workspace_manager_btn',
+    'GwUtilsManagerButton': '.utilities.utils_manager_btn',
+
+    # ToC
+    'GwAddChildLayerButton': '.toc.add_child_layer_button',
+    'GwEpaWorldButton': '.toc.epa_world_button',
+}
+
+# Buttons that only open a dialog when clicked: a placeholder action is created at project load and the real button
+# is built on its first click. Map tools, buttons with a menu and checkable buttons are always built at project load
+lazy_buttons = ('GwSearchButton', 'GwSelectorButton', 'GwMincutButton', 'GwMincutManagerButton', 'GwProfileButton',
+                'GwVisitButton', 'GwVisitManagerButton', 'GwDateSelectorButton', 'GwFeatureEndButton',
+                'GwFeatureDeleteButton', 'GwDocumentButton', 'GwDocumentManagerButton', 'GwElementButton',
+                'GwElementManagerButton', 'GwGo2EpaButton', 'GwGo2EpaManagerButton', 'GwGo2EpaSelectorButton',
+                'GwNonVisualManagerButton', 'GwPsectorButton', 'GwPsectorManagerButton', 'GwPriceManagerButton',
+                'GwNetscenarioManagerButton', 'GwToolBoxButton', 'GwConfigButton', 'GwCSVButton', 'GwPrintButton',
+                'GwProjectCheckButton', 'GwWorkspaceManagerButton', 'GwAddChildLayerButton')
+
+
+class GwLazyButton:
+    """ Placeholder of a button: it only creates the QAction of the toolbar.
+        The module of the button is imported and the button is built the first time the action is triggered
+    """
+
+    def __init__(self, button_def, icon_path, text, toolbar, action_group):
+
+        self.button_def = button_def
+        self.icon_path = icon_path
+        self.text = text
+        self.action_group = action_group
+        self.button = None
+
+        icon = None
+        if os.path.exists(icon_path):
+            icon = QIcon(icon_path)
+
+        if icon is None:
+            self.action = QAction(text, action_group)
+        else:
+            self.action = QAction(icon, text, action_group)
+
+        self.action.setObjectName(button_def)
+        self.action.setProperty('action_group', action_group)
+        self.action.setCheckable(False)
+        self.action.triggered.connect(self.clicked_event)
+
+        if toolbar is None:
+            return
+
+        toolbar.addAction(self.action)
+
+
+    def clicked_event(self):
+
+        button = self.get_button()
+        if button is not None:
+            button.clicked_event()
+
+
+    def get_button(self):
+        """ Get the real button, building it the first time """
+
+        if self.button is not None:
+            return self.button
+
+        try:
+            button_class = get_button_class(self.button_def)
+            button = button_class(self.icon_path, self.button_def, self.text, None, self.action_group)
+        except Exception as e:
+            tools_log.log_warning(f"Exception building button '{self.button_def}': {e}")
+            tools_qgis.show_warning(f"Error loading button '{self.button_def}'", parameter=str(e))
+            return None
+
+        # Replace the action created by the button with the one already in the toolbar
+        button.action.triggered.disconnect()
+        self.action_group.removeAction(button.action)
+        button.action.deleteLater()
+        button.action = self.action
+        self.button = button
+        return button
+
+
+def has_button(button_def):
+    return button_def in button_modules
+
+
+def get_button_class(button_def):
+    """ Import the module of @button_def and return its class """
+
+    module = importlib.import_module(button_modules[button_def], __package__)
+    return getattr(module, button_def)
+
+
+def create_button(button_def, icon_path, text, toolbar, action_group):
+    """ Create the button @button_def, or its placeholder if the button can be built when it's used """
+
+    if button_def in lazy_buttons:
+        return GwLazyButton(button_def, icon_path, text, toolbar, action_group)
+
+    button_class = get_button_class(button_def)
+    return button_class(icon_path, button_def, text, toolbar, action_group)
+
+
+def __getattr__(name):
+    """ Keep 'buttons.GwXxxButton' working, importing the module of the class when it's requested """
+
+    if name in button_modules:
+        return get_button_class(name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
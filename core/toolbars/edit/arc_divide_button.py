@@ -225,6 +225,7 @@ class GwArcDivideButton(GwMaptool):
             body = tools_gw.create_body(feature=feature_id)
             result = tools_gw.execute_procedure('gw_fct_setarcdivide', body)
             if result and result['status'] == 'Accepted':
+                tools_gw.invalidate_network_graph()
                 log = tools_gw.get_config_parser("user_edit_tricks", "arc_divide_disable_showlog", 'user', 'init')
                 if not tools_os.set_boolean(log, False):
                     self.dlg_dtext = GwDialogTextUi('arc_divide')
@@ -85,6 +85,7 @@ class GwArcFusionButton(GwMaptool):
         if not result or result['status'] == 'Failed':
             return
 
+        tools_gw.invalidate_network_graph()
         text_result = None
         log = tools_gw.get_config_parser("user_edit_tricks", "arc_fusion_disable_showlog", 'user', 'init')
         if not tools_os.set_boolean(log, False):
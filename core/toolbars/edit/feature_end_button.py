@@ -373,6 +373,7 @@ class GwFeatureEndButton(GwAction):
 
         result = tools_gw.execute_procedure('gw_fct_setendfeature', body)
         if result:
+            tools_gw.invalidate_network_graph()
             tools_gw.fill_tab_log(self.dlg_work_end, result['body']['data'], tab_idx=2)
 
 
@@ -437,6 +437,7 @@ class GwFeatureReplaceButton(GwMaptool):
                 tools_gw.close_dialog(dialog)
                 return
 
+            tools_gw.invalidate_network_graph()
             message = "Feature replaced successfully"
             tools_qgis.show_info(message)
 
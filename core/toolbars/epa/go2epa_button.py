@@ -20,6 +20,7 @@ from qgis.PyQt.QtWidgets import QWidget, QComboBox, QCompleter, QFileDialog, QTa
 from qgis.core import QgsApplication
 
 from ...shared.selector import GwSelector
+from ...threads.epa_batch_manager import GwEpaBatchManager
 from ...threads.epa_file_manager import GwEpaFileManager
 from ...utils import tools_gw
 from ...ui.ui_manager import GwGo2EpaUI, GwSelectorUi, GwGo2EpaOptionsUi
@@ -36,6 +37,7 @@ class GwGo2EpaButton(GwAction):
         super().__init__(icon_path, action_name, text, toolbar, action_group)
         self.project_type = global_vars.project_type
         self.epa_options_list = []
+        self.batch_progress = {}
 
 
     def clicked_event(self):
@@ -82,8 +84,8 @@ class GwGo2EpaButton(GwAction):
         self.dlg_go2epa.btn_hs_ds.clicked.connect(
             partial(self._sector_selection))
 
-        # Check OS and enable/disable checkbox execute EPA software
-        if sys.platform != "win32":
+        # Check OS and enable/disable checkbox execute EPA software (unless there is a locally installed one)
+        if sys.platform != "win32" and tools_gw.get_epa_software() is None:
             tools_qt.set_checked(self.dlg_go2epa, self.dlg_go2epa.chk_exec, False)
             self.dlg_go2epa.chk_exec.setEnabled(False)
             self.dlg_go2epa.chk_exec.setText('Execute EPA software (Runs only on Windows)')
@@ -109,6 +111,7 @@ class GwGo2EpaButton(GwAction):
         self.dlg_go2epa.btn_close.clicked.connect(partial(tools_gw.close_dialog, self.dlg_go2epa))
         self.dlg_go2epa.rejected.connect(partial(tools_gw.close_dialog, self.dlg_go2epa))
         self.dlg_go2epa.btn_options.clicked.connect(self._go2epa_options)
+        self.dlg_go2epa.btn_batch.clicked.connect(self._go2epa_batch)
         self.dlg_go2epa.mainTab.currentChanged.connect(partial(self._manage_btn_accept))
 
 
@@ -376,14 +379,8 @@ class GwGo2EpaButton(GwAction):
         """ Save INP, RPT and result name"""
 
         # Manage if task is already running
-        if hasattr(self, 'go2epa_task') and self.go2epa_task is not None:
-            try:
-                if self.go2epa_task.isActive():
-                    message = "Go2Epa task is already active!"
-                    tools_qgis.show_warning(message)
-                    return
-            except RuntimeError:
-                pass
+        if self._is_task_active():
+            return
 
         # Save user values
         self._save_user_values()
@@ -422,6 +419,7 @@ class GwGo2EpaButton(GwAction):
         self.timer.start(1000)
 
         # Set background task 'Go2Epa'
+        self.batch_progress = {}
         description = f"Go2Epa"
         self.go2epa_task = GwEpaFileManager(description, self, timer=self.timer)
         self.go2epa_task.step_completed.connect(self.step_completed)
@@ -429,6 +427,113 @@ class GwGo2EpaButton(GwAction):
         QgsApplication.taskManager().triggerTask(self.go2epa_task)
 
 
+    def _go2epa_batch(self):
+        """ Run the selected processes for every result of a json batch file like:
+                [{"resultId": "result_1", "dscenarios": [1, 2], "netscenario": 3}, {"resultId": "result_2"}]
+            'dscenarios' and 'netscenario' are optional and set the selectors before exporting that result.
+            Inp and rpt files are named after each result, in the folders of the inp and rpt files of the form
+        """
+
+        if self._is_task_active():
+            return
+
+        message = tools_qt.tr("Select batch file")
+        batch_path, filter_ = QFileDialog.getOpenFileName(None, message, "", '*.json')
+        if not batch_path:
+            return
+
+        try:
+            with open(batch_path, 'r', encoding='utf-8') as batch_file:
+                batch = json.load(batch_file)
+            if not isinstance(batch, list) or not batch or \
+                    any(not isinstance(item, dict) or not item.get('resultId') for item in batch):
+                raise ValueError("it must be a list of objects with key 'resultId'")
+        except (OSError, ValueError) as e:
+            msg = "Batch file is not valid"
+            tools_qgis.show_warning(msg, parameter=f"{batch_path}: {e}")
+            return
+
+        # Save user values
+        self._save_user_values()
+        self.dlg_go2epa.txt_infolog.clear()
+
+        # Get widgets values
+        self.export_inp = tools_qt.is_checked(self.dlg_go2epa, self.dlg_go2epa.chk_export)
+        self.export_subcatch = tools_qt.is_checked(self.dlg_go2epa, self.dlg_go2epa.chk_export_subcatch)
+        self.exec_epa = tools_qt.is_checked(self.dlg_go2epa, self.dlg_go2epa.chk_exec)
+        self.import_result = tools_qt.is_checked(self.dlg_go2epa, self.dlg_go2epa.chk_import_result)
+        if not self.export_inp and not self.exec_epa and not self.import_result:
+            msg = "You need to select at least one process"
+            tools_qt.show_info_box(msg, title="Go2Epa")
+            return
+
+        # Inp and rpt files are written next to the files of the form or, if not set, next to the batch file
+        folder_inp = os.path.dirname(batch_path)
+        folder_rpt = folder_inp
+        file_inp = tools_qt.get_text(self.dlg_go2epa, self.dlg_go2epa.txt_file_inp, False, False)
+        file_rpt = tools_qt.get_text(self.dlg_go2epa, self.dlg_go2epa.txt_file_rpt, False, False)
+        if file_inp and os.path.isdir(os.path.dirname(file_inp)):
+            folder_inp = os.path.dirname(file_inp)
+        if file_rpt and os.path.isdir(os.path.dirname(file_rpt)):
+            folder_rpt = os.path.dirname(file_rpt)
+
+        # Check for sector selector
+        if self.export_inp:
+            sql = "SELECT sector_id FROM selector_sector WHERE sector_id > 0 LIMIT 1"
+            row = tools_db.get_row(sql)
+            if row is None:
+                msg = "You need to select some sector"
+                tools_qt.show_info_box(msg)
+                return
+
+        pool_size = tools_gw.get_config_parser('btn_go2epa', 'batch_pool_size', "user", "init", prefix=False)
+        try:
+            pool_size = int(pool_size)
+        except (TypeError, ValueError):
+            pool_size = None
+
+        self.dlg_go2epa.btn_accept.setEnabled(False)
+        self.dlg_go2epa.btn_cancel.setEnabled(True)
+
+        # Create timer
+        self.t0 = time()
+        self.timer = QTimer()
+        self.timer.timeout.connect(partial(self._calculate_elapsed_time, self.dlg_go2epa))
+        self.timer.start(1000)
+
+        # Set background task 'Go2Epa batch'
+        self.batch_progress = {item['resultId']: 0 for item in batch}
+        description = f"Go2Epa batch"
+        self.go2epa_task = GwEpaBatchManager(description, self, batch, folder_inp, folder_rpt, pool_size=pool_size,
+                                             timer=self.timer)
+        self.go2epa_task.step_completed.connect(self.step_completed)
+        self.go2epa_task.run_progress.connect(self._batch_run_progress)
+        QgsApplication.taskManager().addTask(self.go2epa_task)
+        QgsApplication.taskManager().triggerTask(self.go2epa_task)
+
+
+    def _batch_run_progress(self, result_name, progress, text):
+        """ Keep the progress of every result of the batch, shown next to the execution time """
+
+        self.batch_progress[result_name] = progress
+        if text:
+            self.step_completed({"message": {"text": f"{result_name}: {text}"}})
+
+
+    def _is_task_active(self):
+
+        if hasattr(self, 'go2epa_task') and self.go2epa_task is not None:
+            try:
+                if self.go2epa_task.isActive():
+                    message = "Go2Epa task is already active!"
+                    tools_qgis.show_warning(message)
+                    return True
+            except RuntimeError:
+                pass
+
+        return False
+
+
     def _cancel_task(self):
 
         if hasattr(self, 'go2epa_task'):
@@ -520,6 +625,9 @@ class GwGo2EpaButton(GwAction):
         if not json_result or json_result['status'] == 'Failed':
             return False
 
+        # Values of config_param_system may have changed
+        tools_gw.get_metadata_cache().clear_config_values()
+
         tools_gw.manage_current_selections_docker(json_result)
         # Refresh epa world view if is active and it has changed
         if tools_gw.is_epa_world_active() and any(widget['widget'] == 'inp_options_networkmode' for widget in _json):
@@ -558,7 +666,10 @@ class GwGo2EpaButton(GwAction):
 
         tf = time()  # Final time
         td = tf - self.t0  # Delta time
-        self._update_time_elapsed(f"Exec. time: {timedelta(seconds=round(td))}", dialog)
+        text = f"Exec. time: {timedelta(seconds=round(td))}"
+        if self.batch_progress:
+            text += " | " + ", ".join(f"{name}: {progress}%" for name, progress in self.batch_progress.items())
+        self._update_time_elapsed(text, dialog)
 
     def _update_time_elapsed(self, text, dialog):
 
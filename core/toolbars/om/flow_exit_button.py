@@ -9,7 +9,7 @@ from qgis.PyQt.QtCore import Qt
 
 from ..maptool import GwMaptool
 from ...utils import tools_gw
-from ....libs import tools_qgis
+from ....libs import tools_qgis, tools_os
 
 
 class GwFlowExitButton(GwMaptool):
@@ -19,6 +19,10 @@ class GwFlowExitButton(GwMaptool):
 
         super().__init__(icon_path, action_name, text, toolbar, action_group)
         self.layers_added = []
+        self.preview_node_id = None
+        self.preview_enabled = False
+        self.local_trace = False
+        self.previous_arc_selection = None
 
 
     # region QgsMapTools inherited
@@ -36,6 +40,7 @@ class GwFlowExitButton(GwMaptool):
             self.snapper_manager.add_marker(result, self.vertex_marker)
             # Data for function
             self.snapped_feat = self.snapper_manager.get_snapped_feature(result)
+            self._preview_flow()
         else:
             self.snapped_feat = None
 
@@ -77,6 +82,26 @@ class GwFlowExitButton(GwMaptool):
             if layer:
                 self.iface.setActiveLayer(layer)
 
+        # Start loading the network graph used by the preview and the local trace
+        value = tools_gw.get_config_parser('system', 'network_graph_preview', "user", "init", prefix=False)
+        self.preview_enabled = tools_os.set_boolean(value, default=False)
+        value = tools_gw.get_config_parser('system', 'local_flow_trace', "user", "init", prefix=False)
+        self.local_trace = tools_os.set_boolean(value, default=False)
+        if self.preview_enabled or self.local_trace:
+            tools_gw.get_network_graph()
+
+
+    def deactivate(self):
+
+        super().deactivate()
+        self.preview_node_id = None
+        # Restore the selection of the arcs the preview has overwritten
+        if self.previous_arc_selection is not None:
+            layer_arc = tools_qgis.get_layer_by_tablename('v_edit_arc')
+            if layer_arc is not None:
+                layer_arc.selectByIds(self.previous_arc_selection)
+            self.previous_arc_selection = None
+
 
     # endregion
 
@@ -87,11 +112,27 @@ class GwFlowExitButton(GwMaptool):
 
         if event.button() == Qt.LeftButton and self.current_layer:
 
+            # With Ctrl pressed, trace from all the nodes selected too
+            node_ids = []
+            if event.modifiers() & Qt.ControlModifier and self.layer_node:
+                node_ids = [feature['node_id'] for feature in self.layer_node.selectedFeatures()]
+            if self.snapped_feat is not None:
+                node_ids.append(self.snapped_feat.attribute('node_id'))
+
+            # Compute it with the network graph if it's loaded and up to date
+            if self.local_trace and node_ids:
+                result = tools_gw.trace_network_graph(node_ids, downstream=True)
+                if result is not None:
+                    self.preview_node_id = None
+                    self.previous_arc_selection = None
+                    tools_gw.select_network_graph_result(result)
+                    message = f"Flow downstream: {len(result['arcs'])} arcs and {len(result['nodes'])} nodes selected"
+                    tools_qgis.show_info(message)
+                    self.set_action_pan()
+                    return
+
             # Execute SQL function
-            if self.snapped_feat is None:
-                elem_id = 'null'
-            else:
-                elem_id = f"""{self.snapped_feat.attribute('node_id')}"""
+            elem_id = ', '.join(str(node_id) for node_id in node_ids) if node_ids else 'null'
             feature_id = f'"id":[{elem_id}]'
             point = tools_qgis.create_point(self.canvas, self.iface, event)
             scale_zoom = self.iface.mapCanvas().scale()
@@ -107,4 +148,23 @@ class GwFlowExitButton(GwMaptool):
             # Set action pan
             self.set_action_pan()
 
+
+    def _preview_flow(self):
+        """ Select the arcs downstream of the node under the mouse, computed with the network graph """
+
+        if not self.preview_enabled or self.snapped_feat is None:
+            return
+
+        node_id = self.snapped_feat.attribute('node_id')
+        if node_id == self.preview_node_id:
+            return
+        self.preview_node_id = node_id
+        result = tools_gw.trace_network_graph([node_id], downstream=True)
+        if result is not None:
+            if self.previous_arc_selection is None:
+                layer_arc = tools_qgis.get_layer_by_tablename('v_edit_arc')
+                if layer_arc is not None:
+                    self.previous_arc_selection = layer_arc.selectedFeatureIds()
+            tools_gw.select_network_graph_result(result)
+
     # endregion
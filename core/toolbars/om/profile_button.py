@@ -5,30 +5,30 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
-import json
-import math
 import subprocess
 import os
-from collections import OrderedDict
-from decimal import Decimal
 from functools import partial
 
 from qgis.PyQt.QtCore import Qt, QDate
 from qgis.PyQt.QtGui import QDoubleValidator
-from qgis.PyQt.QtWidgets import QListWidgetItem, QLineEdit, QAction
-from qgis.core import QgsFeatureRequest, QgsVectorLayer, QgsExpression
+from qgis.PyQt.QtWidgets import QListWidgetItem, QLineEdit, QAction, QFileDialog
+from qgis.core import QgsApplication, QgsFeatureRequest, QgsVectorLayer, QgsExpression
 from qgis.gui import QgsMapToolEmitPoint
 
 from ..dialog import GwAction
+from ...threads.profile_export import GwProfileExport, GwProfileExportItem
 from ...ui.ui_manager import GwProfileUi, GwProfilesListUi
 from ...utils import tools_gw
+from ...utils.profile_cache import GwProfileCache
 from ...utils.snap_manager import GwSnapManager
 from ....libs import lib_vars, tools_qt, tools_log, tools_qgis
 
 try:
     import matplotlib.pyplot as plt
+    from ...utils.profile_renderer import GwProfileRenderer
 except ImportError:
     plt = None
+    GwProfileRenderer = None
     if tools_qt.show_question("Matplotlib Python package not found. Do you want to install Matplotlib?"):
         subprocess.run(["python", "-m", "ensurepip"])
         install_matplotlib = subprocess.run(['python', '-m', 'pip', 'install', '-U', 'matplotlib'])
@@ -40,34 +40,6 @@ except ImportError:
             tools_qt.show_info_box("Matplotlib installed successfully. Please restart QGIS.")
 
 
-class GwNodeData:
-
-    def __init__(self):
-
-        self.start_point = None
-        self.top_elev = None
-        self.ymax = None
-        self.z1 = None
-        self.z2 = None
-        self.cat_geom = None
-        self.geom = None
-        self.slope = None
-        self.elev1 = None
-        self.elev2 = None
-        self.y1 = None
-        self.y2 = None
-        self.node_id = None
-        self.elev = None
-        self.code = None
-        self.node_1 = None
-        self.node_2 = None
-        self.total_distance = None
-        self.descript = None
-        self.data_type = None
-        self.surface_type = None
-        self.none_values = None
-
-
 class GwProfileButton(GwAction):
     """ Button 43: Profile """
 
@@ -79,19 +51,20 @@ class GwProfileButton(GwAction):
         self.snapper_manager = GwSnapManager(self.iface)
         self.vertex_marker = self.snapper_manager.vertex_marker
         self.list_of_selected_nodes = []
-        self.nodes = []
-        self.links = []
         self.rotation_vd_exist = False
-        self.lastnode_datatype = 'REAL'
         self.none_values = []
         self.add_points = False
         self.add_points_list = []
+        self.profile_cache = GwProfileCache()
 
 
     def clicked_event(self):
 
         self.action.setChecked(True)
 
+        # Data may have changed since the last time the dialog was opened
+        self.profile_cache.clear()
+
         # Remove all selections on canvas
         self._remove_selection()
 
@@ -171,31 +144,31 @@ class GwProfileButton(GwAction):
             self.add_points_list = []
             self.endNode = None
 
-    def _get_profile(self):
 
-        # Clear main variables
-        self.nodes.clear()
-        self.links.clear()
-        self.nodes = []
-        self.links = []
-        self.none_values = []
+    def _get_links_distance(self):
 
-        # Get parameters
         links_distance = tools_qt.get_text(self.dlg_draw_profile, self.dlg_draw_profile.txt_min_distance, False, False)
         if links_distance in ("", "None", None):
             links_distance = 1
+        return links_distance
 
-        # Create variable with all the content of the form
-        extras = f'"initNode":"{self.initNode}", "endNode":"{self.endNode}", ' \
-                 f'"linksDistance":{links_distance}, "scale":{{ "eh":1000, "ev":1000}}'
-        if self.add_points_list:
-            l = str(self.add_points_list).replace("'", "")
-            extras += f', "midNodes":{l}'
 
-        body = tools_gw.create_body(extras=extras)
+    def _get_profile_key(self):
+        """ Get the key of the profile of the dialog in the cache of gw_fct_getprofilevalues """
+
+        return GwProfileCache.get_key(self.initNode, self.endNode, self.add_points_list, self._get_links_distance())
 
-        # Execute query
-        self.profile_json = tools_gw.execute_procedure('gw_fct_getprofilevalues', body)
+
+    def _get_profile(self):
+
+        # Clear main variables
+        self.none_values = []
+
+        # Get parameters
+        links_distance = self._get_links_distance()
+
+        # Execute query (or get its result if this profile has already been requested)
+        self.profile_json = self.profile_cache.get_profile_values(self._get_profile_key())
         if self.profile_json is None or self.profile_json['status'] == 'Failed':
             return
 
@@ -210,8 +183,7 @@ class GwProfileButton(GwAction):
             return
 
         # Execute draw profile
-        self._draw_profile(self.profile_json['body']['data']['arc'], self.profile_json['body']['data']['node'],
-                           self.profile_json['body']['data']['terrain'])
+        self._draw_profile(self.profile_json['body']['data'])
 
         # Save profile values
         tools_gw.set_config_parser('btn_profile', 'min_distance_profile', f'{links_distance}')
@@ -279,6 +251,14 @@ class GwProfileButton(GwAction):
 
         self.dlg_load.btn_open.clicked.connect(partial(self._load_profile, result_profile))
         self.dlg_load.btn_delete_profile.clicked.connect(partial(self._delete_profile))
+        self.dlg_load.btn_export.clicked.connect(partial(self._export_profiles, result_profile))
+
+        # Populate export formats
+        rows = [['png', 'PNG'], ['pdf', 'PDF'], ['png,pdf', 'PNG + PDF']]
+        tools_qt.fill_combo_values(self.dlg_load.cmb_export_format, rows)
+        export_format = tools_gw.get_config_parser('btn_profile', 'export_format', "user", "session")
+        if export_format not in (None, 'None'):
+            tools_qt.set_combo_value(self.dlg_load.cmb_export_format, export_format, 0)
 
         # Populate profile list
         for profile in result_profile['body']['data']:
@@ -310,6 +290,7 @@ class GwProfileButton(GwAction):
                 self.initNode = profile['values']['initNode']
                 self.endNode = profile['values']['endNode']
                 list_arcs = profile['values']['listArcs']
+                self.add_points_list = list(GwProfileCache.get_saved_profile_key(profile)[2])
 
                 # Get arcs from profile
                 expr_filter = "\"arc_id\" IN ("
@@ -340,6 +321,9 @@ class GwProfileButton(GwAction):
                 date = QDate.fromString(profile['values']['date'], 'dd-MM-yyyy')
                 tools_qt.set_calendar(self.dlg_draw_profile, self.dlg_draw_profile.date, date)
 
+                # Get the values of the profile in background, so it's drawn without waiting
+                self.profile_cache.prewarm([profile])
+
                 # Select features in map
                 self._remove_selection()
                 self.layer_arc.selectByIds(self.id_list)
@@ -348,6 +332,84 @@ class GwProfileButton(GwAction):
                 self.canvas.zoomToSelected(self.layer_arc)
 
 
+    def _export_profiles(self, parameters):
+        """ Export the profiles selected in dialog load_profiles.ui to files, in a background task """
+
+        if self._is_export_active():
+            return
+
+        selected_ids = [item.text() for item in self.dlg_load.tbl_profiles.selectedItems()]
+        if len(selected_ids) == 0:
+            message = "Any record selected"
+            tools_qgis.show_warning(message)
+            return
+
+        folder = tools_gw.get_config_parser('btn_profile', 'export_folder', "user", "session")
+        if folder in (None, 'None') or not os.path.isdir(folder):
+            folder = ""
+        message = tools_qt.tr("Select folder of the exported profiles")
+        folder = QFileDialog.getExistingDirectory(None, message, folder)
+        if not folder:
+            return
+
+        export_format = tools_qt.get_combo_value(self.dlg_load, self.dlg_load.cmb_export_format, 0)
+        tools_gw.set_config_parser('btn_profile', 'export_folder', f'{folder}')
+        tools_gw.set_config_parser('btn_profile', 'export_format', f'{export_format}')
+
+        # Values already in the cache are not requested again
+        items = []
+        for profile in parameters['body']['data']:
+            if str(profile['profile_id']) not in selected_ids:
+                continue
+            key = GwProfileCache.get_saved_profile_key(profile)
+            items.append(GwProfileExportItem(str(profile['profile_id']), key, GwProfileCache.get_body(key),
+                                             self.profile_cache.get(key), profile['values'].get('title'),
+                                             profile['values'].get('date')))
+
+        pool_size = tools_gw.get_config_parser('btn_profile', 'export_pool_size', "user", "init", prefix=False)
+        try:
+            pool_size = int(pool_size)
+        except (TypeError, ValueError):
+            pool_size = None
+        python_path = tools_gw.get_config_parser('btn_profile', 'export_python_path', "user", "init", prefix=False)
+        if python_path in (None, 'None', ''):
+            python_path = None
+
+        # Set background task 'Export profiles'
+        description = f"Export profiles"
+        self.export_task = GwProfileExport(description, items, folder, export_format.split(','),
+                                           pool_size=pool_size, python_path=python_path)
+        self.export_task.values_loaded.connect(self.profile_cache.add)
+        self.export_task.profile_progress.connect(partial(self._export_progress, len(items)))
+        self.export_done = 0
+        QgsApplication.taskManager().addTask(self.export_task)
+        QgsApplication.taskManager().triggerTask(self.export_task)
+
+
+    def _export_progress(self, total, profile_id, progress, text):
+        """ Show the progress of every profile of the export in the status bar """
+
+        if progress == 100:
+            self.export_done += 1
+        msg = f"Export profiles ({self.export_done}/{total}) - {profile_id}: {text}"
+        self.iface.mainWindow().statusBar().showMessage(msg, 5000)
+        tools_log.log_info(msg)
+
+
+    def _is_export_active(self):
+
+        if hasattr(self, 'export_task') and self.export_task is not None:
+            try:
+                if self.export_task.isActive():
+                    message = "Export profiles task is already active!"
+                    tools_qgis.show_warning(message)
+                    return True
+            except RuntimeError:
+                pass
+
+        return False
+
+
     def _activate_snapping_node(self):
 
         if hasattr(self, "first_node"):
@@ -443,13 +505,8 @@ class GwProfileButton(GwAction):
                         # Clear old list arcs
                         self.dlg_draw_profile.tbl_list_arc.clear()
 
-                        # Populate list arcs
-                        extras = f'"initNode":"{self.initNode}", "endNode":"{self.endNode}"'
-                        if self.add_points and self.add_points_list:
-                            l = str(self.add_points_list).replace("'", "")
-                            extras += f', "midNodes":{l}'
-                        body = tools_gw.create_body(extras=extras)
-                        result = tools_gw.execute_procedure('gw_fct_getprofilevalues', body)
+                        # Populate list arcs. The result is cached to draw the profile without calling it again
+                        result = self.profile_cache.get_profile_values(self._get_profile_key())
                         if result is None or result['status'] == 'Failed':
                             return
                         self.layer_arc = tools_qgis.get_layer_by_tablename("v_edit_arc")
@@ -495,49 +552,20 @@ class GwProfileButton(GwAction):
             self.iface.actionPan().trigger()
 
 
-    def _draw_profile(self, arcs, nodes, terrains):
+    def _draw_profile(self, data):
         """ Parent function - Draw profiles """
 
-        # Clear plot
-        plt.gcf().clear()
-
-        # Set main parameters
-        self._set_profile_variables(arcs, nodes, terrains)
-        self._fill_profile_variables(arcs, nodes, terrains)
-        self._set_guitar_parameters()
-
-        # Draw start node
-        self._draw_start_node(self.nodes[0])
-
-        # Draw nodes and precedessor arcs between start and end nodes
-        for i in range(1, self.n - 1):
-            self._draw_nodes(self.nodes[i], self.nodes[i - 1], i)
-
-        # Draw terrain
-        for i in range(1, self.t):
-
-            # define variables
-            self.first_top_x = self.links[i - 1].start_point  # start_point = total_x
-            self.node_top_x = self.links[i].start_point  # start_point = total_x
-            self.first_top_y = self.links[i - 1].node_id  # node_id = top_n1
-            self.node_top_y = self.links[i - 1].geom  # geom = top_n2
-
-            # Draw terrain
-            self._draw_terrain(i)
-
-            # Fill text terrain
-            self._fill_guitar_text_terrain(self.node_top_x, i)
-            self._draw_guitar_auxiliar_lines(self.node_top_x, first_vl=False)
-
-        # Draw last node and precedessor arc
-        self._draw_end_node(self.nodes[self.n - 1], self.nodes[self.n - 2], self.n - 1)
-
-        # Draw guitar & grid
-        self._draw_guitar_horitzontal_lines()
-        self._draw_grid()
+        # Draw on the figure of the profile window
+        title = tools_qt.get_text(self.dlg_draw_profile, self.dlg_draw_profile.txt_title, False, False)
+        date = tools_qt.get_calendar_date(self.dlg_draw_profile, self.dlg_draw_profile.date)
+        renderer = GwProfileRenderer(data, title, date)
+        figure = plt.figure(1, figsize=renderer.figure_size)
+        renderer.draw(figure)
+        self.none_values = renderer.none_values
 
-        # Manage layout and plot
-        self._set_profile_layout()
+        # Set window name
+        if figure.canvas.manager is not None:
+            figure.canvas.manager.set_window_title('Draw Profile')
         self.plot = plt
 
         # If file profile.png exist overwrite
@@ -548,869 +576,8 @@ class GwProfileButton(GwAction):
         else:
             tools_log.log_info(f"User settings file: {img_path}")
 
-        fig_size = plt.rcParams["figure.figsize"]
-
-        # Set figure width to 10.4  and height to 4.8
-        fig_size[0] = 10.4
-        fig_size[1] = 4.8
-        plt.rcParams["figure.figsize"] = fig_size
-
         # Save profile with dpi = 300
-        plt.savefig(img_path, dpi=300)
-        
-
-    def _set_profile_layout(self):
-        """ Set properties of main window """
-
-        # Set window name
-        self.win = plt.gcf()
-        self.win.canvas.set_window_title('Draw Profile')
-
-        # Hide axes
-        self.axes = plt.gca()
-        self.axes.set_axis_off()
-
-        # Set background color of window
-        self.fig1 = plt.figure(1)
-        self.fig1.tight_layout()
-        self.rect = self.fig1.patch
-        self.rect.set_facecolor('white')
-
-
-    def _set_profile_variables(self, arcs, nodes, terrains):
-        """ Get and calculate parameters and values for drawing """
-
-        # Declare list elements
-        self.list_of_selected_arcs = arcs
-        self.list_of_selected_nodes = []
-        self.list_of_selected_terrains = []
-
-        # Populate list nodes
-        for node in nodes:
-            self.list_of_selected_nodes.append(node)
-
-        # Populate list terrains
-        for terrain in terrains:
-            self.list_of_selected_terrains.append(terrain)
-
-        self.gis_length = [0]
-        self.arc_dimensions = []
-        self.arc_catalog = []
-        self.start_point = [0]
-
-        # Get arcs between nodes (on shortest path)
-        self.n = len(self.list_of_selected_nodes)
-        self.t = len(self.list_of_selected_terrains)
-
-        for arc in arcs:
-            self.gis_length.append(arc['length'])
-            self.arc_dimensions.append(json.loads(arc['descript'], object_pairs_hook=OrderedDict)['dimensions'])
-            self.arc_catalog.append(json.loads(arc['descript'], object_pairs_hook=OrderedDict)['catalog'])
-
-        # Calculate start_point (coordinates) of drawing for each node
-        n = len(self.gis_length)
-        for i in range(1, n):
-            x = self.start_point[i - 1] + self.gis_length[i]
-            self.start_point.append(x)
-            i += 1
-
-    def _fill_profile_variables(self, arcs, nodes, terrains):
-        """ Get parameters from database. Fill self.nodes with parameters postgres """
-
-        # Get parameters and fill the nodes
-        n = 0
-        for node in nodes:
-            parameters = GwNodeData()
-            parameters.start_point = self.start_point[n]
-            parameters.top_elev = node['top_elev']
-            parameters.ymax = node['ymax']
-            parameters.elev = node['elev']
-            parameters.node_id = node['node_id']
-            parameters.geom = node['cat_geom1']
-            parameters.descript = [json.loads(node['descript'], object_pairs_hook=OrderedDict)][0]
-            parameters.data_type = node['data_type']
-            parameters.surface_type = node['surface_type']
-
-            self.nodes.append(parameters)
-            n = n + 1
-
-        # Get parameters and fill the links
-        n = 0
-        for terrain in terrains:
-            parameters = GwNodeData()
-            parameters.start_point = terrain['total_x']
-            parameters.top_elev = json.loads(terrain['label_n1'], object_pairs_hook=OrderedDict)['top_elev']
-            parameters.node_id = terrain['top_n1']
-            parameters.geom = terrain['top_n2']
-            parameters.descript = [json.loads(terrain['label_n1'], object_pairs_hook=OrderedDict)][0]
-            parameters.surface_type = terrain['surface_type']
-
-            self.links.append(parameters)
-            n = n + 1
-
-        # Populate node parameters with associated arcs
-        n = 0
-        for arc in arcs:
-            self.nodes[n].z1 = arc['z1']
-            self.nodes[n].z2 = arc['z2']
-            self.nodes[n].cat_geom = arc['cat_geom1']
-            self.nodes[n].elev1 = arc['elev1']
-            self.nodes[n].elev2 = arc['elev2']
-            self.nodes[n].y1 = arc['y1']
-            self.nodes[n].y2 = arc['y2']
-            self.nodes[n].slope = 1
-            self.nodes[n].node_1 = arc['node_1']
-            self.nodes[n].node_2 = arc['node_2']
-            n += 1
-
-
-    def _draw_start_node(self, node):
-        """ Draw first node """
-
-        # Get superior points
-        s1x = -node.geom / 2
-        s1y = node.top_elev
-        s2x = node.geom / 2
-        s2y = node.top_elev
-        s3x = node.geom / 2
-        s3y = node.top_elev - node.ymax + node.z1 + node.cat_geom
-
-        # Get inferior points
-        i1x = -node.geom / 2
-        i1y = node.top_elev - node.ymax
-        i2x = node.geom / 2
-        i2y = node.top_elev - node.ymax
-        i3x = node.geom / 2
-        i3y = node.top_elev - node.ymax + node.z1
-
-        # Create list points
-        xinf = []
-        yinf = []
-        xsup = []
-        ysup = []
-        if node.surface_type == 'TOP':
-            xinf = [s1x, i1x, i2x, i3x]
-            yinf = [s1y, i1y, i2y, i3y]
-            xsup = [s1x, s2x, s3x]
-            ysup = [s1y, s2y, s3y]
-        else:
-            s0x = -node.geom / 2
-            s0y = node.top_elev - node.ymax + node.z1 + node.cat_geom
-            xinf = [s0x, i1x, i2x, i3x]
-            yinf = [s0y, i1y, i2y, i3y]
-            xsup = [s0x, s3x]
-            ysup = [s0y, s3y]
-
-
-        # draw first node bottom line
-        plt.plot(xinf, yinf, zorder=100, linestyle=self._get_stylesheet(node.data_type)[0],
-                 color=self._get_stylesheet(node.data_type)[1], linewidth=self._get_stylesheet(node.data_type)[2])
-
-        # draw first node upper line
-        plt.plot(xsup, ysup, zorder=100, linestyle=self._get_stylesheet(node.data_type)[0],
-                 color=self._get_stylesheet(node.data_type)[1], linewidth=self._get_stylesheet(node.data_type)[2])
-
-        self.first_top_x = 0
-        self.first_top_y = node.top_elev
-
-        # Save last points for first node
-        self.slast = [s3x, s3y]
-        self.ilast = [i3x, i3y]
-
-        # Save last points for first node
-        self.slast2 = [s3x, s3y]
-        self.ilast2 = [i3x, i3y]
-
-        # Fill table with start node values
-        self._fill_guitar_text_node(0, 0)
-
-        # Draw header
-        self._draw_guitar_vertical_lines(node.start_point)
-        self._fill_guitar_text_legend()
-        self._draw_guitar_auxiliar_lines(0)
-
-
-    def _draw_guitar_vertical_lines(self, start_point):
-        """ Draw fixed part of table """
-
-        # Get stylesheet
-        line_color = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['color']
-        line_style = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['style']
-        line_width = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['width']
-
-        # Vertical line [-1,0]
-        # x = [start_point - self.fix_x * Decimal(0.2), start_point - self.fix_x * Decimal(0.2)]
-        # y = [self.min_top_elev - 1 * self.height_row, self.min_top_elev - Decimal(5.85) * self.height_row]
-        # plt.plot(x, y, linestyle=line_style, color=line_color, linewidth=line_width, zorder=100)
-
-        # Vertical line [-2,0]
-        x = [start_point - self.fix_x * Decimal(0.75), start_point - self.fix_x * Decimal(0.75)]
-        y = [self.min_top_elev - Decimal(1.9) * self.height_row, self.min_top_elev - Decimal(5.10) * self.height_row]
-        plt.plot(x, y, linestyle=line_style, color=line_color, linewidth=line_width, zorder=100)
-
-        # Vertical line [-3,0]
-        x = [start_point - self.fix_x, start_point - self.fix_x]
-        y = [self.min_top_elev - 1 * self.height_row, self.min_top_elev - Decimal(5.85) * self.height_row]
-        plt.plot(x, y, linestyle=line_style, color=line_color, linewidth=line_width, zorder=100)
-
-
-    def _draw_guitar_auxiliar_lines(self, start_point, first_vl=True):
-        """ Draw marks for each node """
-
-        # Get stylesheet
-        auxline_color = self.profile_json['body']['data']['stylesheet']['guitar']['auxiliarlines']['color']
-        auxline_style = self.profile_json['body']['data']['stylesheet']['guitar']['auxiliarlines']['style']
-        auxline_width = self.profile_json['body']['data']['stylesheet']['guitar']['auxiliarlines']['width']
-
-        if first_vl:  # separator for first slope / length (only for nodes)
-            # Vertical line [0,0]
-            x = [start_point, start_point]
-            y = [self.min_top_elev - 1 * self.height_row,
-                 self.min_top_elev - Decimal(1.9) * self.height_row]
-            plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-        # Vertical lines
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(1.90) * self.height_row, self.min_top_elev - Decimal(2.05) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(2.60) * self.height_row, self.min_top_elev - Decimal(2.85) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(3.4) * self.height_row, self.min_top_elev - Decimal(3.65) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(4.20) * self.height_row, self.min_top_elev - Decimal(4.45) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(5) * self.height_row, self.min_top_elev - Decimal(5.25) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(5.85) * self.height_row, self.min_top_elev - Decimal(5.7) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-
-    def _fill_guitar_text_legend(self):
-
-        # Get stylesheet values
-        text_color = self.profile_json['body']['data']['stylesheet']['guitar']['text']['color']
-        text_weight = self.profile_json['body']['data']['stylesheet']['guitar']['text']['weight']
-        title_color = self.profile_json['body']['data']['stylesheet']['title']['text']['color']
-        title_weight = self.profile_json['body']['data']['stylesheet']["title"]['text']['weight']
-        title_size = self.profile_json['body']['data']['stylesheet']["title"]['text']['size']
-
-        legend = self.profile_json['body']['data']['legend']
-        c = (self.fix_x - self.fix_x * Decimal(0.2)) / 2
-        plt.text(-(c + self.fix_x * Decimal(0.2)),
-                 self.min_top_elev - 1 * self.height_row - Decimal(0.35) * self.height_row, legend['catalog'],
-                 fontsize=7.5, color=text_color, fontweight=text_weight, horizontalalignment='center')
-
-        plt.text(-(c + self.fix_x * Decimal(0.2)),
-                 self.min_top_elev - 1 * self.height_row - Decimal(0.68) * self.height_row, legend['dimensions'],
-                 fontsize=7.5, color=text_color, fontweight=text_weight, horizontalalignment='center')
-
-        c = (self.fix_x * Decimal(0.25)) / 2
-        plt.text(-(c + self.fix_x * Decimal(0.74)),
-                 self.min_top_elev - Decimal(2) * self.height_row - self.height_row * 3 / 2, legend['ordinates'],
-                 fontsize=7.5, color=text_color, fontweight=text_weight, rotation='vertical',
-                 horizontalalignment='center', verticalalignment='center')
-
-        plt.text(-self.fix_x * Decimal(0.70), self.min_top_elev - Decimal(1.85) * self.height_row - self.height_row / 2,
-                 legend['topelev'], fontsize=7.5, color=text_color, fontweight=text_weight, verticalalignment='center')
-
-        plt.text(-self.fix_x * Decimal(0.70), self.min_top_elev - Decimal(2.65) * self.height_row - self.height_row / 2,
-                 legend['ymax'], fontsize=7.5, color=text_color, fontweight=text_weight, verticalalignment='center')
-
-        plt.text(-self.fix_x * Decimal(0.70), self.min_top_elev - Decimal(3.45) * self.height_row - self.height_row / 2,
-                 legend['elev'], fontsize=7.5, color=text_color, fontweight=text_weight, verticalalignment='center')
-
-        plt.text(-self.fix_x * Decimal(0.70), self.min_top_elev - Decimal(4.25) * self.height_row - self.height_row / 2,
-                 legend['distance'], fontsize=7.5, color=text_color, fontweight=text_weight, verticalalignment='center')
-
-        c = (self.fix_x - self.fix_x * Decimal(0.2)) / 2
-        plt.text(-(c + self.fix_x * Decimal(0.2)),
-                 self.min_top_elev - Decimal(self.height_row * 5 + self.height_row / 2), legend['code'],
-                 fontsize=7.5, color=text_color, fontweight=text_weight, horizontalalignment='center',
-                 verticalalignment='center')
-
-        # Print title
-        title = tools_qt.get_text(self.dlg_draw_profile, self.dlg_draw_profile.txt_title, False, False)
-        # Set default value if no title is given
-        if title in ('', None):
-            title = f"PROFILE {self.initNode} - {self.endNode}"
-        plt.text(-self.fix_x * Decimal(1), self.min_top_elev - Decimal(5.75) * self.height_row - self.height_row / 2,
-                 title, fontsize=title_size, color=title_color, fontweight=title_weight,
-                 verticalalignment='center')
-
-        date = tools_qt.get_calendar_date(self.dlg_draw_profile, self.dlg_draw_profile.date)
-        plt.text(-self.fix_x * Decimal(1), self.min_top_elev - Decimal(6) * self.height_row - self.height_row / 2,
-                 date, fontsize=title_size * 0.7, color=title_color, fontweight=title_weight, verticalalignment='center')
-
-
-    def _draw_nodes(self, node, prev_node, index):
-        """ Draw nodes between first and last node """
-
-        z1 = prev_node.z2
-        z2 = node.z1
-
-        if node.node_1 is None:
-            return
-
-        # Get superior points
-        s1x = self.slast[0]
-        s1y = self.slast[1]
-
-        if node.geom is None:
-            node.geom = 0
-
-        s2x = node.start_point - node.geom / 2
-        s2y = node.top_elev - node.ymax + z1 + prev_node.cat_geom
-        s3x = node.start_point - node.geom / 2
-        s3y = node.top_elev
-        s4x = node.start_point + node.geom / 2
-        s4y = node.top_elev
-        s5x = node.start_point + node.geom / 2
-        s5y = node.top_elev - node.ymax + z2 + node.cat_geom
-
-        # Get inferior points
-        i1x = self.ilast[0]
-        i1y = self.ilast[1]
-        i2x = node.start_point - node.geom / 2
-        i2y = node.top_elev - node.ymax + z1
-        i3x = node.start_point - node.geom / 2
-        i3y = node.top_elev - node.ymax
-        i4x = node.start_point + node.geom / 2
-        i4y = node.top_elev - node.ymax
-        i5x = node.start_point + node.geom / 2
-        i5y = node.top_elev - node.ymax + z2
-
-        # Create arc list points
-        xainf = [i1x, i2x]
-        yainf = [i1y, i2y]
-        xasup = [s1x, s2x]
-        yasup = [s1y, s2y]
-
-        # Create node list points
-        xninf = [i2x, i3x, i4x, i5x]
-        yninf = [i2y, i3y, i4y, i5y]
-        xnsup = []
-        ynsup = []
-        if node.surface_type == 'TOP':
-            xnsup = [s2x, s3x, s4x, s5x]
-            ynsup = [s2y, s3y, s4y, s5y]
-        else:
-            xnsup = [s2x, s5x]
-            ynsup = [s2y, s5y]
-
-        # draw node bottom line
-        plt.plot(xninf, yninf,
-                 zorder=100,
-                 linestyle=self._get_stylesheet(node.data_type)[0],
-                 color=self._get_stylesheet(node.data_type)[1],
-                 linewidth=self._get_stylesheet(node.data_type)[2])
-
-        # draw node upper line
-        plt.plot(xnsup, ynsup,
-                 zorder=100,
-                 linestyle=self._get_stylesheet(node.data_type)[0],
-                 color=self._get_stylesheet(node.data_type)[1],
-                 linewidth=self._get_stylesheet(node.data_type)[2])
-
-        if self.lastnode_datatype == 'INTERPOLATED' or node.data_type == 'INTERPOLATED':
-            data_type = 'INTERPOLATED'
-        else:
-            data_type = 'REAL'
-
-        # draw arc bottom line
-        plt.plot(xainf, yainf,
-                 zorder=100,
-                 linestyle=self._get_stylesheet(data_type)[0],
-                 color=self._get_stylesheet(data_type)[1],
-                 linewidth=self._get_stylesheet(data_type)[2])
-
-        # draw arc upper line
-        plt.plot(xasup, yasup,
-                 zorder=100,
-                 linestyle=self._get_stylesheet(data_type)[0],
-                 color=self._get_stylesheet(data_type)[1],
-                 linewidth=self._get_stylesheet(data_type)[2])
-
-        self.node_top_x = node.start_point
-        self.node_top_y = node.top_elev
-        self.first_top_x = prev_node.start_point
-        self.first_top_y = prev_node.top_elev
-
-        # Draw guitar auxiliar lines
-        self._draw_guitar_auxiliar_lines(node.start_point)
-
-        # Fill table
-        self._fill_guitar_text_node(node.start_point, index)
-
-        # Save last points before the last node
-        self.slast = [s5x, s5y]
-        self.ilast = [i5x, i5y]
-        self.lastnode_datatype = node.data_type
-
-        # Save last points for draw ground
-        self.slast2 = [s3x, s3y]
-        self.ilast2 = [i3x, i3y]
-
-
-    def _fill_guitar_text_node(self, start_point, index):
-
-        # Get stylesheet values
-        text_color = self.profile_json['body']['data']['stylesheet']['guitar']['text']['color']
-        text_weight = self.profile_json['body']['data']['stylesheet']['guitar']['text']['weight']
-
-        # Fill top_elevation
-        s = ' ' + '\n' + str(self.nodes[index].descript['top_elev']) + '\n' + ' '
-        xy = (Decimal(start_point), self.min_top_elev - Decimal(self.height_row * Decimal(1.8) + self.height_row / 2))
-        plt.annotate(s, xy=xy, fontsize=6, color=text_color, fontweight=text_weight, rotation='vertical',
-                     horizontalalignment='center', verticalalignment='center')
-        # Fill code
-        plt.text(0 + start_point, self.min_top_elev - Decimal(self.height_row * 5 + self.height_row / 2),
-                 self.nodes[index].descript['code'], fontsize=7.5, color=text_color, fontweight=text_weight,
-                 horizontalalignment='center', verticalalignment='center')
-
-        # Node init
-        if index == 0:
-
-            y1 = self.nodes[0].y1
-            elev1 = self.nodes[0].elev1
-
-            # Fill y_max
-            plt.annotate(' ' + '\n' + str(self.nodes[0].descript['ymax']) + '\n' + str(y1),
-                         xy=(Decimal(0 + start_point),
-                             self.min_top_elev - Decimal(self.height_row * Decimal(2.60) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill elevation
-            plt.annotate(' ' + '\n' + str(self.nodes[0].descript['elev']) + '\n' + str(elev1),
-                         xy=(Decimal(0 + start_point),
-                             self.min_top_elev - Decimal(self.height_row * Decimal(3.40) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill total length
-            plt.annotate(str(self.nodes[index].descript['total_distance']),
-                         xy=(Decimal(0 + start_point),
-                             self.min_top_elev - Decimal(
-                                 self.height_row * Decimal(4.20) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-        # Nodes between init and end
-        elif index < self.n - 1:
-
-            # defining variables
-            y2_prev = self.nodes[index - 1].y2
-            elev2_prev = self.nodes[index - 1].elev2
-            y1 = self.nodes[index].y1
-            elev1 = self.nodes[index].elev1
-
-            if y2_prev in (None, 'None') or self.nodes[index].descript['ymax'] in (None, 'None') or y1 in (None, 'None')\
-                    or elev2_prev in (None, 'None') or self.nodes[index].descript['elev'] in (None, 'None') or elev1 in (None, 'None'):
-                self.none_values.append(self.nodes[index].descript['code'])
-
-            # Fill y_max
-            plt.annotate(
-                str(y2_prev) + '\n' + str(self.nodes[index].descript['ymax']) + '\n' + str(y1),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(2.60) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill elevation
-            plt.annotate(
-                str(elev2_prev) + '\n' + str(self.nodes[index].descript['elev']) + '\n' + str(elev1),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(3.40) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill total length
-            plt.annotate(str(self.nodes[index].descript['total_distance']),
-                         xy=(Decimal(0 + start_point),
-                         self.min_top_elev - Decimal(self.height_row * Decimal(4.20) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-        # Node end
-        elif index == self.n - 1:
-
-            # Fill y_max
-            plt.annotate(
-                str(self.nodes[index - 1].y2) + '\n' + str(self.nodes[index].descript['ymax']),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(2.60) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill elevation
-            plt.annotate(
-                str(self.nodes[index - 1].elev2) + '\n' + str(self.nodes[index].descript['elev']),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(3.40) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill total length
-            plt.annotate(str(self.nodes[index].descript['total_distance']),
-                         xy=(Decimal(0 + start_point),
-                         self.min_top_elev - Decimal(self.height_row * Decimal(4.20) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-
-        # Fill diameter and slope / length
-        if index != self.n - 1:
-
-            # Fill diameter
-            center = self.gis_length[index + 1] / 2
-            plt.text(center + start_point, self.min_top_elev - 1 * self.height_row - Decimal(0.35) * self.height_row,
-                     self.arc_catalog[index],
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='center')  # PUT IN THE MIDDLE PARAMETRIZATION
-
-            # Fill slope / length
-            plt.text(center + start_point, self.min_top_elev - 1 * self.height_row - Decimal(0.68) * self.height_row,
-                     self.arc_dimensions[index],
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='center')  # PUT IN THE MIDDLE PARAMETRIZATION
-
-
-    def _fill_guitar_text_terrain(self, start_point, index):
-
-        if str(self.links[index].surface_type) == 'VNODE':
-
-            # Get stylesheet values
-            text_color = self.profile_json['body']['data']['stylesheet']['guitar']['text']['color']
-            text_weight = self.profile_json['body']['data']['stylesheet']['guitar']['text']['weight']
-
-            # Fill top_elevation
-            s = ' ' + '\n' + str(self.links[index].descript['top_elev']) + '\n' + ' '
-            xy = (Decimal(start_point), self.min_top_elev - Decimal(self.height_row * Decimal(1.8) + self.height_row / 2))
-            plt.annotate(s, xy=xy, fontsize=6, color=text_color, fontweight=text_weight, rotation='vertical',
-                         horizontalalignment='center', verticalalignment='center')
-
-            # Fill code
-            plt.text(0 + start_point, self.min_top_elev - Decimal(self.height_row * Decimal(5) + self.height_row / 2),
-                     self.links[index].descript['code'],
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='center', verticalalignment='center')
-
-            # Fill y_max
-            plt.annotate(
-                str(self.links[index].descript['ymax']),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(2.60) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill elevation
-            plt.annotate(
-                str(self.links[index].descript['elev']),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(3.40) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill total length
-            plt.annotate(str(self.links[index].descript['total_distance']),
-                 xy=(Decimal(0 + start_point),
-                     self.min_top_elev - Decimal(self.height_row * Decimal(4.20) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-
-    def _draw_end_node(self, node, prev_node, index):
-        """
-        draws last arc and nodes of profile
-        :param node:
-        :param prev_node:
-        :param index:
-        :return:
-        """
-
-        s1x = self.slast[0]
-        s1y = self.slast[1]
-
-        s2x = node.start_point - node.geom / 2
-        s2y = node.top_elev - node.ymax + prev_node.z2 + prev_node.cat_geom
-        s3x = node.start_point - node.geom / 2
-        s3y = node.top_elev
-        s4x = node.start_point + node.geom / 2
-        s4y = node.top_elev
-
-        # Get inferior points
-        i1x = self.ilast[0]
-        i1y = self.ilast[1]
-        i2x = node.start_point - node.geom / 2
-        i2y = node.top_elev - node.ymax + prev_node.z2
-        i3x = node.start_point - node.geom / 2
-        i3y = node.top_elev - node.ymax
-        i4x = node.start_point + node.geom / 2
-        i4y = node.top_elev - node.ymax
-
-        # Create arc list points
-        xainf = [i1x, i2x]
-        yainf = [i1y, i2y]
-        xasup = [s1x, s2x]
-        yasup = [s1y, s2y]
-
-        # Create node list points
-        xninf = [i2x, i3x, i4x]
-        yninf = [i2y, i3y, i4y]
-        xnsup = []
-        ynsup = []
-        if node.surface_type == 'TOP':
-            xnsup = [s2x, s3x, s4x, i4x]
-            ynsup = [s2y, s3y, s4y, i4y]
-        else:
-            s0x = node.start_point + node.geom / 2
-            s0y = node.top_elev - node.ymax + prev_node.z2 + prev_node.cat_geom
-            xnsup = [s2x, s0x, i4x]
-            ynsup = [s2y, s0y, i4y]
-
-        # draw node bottom line
-        plt.plot(xninf, yninf,
-                 zorder=100,
-                 linestyle=self._get_stylesheet(node.data_type)[0],
-                 color=self._get_stylesheet(node.data_type)[1],
-                 linewidth=self._get_stylesheet(node.data_type)[2])
-
-        # draw node upper line
-        plt.plot(xnsup, ynsup,
-                 zorder=100,
-                 linestyle=self._get_stylesheet(node.data_type)[0],
-                 color=self._get_stylesheet(node.data_type)[1],
-                 linewidth=self._get_stylesheet(node.data_type)[2])
-
-        # draw arc bottom line
-        plt.plot(xainf, yainf,
-                 zorder=100,
-                 linestyle=self._get_stylesheet(self.lastnode_datatype)[0],
-                 color=self._get_stylesheet(self.lastnode_datatype)[1],
-                 linewidth=self._get_stylesheet(self.lastnode_datatype)[2])
-
-        # draw arc upper line
-        plt.plot(xasup, yasup,
-                 zorder=100,
-                 linestyle=self._get_stylesheet(self.lastnode_datatype)[0],
-                 color=self._get_stylesheet(self.lastnode_datatype)[1],
-                 linewidth=self._get_stylesheet(self.lastnode_datatype)[2])
-
-        self.first_top_x = self.slast2[0]
-        self.first_top_y = self.slast2[1]
-
-        self.node_top_x = node.start_point
-        self.node_top_y = node.top_elev
-
-        # Draw table-marks
-        self._draw_guitar_auxiliar_lines(node.start_point)
-
-        # Fill table
-        self._fill_guitar_text_node(node.start_point, index)
-
-        # Reset lastnode_datatype
-        self.lastnode_datatype = 'REAL'
-
-
-    def _set_guitar_parameters(self):
-        """
-        Define parameters of table
-        :return:
-        """
-
-        # Search y coordinate min_top_elev ( top_elev- ymax)
-        self.min_top_elev = Decimal(self.nodes[0].top_elev - self.nodes[0].ymax)
-
-        # self.min_top_elev_descript = Decimal(self.nodes[0].descript['top_elev'] - self.nodes[0].descript['ymax'])
-        for i in range(1, self.n):
-            if (self.nodes[i].top_elev - self.nodes[i].ymax) < self.min_top_elev:
-                self.min_top_elev = Decimal(self.nodes[i].top_elev - self.nodes[i].ymax)
-
-        # Search y coordinate max_top_elev
-        self.max_top_elev = self.nodes[0].top_elev
-        self.max_top_elev_descript = self.nodes[0].descript['top_elev']
-        for i in range(1, self.n):
-            if self.nodes[i].top_elev > self.max_top_elev:
-                self.max_top_elev = self.nodes[i].top_elev
-
-        # Calculating dimensions of x-fixed part of table
-        self.fix_x = Decimal(Decimal(0.15) * Decimal(self.nodes[self.n - 1].start_point))
-
-        # Calculating dimensions of y-fixed part of table
-        # Height y = height of table + height of graph
-        self.z = Decimal(self.max_top_elev) - Decimal(self.min_top_elev)
-        self.height_row = (Decimal(self.z) * Decimal(0.97)) / Decimal(5)
-
-        # Height of graph + table
-        self.height_y = Decimal(self.z * 2)
-
-
-    def _draw_guitar_horitzontal_lines(self):
-        """
-        Draw horitzontal lines of table
-        :return:
-        """
-        line_color = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['color']
-        line_style = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['style']
-        line_width = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['width']
-
-        self._set_guitar_parameters()
-
-        # Draw upper horizontal lines (long ones)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x]
-        y = [self.min_top_elev - self.height_row, self.min_top_elev - self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x]
-        y = [self.min_top_elev - Decimal(1.9) * self.height_row, self.min_top_elev - Decimal(1.9) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-
-        # Draw middle horizontal lines (short ones)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x * Decimal(0.75)]
-        y = [self.min_top_elev - Decimal(2.70) * self.height_row, self.min_top_elev - Decimal(2.70) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x * Decimal(0.75)]
-        y = [self.min_top_elev - Decimal(3.50) * self.height_row, self.min_top_elev - Decimal(3.50) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x * Decimal(0.75)]
-        y = [self.min_top_elev - Decimal(4.30) * self.height_row, self.min_top_elev - Decimal(4.30) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-
-        # Draw lower horizontal lines (long ones)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x]
-        y = [self.min_top_elev - Decimal(5.10) * self.height_row, self.min_top_elev - Decimal(5.10) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x]
-        y = [self.min_top_elev - Decimal(5.85) * self.height_row, self.min_top_elev - Decimal(5.85) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-
-
-    def _draw_grid(self):
-
-        # get values for lines
-        line_color = self.profile_json['body']['data']['stylesheet']['grid']['lines']['color']
-        line_style = self.profile_json['body']['data']['stylesheet']['grid']['lines']['style']
-        line_width = self.profile_json['body']['data']['stylesheet']['grid']['lines']['width']
-
-        # get values for boundary
-        boundary_color = self.profile_json['body']['data']['stylesheet']['grid']['boundary']['color']
-        boundary_style = self.profile_json['body']['data']['stylesheet']['grid']['boundary']['style']
-        boundary_width = self.profile_json['body']['data']['stylesheet']['grid']['boundary']['width']
-
-        # get values for text
-        text_color = self.profile_json['body']['data']['stylesheet']['grid']['text']['color']
-        text_weight = self.profile_json['body']['data']['stylesheet']['grid']['text']['weight']
-
-        start_point = self.nodes[self.n - 1].start_point
-        geom1 = self.nodes[self.n - 1].geom
-
-        # Draw main text
-        try:
-            reference_plane = self.profile_json['body']['data']['legend']['referencePlane']
-        except KeyError:
-            reference_plane = "REFERENCE"
-        plt.text(-self.fix_x * Decimal(1), self.min_top_elev - Decimal(0.5) * self.height_row - self.height_row / 2,
-                 f"{reference_plane}: {round(self.min_top_elev - 1 * self.height_row, 2)}\n ",
-                 fontsize=8.5,
-                 color=text_color, fontweight=text_weight,
-                 verticalalignment='center')
-
-        # Draw boundary
-        x = [0, 0]
-        y = [self.min_top_elev - 1 * self.height_row, int(math.ceil(self.max_top_elev) + 1)]
-        plt.plot(x, y, color=boundary_color, linestyle=boundary_style, linewidth=boundary_width, zorder=100)
-        x = [start_point, start_point]
-        y = [self.min_top_elev - 1 * self.height_row, int(math.ceil(self.max_top_elev) + 1)]
-        plt.plot(x, y, color=boundary_color, linestyle=boundary_style, linewidth=boundary_width, zorder=100)
-        x = [0, start_point]
-        y = [int(math.ceil(self.max_top_elev) + 1), int(math.ceil(self.max_top_elev) + 1)]
-        plt.plot(x, y, color=boundary_color, linestyle=boundary_style, linewidth=boundary_width, zorder=100)
-
-        # Draw horitzontal lines
-        y = int(math.ceil(self.min_top_elev - 1 * self.height_row))
-        x = int(math.floor(self.max_top_elev))
-        if x % 2 == 0:
-            x = x + 2
-        else:
-            x = x + 1
-
-        for i in range(y, x):
-            if i % 2 == 0:
-                x1 = [0, start_point]
-                y1 = [i, i]
-            else:
-                i = i + 1
-                x1 = [0, start_point]
-                y1 = [i, i]
-
-            # set line
-            plt.plot(x1, y1, color=line_color, linestyle=line_style, linewidth=line_width, zorder=1)
-
-            # set texts
-            plt.text(0 - Decimal(geom1) * Decimal(1.5), i, str(i),
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='right', verticalalignment='center')
-            plt.text(Decimal(start_point) + Decimal(geom1) * Decimal(1.5), i, str(i),
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='left', verticalalignment='center')
-
-        # Draw vertical lines
-        x = int(math.floor(start_point))
-        for i in range(50, x, 50):
-            x1 = [i, i]
-            y1 = [self.min_top_elev - 1 * self.height_row, int(math.ceil(self.max_top_elev) + 1)]
-
-            # set line
-            plt.plot(x1, y1, color=line_color, linestyle=line_style, linewidth=line_width, zorder=1)
-
-            # set texts
-            plt.annotate(str(i) + '\n' + ' ', xy=(i, int(math.ceil(self.max_top_elev) + 1)),
-                         fontsize=6.5, color=text_color, fontweight=text_weight, horizontalalignment='center')
-
-
-    def _draw_terrain(self, index):
-
-        # getting variables
-        line_color = self.profile_json['body']['data']['stylesheet']['terrain']['color']
-        line_style = self.profile_json['body']['data']['stylesheet']['terrain']['style']
-        line_width = self.profile_json['body']['data']['stylesheet']['terrain']['width']
-
-        # Draw marker
-        if index == 1:
-            plt.plot(self.first_top_x, self.first_top_y, marker='|', color=line_color)
-        else:
-            plt.plot(self.node_top_x, self.node_top_y, marker='|', color=line_color)
-
-        # Draw line
-        x = [self.first_top_x, self.node_top_x]
-        y = [self.first_top_y, self.node_top_y]
-        plt.plot(x, y, color=line_color, linewidth=line_width, linestyle=line_style)
+        figure.savefig(img_path, dpi=300)
 
 
     def _clear_profile(self):
@@ -1420,7 +587,6 @@ class GwProfileButton(GwAction):
         self.list_of_selected_nodes = []
         self.list_of_selected_arcs = []
         self.arcs = []
-        self.nodes = []
 
         # Clear widgets
         self.dlg_draw_profile.tbl_list_arc.clear()
@@ -1469,22 +635,4 @@ class GwProfileButton(GwAction):
             self.iface.actionPan().trigger()
 
 
-    def _get_stylesheet(self, data_type='REAL'):
-
-        # TODO: Enhance this function, manage all case for data_type, harmonie REAL/TOP-REAL...
-        # getting stylesheet
-        line_style = ''
-        line_color = ''
-        line_width = ''
-        if data_type in ('REAL', 'TOP-REAL'):
-            line_style = self.profile_json['body']['data']['stylesheet']['infra']['real']['style']
-            line_color = self.profile_json['body']['data']['stylesheet']['infra']['real']['color']
-            line_width = self.profile_json['body']['data']['stylesheet']['infra']['real']['width']
-        elif data_type == 'INTERPOLATED':
-            line_style = self.profile_json['body']['data']['stylesheet']['infra']['interpolated']['style']
-            line_color = self.profile_json['body']['data']['stylesheet']['infra']['interpolated']['color']
-            line_width = self.profile_json['body']['data']['stylesheet']['infra']['interpolated']['width']
-
-        return line_style, line_color, line_width
-
     # endregion
@@ -44,9 +44,6 @@ class GwConfigButton(GwAction):
         self.tab_admin_loaded = False
         self.json_result = None
 
-        # Get user
-        cur_user = tools_db.get_current_user()
-
         self.list_update = []
 
         # Get visible layers name from TOC
@@ -79,7 +76,7 @@ class GwConfigButton(GwAction):
         self._hide_void_tab_groupbox(grbox_list)
 
         # Check user/role and remove tabs
-        role_admin = tools_db.check_role_user("role_admin", cur_user)
+        role_admin = tools_gw.check_role_user("role_admin")
         if not role_admin:
             tools_qt.remove_tab(self.dlg_config.tab_main, "tab_admin")
 
@@ -194,6 +191,9 @@ class GwConfigButton(GwAction):
         if not json_result or json_result['status'] == 'Failed':
             return False
 
+        # Values of config_param_system may have changed
+        tools_gw.get_metadata_cache().clear_config_values()
+
         # Update current_workspace label (status bar)
         tools_gw.manage_current_selections_docker(json_result)
 
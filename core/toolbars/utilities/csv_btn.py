@@ -377,15 +377,13 @@ class GwCSVButton(GwAction):
     def _get_rolenames(self):
         """ Get list of rolenames of current user """
 
-        sql = ("SELECT rolname FROM pg_roles "
-               " WHERE pg_has_role(current_user, oid, 'member')")
-        rows = tools_db.get_rows(sql)
+        rows = sorted(tools_gw.get_user_roles())
         if not rows:
             return None
 
         roles = "("
         for i in range(0, len(rows)):
-            roles += "'" + str(rows[i][0]) + "', "
+            roles += "'" + str(rows[i]) + "', "
         roles = roles[:-2]
         roles += ")"
 
@@ -0,0 +1,144 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import configparser
+import os
+import threading
+
+from ...libs import tools_log
+
+
+class GwConfigStore:
+    """ Keep the parsers of the configuration files in memory.
+        Files are parsed again only when they change on disk (modification time or size) and changes made through
+        set_value are written to disk after @flush_delay seconds, so several consecutive changes cost one write.
+    """
+
+    def __init__(self, flush_delay=1.0):
+
+        self.flush_delay = flush_delay
+        self.parsers = {}           # {path: [parser, stamp of the file when it was read or written]}
+        self.dirty = set()          # Paths with changes not written yet
+        self.timer = None
+        self.lock = threading.RLock()
+
+
+    def get_parser(self, path, reload=False):
+        """ Get the parser of file @path, reading it again if it has been modified by another process.
+            Raise configparser errors if the file can't be parsed
+        """
+
+        with self.lock:
+            if reload:
+                self.flush(path)
+            entry = self.parsers.get(path)
+            if entry is not None and not reload and (path in self.dirty or entry[1] == self._get_stamp(path)):
+                return entry[0]
+
+            tools_log.log_info(f"Creating parser for file: {path}")
+            parser = configparser.ConfigParser(comment_prefixes=";", allow_no_value=True, strict=False)
+            stamp = self._get_stamp(path)
+            parser.read(path)
+            self.parsers[path] = [parser, stamp]
+            return parser
+
+
+    def get_value(self, path, section, option):
+        """ Get the raw value of @option. Return None if the section or the option doesn't exist """
+
+        with self.lock:
+            parser = self.get_parser(path)
+            if not parser.has_section(section) or not parser.has_option(section, option):
+                return None
+            return parser[section][option]
+
+
+    def has_option(self, path, section, option):
+
+        with self.lock:
+            parser = self.get_parser(path)
+            return parser.has_section(section) and parser.has_option(section, option)
+
+
+    def set_value(self, path, section, option, value=None):
+        """ Set @value of @option (a None value writes just the option, used for comments) and schedule the write """
+
+        with self.lock:
+            parser = self.get_parser(path)
+            if section not in parser:
+                parser.add_section(section)
+            if value is None:
+                parser.set(section, option)
+            else:
+                parser.set(section, option, value)
+            self.dirty.add(path)
+            self._schedule_flush()
+
+
+    def flush(self, path=None):
+        """ Write the pending changes of file @path (all the files if None).
+            A file that can't be written keeps its changes pending and doesn't stop the others from being written
+        """
+
+        with self.lock:
+            paths = [path] if path is not None else list(self.dirty)
+            for _path in paths:
+                if _path not in self.dirty:
+                    continue
+                parser = self.parsers[_path][0]
+                try:
+                    folder = os.path.dirname(_path)
+                    if folder and not os.path.exists(folder):
+                        os.makedirs(folder)
+                    with open(_path, 'w') as configfile:
+                        parser.write(configfile)
+                except OSError as e:
+                    tools_log.log_warning(f"Error writing config file: {_path}", parameter=e)
+                    continue
+                self.dirty.discard(_path)
+                self.parsers[_path][1] = self._get_stamp(_path)
+
+            if not self.dirty and self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+
+    def clear(self):
+        """ Write the pending changes and forget all the parsers """
+
+        with self.lock:
+            self.flush()
+            self.parsers.clear()
+
+
+    # region private functions
+
+    def _schedule_flush(self):
+
+        if self.timer is not None:
+            return
+        self.timer = threading.Timer(self.flush_delay, self._flush_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+
+    def _flush_timer(self):
+
+        with self.lock:
+            self.timer = None
+            self.flush()
+
+
+    def _get_stamp(self, path):
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # endregion
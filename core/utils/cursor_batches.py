@@ -0,0 +1,32 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+
+
+def iter_batches(conn, sql, batch_size, name=None):
+    """ Execute @sql on psycopg2 connection @conn and yield its rows in lists of at most @batch_size rows.
+        With @name the rows are read through a named server-side cursor, so only one batch is held in memory.
+        psycopg2 can't declare a named cursor on an autocommit connection: there a plain cursor is used, which
+        fetches the whole result when it's executed, and its rows are yielded in batches the same way
+    """
+
+    if name and not conn.autocommit:
+        cursor = conn.cursor(name=name)
+        cursor.itersize = batch_size
+    else:
+        cursor = conn.cursor()
+
+    try:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        if not cursor.closed:
+            cursor.close()
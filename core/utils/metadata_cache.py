@@ -0,0 +1,142 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from ...libs import tools_db
+
+
+class GwMetadataCache:
+    """ Keep in memory the small catalog tables that are read many times during a session
+        (sys_style, sys_table, cat_feature and config_param_system).
+        Each table is read with a single query (on warm or the first time it's needed) instead of one query per lookup.
+    """
+
+    def __init__(self):
+
+        self.styles = None              # {idval: id} of table 'sys_style'
+        self.table_addparams = None     # {id: addparam} of table 'sys_table'
+        self.feature_layers = None      # {feature_type: [child and parent layers]} of table 'cat_feature'
+        self.config_values = {}         # {(parameter, columns, sql_added): row} of table 'config_param_system'
+        self.tables = set()             # Tables known to exist
+
+
+    def warm(self):
+        """ Read all the catalog tables in a single query """
+
+        sql = ("SELECT (SELECT json_agg(json_build_array(idval, id) ORDER BY id) FROM sys_style), "
+               "(SELECT json_agg(json_build_array(id, addparam)) FROM sys_table WHERE addparam IS NOT NULL), "
+               "(SELECT json_agg(json_build_array(upper(feature_type), child_layer, parent_layer)) FROM cat_feature)")
+        row = tools_db.get_row(sql)
+        if not row:
+            self._load_styles()
+            self._load_table_addparams()
+            self._load_feature_layers()
+            return
+
+        self.styles = {}
+        for idval, style_id in row[0] or []:
+            self.styles.setdefault(idval, style_id)
+        self.table_addparams = {tablename: addparam for tablename, addparam in row[1] or []}
+        self.feature_layers = {}
+        for feature_type, child_layer, parent_layer in row[2] or []:
+            layers = self.feature_layers.setdefault(feature_type, [])
+            for layer in (child_layer, parent_layer):
+                if layer and layer not in layers:
+                    layers.append(layer)
+
+
+    def clear(self):
+        """ Forget all the values, i.e. after the schema has been updated """
+
+        self.styles = None
+        self.table_addparams = None
+        self.feature_layers = None
+        self.config_values.clear()
+        self.tables.clear()
+
+
+    def clear_config_values(self):
+        """ Forget the values of table 'config_param_system', after they have been changed from the plugin """
+
+        self.config_values.clear()
+
+
+    def get_style_id(self, idval):
+        """ Get the id of the style @idval of table 'sys_style'. Return None if it doesn't exist """
+
+        if self.styles is None:
+            self._load_styles()
+        return self.styles.get(idval)
+
+
+    def get_table_addparam(self, tablename):
+        """ Get field addparam of @tablename in table 'sys_table' """
+
+        if self.table_addparams is None:
+            self._load_table_addparams()
+        return self.table_addparams.get(tablename)
+
+
+    def get_feature_layers(self, feature_type):
+        """ Get the child and parent layers of table 'cat_feature' of @feature_type """
+
+        if self.feature_layers is None:
+            self._load_feature_layers()
+        return self.feature_layers.get(feature_type.upper(), [])
+
+
+    def check_table(self, tablename):
+        """ Check if @tablename exists. Only existing tables are remembered """
+
+        if tablename in self.tables:
+            return True
+        if not tools_db.check_table(tablename):
+            return False
+        self.tables.add(tablename)
+        return True
+
+
+    def get_config_value(self, parameter, columns, sql_added, get_row):
+        """ Get the row of @parameter in table 'config_param_system', calling @get_row the first time """
+
+        key = (parameter, columns, sql_added)
+        if key not in self.config_values:
+            row = get_row()
+            if row is None:
+                return None
+            self.config_values[key] = row
+        return self.config_values[key]
+
+
+    # region private functions
+
+    def _load_styles(self):
+
+        self.styles = {}
+        rows = tools_db.get_rows("SELECT idval, id FROM sys_style ORDER BY id")
+        for row in rows or []:
+            # Keep the first style as the previous 'SELECT id FROM sys_style WHERE idval = ...' did
+            self.styles.setdefault(row[0], row[1])
+
+
+    def _load_table_addparams(self):
+
+        self.table_addparams = {}
+        rows = tools_db.get_rows("SELECT id, addparam FROM sys_table WHERE addparam IS NOT NULL")
+        for row in rows or []:
+            self.table_addparams[row[0]] = row[1]
+
+
+    def _load_feature_layers(self):
+
+        self.feature_layers = {}
+        rows = tools_db.get_rows("SELECT DISTINCT upper(feature_type), child_layer FROM cat_feature "
+                                 "UNION SELECT DISTINCT upper(feature_type), parent_layer FROM cat_feature")
+        for row in rows or []:
+            if row[1]:
+                self.feature_layers.setdefault(row[0], []).append(row[1])
+
+    # endregion
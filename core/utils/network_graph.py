@@ -0,0 +1,312 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import time
+
+from array import array
+from collections import deque
+
+
+class GwNetworkGraph:
+    """ Compact in-memory graph of the arcs of the network, used to preview network analysis without the database.
+        Arcs and nodes are stored as indexes into arrays: for every node the arcs that start (node_1) and end (node_2)
+        in it are kept in CSR form (offsets + arc indexes). Arcs added or removed after the build are kept apart
+        until there are enough of them to rebuild the arrays.
+    """
+
+    def __init__(self):
+
+        self.node_ids = []              # Index -> node_id
+        self.node_index = {}            # node_id -> index
+        self.arc_ids = []               # Index -> arc_id
+        self.arc_index = {}             # arc_id -> index
+        self.arc_fids = array('q')      # Index -> feature id of the arc in layer 'v_edit_arc'
+        self.node_1 = array('l')        # Index of arc -> index of its node_1 (-1 if it has none)
+        self.node_2 = array('l')        # Index of arc -> index of its node_2 (-1 if it has none)
+        self.out_offsets = array('l', [0])
+        self.out_arcs = array('l')
+        self.in_offsets = array('l', [0])
+        self.in_arcs = array('l')
+        self.extra_out = {}             # {node index: [arcs added after the build starting in the node]}
+        self.extra_in = {}              # {node index: [arcs added after the build ending in the node]}
+        self.removed = set()            # Indexes of removed arcs
+        self.valves = {}                # {node index: (closed, broken)}
+        self.stale = False              # The network has changed in a way the graph can't follow, it must be reloaded
+        self.load_time = None
+
+
+    def build(self, arcs, valves=None):
+        """ Build the graph from @arcs, iterable of (arc_id, node_1, node_2, fid),
+            and @valves, iterable of (node_id, closed, broken)
+        """
+
+        self.__init__()
+        for arc_id, node_1, node_2, fid in arcs:
+            self.arc_index[arc_id] = len(self.arc_ids)
+            self.arc_ids.append(arc_id)
+            self.arc_fids.append(fid if fid is not None else -1)
+            self.node_1.append(self._get_node_index(node_1))
+            self.node_2.append(self._get_node_index(node_2))
+
+        for node_id, closed, broken in valves or []:
+            self.set_valve(node_id, closed, broken)
+
+        self._build_adjacency()
+        self.load_time = time.time()
+        return self
+
+
+    def __len__(self):
+        return len(self.arc_ids) - len(self.removed)
+
+
+    def has_arc(self, arc_id):
+        return arc_id in self.arc_index
+
+
+    def set_valve(self, node_id, closed=False, broken=False):
+
+        self.valves[self._get_node_index(node_id)] = (bool(closed), bool(broken))
+
+
+    def update_arc(self, arc_id, node_1, node_2, fid=None):
+        """ Add the arc @arc_id or change its nodes """
+
+        index = self.arc_index.get(arc_id)
+        if index is not None:
+            nodes = (self.node_index.get(node_1, -1), self.node_index.get(node_2, -1))
+            if (self.node_1[index], self.node_2[index]) == nodes:
+                if fid is not None:
+                    self.arc_fids[index] = fid
+                return
+            if fid is None:
+                fid = self.arc_fids[index]
+            self.removed.add(index)
+
+        index = len(self.arc_ids)
+        self.arc_index[arc_id] = index
+        self.arc_ids.append(arc_id)
+        self.arc_fids.append(fid if fid is not None else -1)
+        self.node_1.append(self._get_node_index(node_1))
+        self.node_2.append(self._get_node_index(node_2))
+        if self.node_1[index] != -1:
+            self.extra_out.setdefault(self.node_1[index], []).append(index)
+        if self.node_2[index] != -1:
+            self.extra_in.setdefault(self.node_2[index], []).append(index)
+        self._check_compact()
+
+
+    def remove_arc(self, arc_id):
+
+        index = self.arc_index.pop(arc_id, None)
+        if index is None:
+            return
+        self.removed.add(index)
+        self._check_compact()
+
+
+    def remove_fids(self, fids):
+        """ Remove the arcs of the features @fids of layer 'v_edit_arc' """
+
+        fids = set(fids)
+        indexes = [index for index, fid in enumerate(self.arc_fids) if fid in fids and index not in self.removed]
+        if not indexes:
+            return
+
+        # Mark all of them before compacting: a rebuild renumbers the arcs
+        for index in indexes:
+            self.arc_index.pop(self.arc_ids[index], None)
+            self.removed.add(index)
+        self._check_compact()
+
+
+    def get_arc_nodes(self, arc_id):
+        """ Get (node_1, node_2) of @arc_id. Return None if the arc is not in the graph """
+
+        index = self.arc_index.get(arc_id)
+        if index is None:
+            return None
+        return self._get_node_id(self.node_1[index]), self._get_node_id(self.node_2[index])
+
+
+    def get_isolation(self, arc_id, unaccess=()):
+        """ Get the part of the network isolated when the valves around @arc_id are closed (preview of the mincut).
+            Starting from the arc the network is walked in both directions until operative valves: open valves are
+            proposed to close, closed ones are already a limit, broken valves and valves of @unaccess are crossed.
+            Return dict with the 'arcs', 'fids' and 'nodes' isolated, the 'valves' to close and the 'closed_valves',
+            or None if the arc is not in the graph
+        """
+
+        index = self.arc_index.get(arc_id)
+        if index is None:
+            return None
+
+        unaccess = {self.node_index[node_id] for node_id in unaccess if node_id in self.node_index}
+        visited_arcs = {index}
+        visited_nodes = set()
+        valves = []
+        closed_valves = []
+        queue = deque(node for node in (self.node_1[index], self.node_2[index]) if node != -1)
+        while queue:
+            node = queue.popleft()
+            if node in visited_nodes:
+                continue
+            visited_nodes.add(node)
+
+            valve = self.valves.get(node)
+            if valve is not None and not valve[1] and node not in unaccess:
+                (closed_valves if valve[0] else valves).append(node)
+                continue
+
+            for arc in self._get_node_arcs(node):
+                if arc in visited_arcs:
+                    continue
+                visited_arcs.add(arc)
+                for next_node in (self.node_1[arc], self.node_2[arc]):
+                    if next_node != -1 and next_node not in visited_nodes:
+                        queue.append(next_node)
+
+        valve_nodes = set(valves) | set(closed_valves)
+        return {'arcs': [self.arc_ids[arc] for arc in visited_arcs],
+                'fids': [self.arc_fids[arc] for arc in visited_arcs if self.arc_fids[arc] != -1],
+                'nodes': [self.node_ids[node] for node in visited_nodes if node not in valve_nodes],
+                'valves': [self.node_ids[node] for node in valves],
+                'closed_valves': [self.node_ids[node] for node in closed_valves]}
+
+
+    def trace(self, node_ids, downstream=True):
+        """ Get the part of the network reachable from @node_ids following the direction of the arcs (node_1 to
+            node_2) when @downstream, or against it. Return dict with the 'arcs', 'fids' and 'nodes' reached,
+            or None if none of the nodes is in the graph
+        """
+
+        start = [self.node_index[node_id] for node_id in node_ids if node_id in self.node_index]
+        if not start:
+            return None
+
+        next_nodes = self.node_2 if downstream else self.node_1
+        visited_arcs = set()
+        visited_nodes = set(start)
+        queue = deque(start)
+        while queue:
+            node = queue.popleft()
+            for arc in self._get_node_arcs(node, downstream):
+                if arc in visited_arcs:
+                    continue
+                visited_arcs.add(arc)
+                next_node = next_nodes[arc]
+                if next_node != -1 and next_node not in visited_nodes:
+                    visited_nodes.add(next_node)
+                    queue.append(next_node)
+
+        return {'arcs': [self.arc_ids[arc] for arc in visited_arcs],
+                'fids': [self.arc_fids[arc] for arc in visited_arcs if self.arc_fids[arc] != -1],
+                'nodes': [self.node_ids[node] for node in visited_nodes]}
+
+
+    # region private functions
+
+    def _get_node_index(self, node_id):
+
+        if node_id is None:
+            return -1
+        index = self.node_index.get(node_id)
+        if index is None:
+            index = len(self.node_ids)
+            self.node_index[node_id] = index
+            self.node_ids.append(node_id)
+        return index
+
+
+    def _get_node_id(self, index):
+        return self.node_ids[index] if index != -1 else None
+
+
+    def _build_adjacency(self):
+        """ Build the CSR arrays of the arcs of every node and forget the arcs added or removed since last build """
+
+        if self.removed:
+            self._drop_removed()
+
+        num_nodes = len(self.node_ids)
+        self.out_offsets, self.out_arcs = self._get_csr(self.node_1, num_nodes)
+        self.in_offsets, self.in_arcs = self._get_csr(self.node_2, num_nodes)
+        self.extra_out = {}
+        self.extra_in = {}
+
+
+    def _get_csr(self, arc_nodes, num_nodes):
+
+        offsets = array('l', [0]) * (num_nodes + 1)
+        for node in arc_nodes:
+            if node != -1:
+                offsets[node + 1] += 1
+        for node in range(num_nodes):
+            offsets[node + 1] += offsets[node]
+
+        position = array('l', offsets[:-1])
+        arcs = array('l', [0]) * offsets[-1]
+        for arc, node in enumerate(arc_nodes):
+            if node != -1:
+                arcs[position[node]] = arc
+                position[node] += 1
+
+        return offsets, arcs
+
+
+    def _drop_removed(self):
+        """ Remove from the arrays the arcs removed, renumbering the others """
+
+        arc_ids = []
+        arc_fids = array('q')
+        node_1 = array('l')
+        node_2 = array('l')
+        for index, arc_id in enumerate(self.arc_ids):
+            if index in self.removed:
+                continue
+            arc_ids.append(arc_id)
+            arc_fids.append(self.arc_fids[index])
+            node_1.append(self.node_1[index])
+            node_2.append(self.node_2[index])
+
+        self.arc_ids = arc_ids
+        self.arc_index = {arc_id: index for index, arc_id in enumerate(arc_ids)}
+        self.arc_fids = arc_fids
+        self.node_1 = node_1
+        self.node_2 = node_2
+        self.removed = set()
+
+
+    def _check_compact(self):
+        """ Rebuild the arrays when the arcs changed since the last build are more than 10% of the graph """
+
+        changes = len(self.removed) + sum(len(arcs) for arcs in self.extra_out.values())
+        if changes > max(1000, len(self.arc_ids) // 10):
+            self._build_adjacency()
+
+
+    def _get_node_arcs(self, node, downstream=None):
+        """ Get the arcs of @node. @downstream True: arcs starting in it, False: arcs ending in it, None: both """
+
+        if downstream is not False:
+            yield from self._get_csr_arcs(node, self.out_offsets, self.out_arcs, self.extra_out)
+        if downstream is not True:
+            yield from self._get_csr_arcs(node, self.in_offsets, self.in_arcs, self.extra_in)
+
+
+    def _get_csr_arcs(self, node, offsets, arcs, extra):
+
+        if node + 1 < len(offsets):
+            for position in range(offsets[node], offsets[node + 1]):
+                arc = arcs[position]
+                if arc not in self.removed:
+                    yield arc
+        for arc in extra.get(node, ()):
+            if arc not in self.removed:
+                yield arc
+
+    # endregion
@@ -0,0 +1,114 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+from qgis.core import QgsApplication
+
+from . import tools_gw
+from ..threads.profile_values import GwProfileValues
+
+
+class GwProfileCache:
+    """ Results of gw_fct_getprofilevalues, keyed by the parameters of the profile:
+        (initNode, endNode, midNodes, linksDistance). Listing the arcs, drawing and redrawing the same profile only
+        call the function once. Only the last @size results are kept and failed calls are not cached
+    """
+
+    def __init__(self, size=20):
+
+        self.size = size
+        self.results = OrderedDict()        # {key: result}
+        self.tasks = set()                  # Pre-warm tasks running
+
+
+    @staticmethod
+    def get_key(init_node, end_node, mid_nodes=None, links_distance=1):
+        """ Get the key of a profile. Ids are compared as text and @links_distance as a number """
+
+        if isinstance(mid_nodes, str):
+            mid_nodes = [node for node in mid_nodes.strip('][').split(', ') if node]
+        try:
+            links_distance = float(links_distance)
+        except (TypeError, ValueError):
+            links_distance = 1.0
+        return str(init_node), str(end_node), tuple(str(node) for node in mid_nodes or ()), links_distance
+
+
+    @staticmethod
+    def get_saved_profile_key(profile):
+        """ Get the key of @profile, an item of the data of gw_fct_getprofile """
+
+        values = profile['values']
+        return GwProfileCache.get_key(values.get('initNode'), values.get('endNode'), values.get('midNodes'),
+                                      values.get('linksDistance'))
+
+
+    @staticmethod
+    def get_body(key):
+        """ Get the body of gw_fct_getprofilevalues for the profile @key """
+
+        init_node, end_node, mid_nodes, links_distance = key
+        extras = f'"initNode":"{init_node}", "endNode":"{end_node}", ' \
+                 f'"linksDistance":{links_distance}, "scale":{{ "eh":1000, "ev":1000}}'
+        if mid_nodes:
+            extras += f', "midNodes":[{", ".join(mid_nodes)}]'
+        return tools_gw.create_body(extras=extras)
+
+
+    def get_profile_values(self, key):
+        """ Get the result of gw_fct_getprofilevalues for the profile @key, calling it only if it's not cached """
+
+        result = self.get(key)
+        if result is None:
+            result = tools_gw.execute_procedure('gw_fct_getprofilevalues', self.get_body(key))
+            self.add(key, result)
+        return result
+
+
+    def get(self, key):
+
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        return result
+
+
+    def add(self, key, result):
+
+        if not result or result.get('status') == 'Failed':
+            return
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+
+    def clear(self):
+
+        self.results.clear()
+
+
+    def prewarm(self, profiles):
+        """ Get in a background task the values of the saved @profiles (items of the data of gw_fct_getprofile)
+            that are not cached yet
+        """
+
+        requests = []
+        for profile in profiles:
+            key = self.get_saved_profile_key(profile)
+            if key not in self.results and key not in (request[0] for request in requests):
+                requests.append((key, self.get_body(key)))
+        if not requests:
+            return
+
+        task = GwProfileValues("Load profiles", requests)
+        task.values_loaded.connect(self.add)
+        task.taskCompleted.connect(lambda: self.tasks.discard(task))
+        task.taskTerminated.connect(lambda: self.tasks.discard(task))
+        self.tasks.add(task)
+        QgsApplication.taskManager().addTask(task)
@@ -0,0 +1,505 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import json
+import math
+import sys
+
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.text import Text
+
+
+class GwProfileLabels(Artist):
+    """ Texts with the same properties at the points (@xs, @ys), drawn as one artist with a single Text.
+        A text is skipped when it would overlap the previous one along @axis (0: x, 1: y) of the display,
+        so dense profiles keep readable labels and zooming in shows the hidden ones
+    """
+
+    def __init__(self, xs, ys, texts, axis=0, **text_props):
+
+        super().__init__()
+        self.xs = np.asarray(xs, dtype=float)
+        self.ys = np.asarray(ys, dtype=float)
+        self.texts = [str(text) for text in texts]
+        self.axis = axis
+        self.text = Text(clip_on=False, **text_props)
+
+
+    def set_figure(self, figure):
+
+        super().set_figure(figure)
+        self.text.set_figure(figure)
+
+
+    def draw(self, renderer):
+
+        if not self.get_visible() or len(self.texts) == 0:
+            return
+
+        text = self.text
+        text.set_transform(self.get_transform())
+        positions = self.get_transform().transform(np.column_stack((self.xs, self.ys)))
+        bbox = self.get_figure(root=True).bbox
+        padding = renderer.points_to_pixels(1)
+        last = -np.inf
+        # Distance from the position to the start of the narrowest text measured. Texts closer than that to the last
+        # one are skipped without measuring them, even if a shorter one would fit
+        offset = None
+        for index in np.argsort(positions[:, self.axis], kind='stable').tolist():
+            position = positions[index]
+            if position[self.axis] - (offset or 0) < last or not bbox.contains(*position):
+                continue
+            text.set_position((self.xs[index], self.ys[index]))
+            text.set_text(self.texts[index])
+            extent = text.get_window_extent(renderer)
+            start, end = (extent.x0, extent.x1) if self.axis == 0 else (extent.y0, extent.y1)
+            offset = min(offset, position[self.axis] - start) if offset is not None else position[self.axis] - start
+            if start < last:
+                continue
+            text.draw(renderer)
+            last = end + padding
+        self.stale = False
+
+
+class GwProfileRenderer:
+    """ Draw a profile of gw_fct_getprofilevalues (key 'data' of its body) on a matplotlib Figure.
+        Coordinates of nodes, arcs, terrain, guitar and grid are computed as numpy arrays and every group of lines is
+        drawn as a single LineCollection, instead of one artist per segment.
+        Pyplot is not used, so it can draw on a figure of any backend (i.e. Agg, to export profiles without a window)
+    """
+
+    figure_size = (10.4, 4.8)
+
+    # Margins of the figure, the texts of the guitar and the grid are inside the axes
+    margins = {'left': 0.015, 'right': 0.985, 'bottom': 0.05, 'top': 0.965}
+
+    # Rows of the texts of the columns of the guitar
+    label_rows = {'catalog': 1.35, 'dimensions': 1.68, 'top_elev': 2.3, 'ymax': 3.1, 'elev': 3.9, 'distance': 4.7,
+                  'code': 5.5}
+
+    # Vertical marks of the guitar for every node and terrain point, as (top row, bottom row)
+    aux_rows = ((1.9, 2.05), (2.6, 2.85), (3.4, 3.65), (4.2, 4.45), (5, 5.25), (5.85, 5.7))
+
+    def __init__(self, data, title=None, date=None):
+
+        self.data = data
+        self.stylesheet = data['stylesheet']
+        self.legend = data['legend']
+        self.date = date
+        self.none_values = []       # Codes of the nodes with missing values, filled when drawing
+        self._set_profile_variables()
+
+        # Set default value if no title is given
+        if title in ('', None):
+            title = f"PROFILE {self.node_ids[0]} - {self.node_ids[-1]}"
+        self.title = title
+
+
+    def draw(self, figure=None):
+        """ Draw the profile on @figure, or on a new Figure if it's None. Return the figure.
+            Every row of texts of the guitar and the grid is a GwProfileLabels, and the layout is fixed, so texts are
+            only measured when they are drawn
+        """
+
+        if figure is None:
+            figure = Figure(figsize=self.figure_size)
+        figure.clear()
+        axes = figure.add_subplot(111)
+        self.none_values = []
+
+        self._draw_infra(axes)
+        self._draw_terrain(axes)
+        self._draw_guitar_lines(axes)
+        self._draw_grid(axes)
+        self._fill_guitar_text_legend(axes)
+        labels = {key: [] for key in self.label_rows}
+        self._fill_guitar_text_nodes(labels)
+        self._fill_guitar_text_terrain(labels)
+        self._draw_guitar_labels(axes, labels)
+
+        # Manage layout
+        axes.autoscale_view()
+        axes.set_axis_off()
+        figure.patch.set_facecolor('white')
+        figure.subplots_adjust(**self.margins)
+        return figure
+
+
+    # region private functions
+
+    def _set_profile_variables(self):
+        """ Get the values of nodes, arcs and terrain as arrays and calculate the dimensions of the guitar """
+
+        nodes = self.data['node']
+        arcs = self.data['arc']
+        terrains = self.data['terrain']
+        self.n = len(nodes)
+
+        # Nodes
+        self.node_ids = [node['node_id'] for node in nodes]
+        self.node_descript = [json.loads(node['descript']) for node in nodes]
+        self.node_data_type = [node['data_type'] for node in nodes]
+        self.node_top = np.array([node['surface_type'] == 'TOP' for node in nodes], dtype=bool)
+        self.top_elev = self._get_array(nodes, 'top_elev')
+        self.ymax = self._get_array(nodes, 'ymax')
+        self.geom = np.nan_to_num(self._get_array(nodes, 'cat_geom1'))
+
+        # Arcs. Arc i goes from node i to node i + 1, arrays are padded to the number of nodes
+        self.arcs = arcs
+        self.arc_descript = [json.loads(arc['descript']) for arc in arcs]
+        self.z1 = self._get_array(arcs, 'z1', self.n)
+        self.z2 = self._get_array(arcs, 'z2', self.n)
+        self.cat_geom = self._get_array(arcs, 'cat_geom1', self.n)
+        self.length = self._get_array(arcs, 'length', self.n - 1)
+
+        # Start point (coordinate x) of every node
+        self.start_point = np.concatenate(([0.0], np.cumsum(self.length)))
+
+        # Terrain
+        self.terrain_x = self._get_array(terrains, 'total_x')
+        self.terrain_y1 = self._get_array(terrains, 'top_n1')
+        self.terrain_y2 = self._get_array(terrains, 'top_n2')
+        self.terrain_vnode = [str(terrain['surface_type']) == 'VNODE' for terrain in terrains]
+        self.terrain_descript = [json.loads(terrain['label_n1']) if vnode else None
+                                 for terrain, vnode in zip(terrains, self.terrain_vnode)]
+
+        # Dimensions of the guitar: rows are measured down from the lowest point of the profile
+        self.min_top_elev = float(np.nanmin(self.top_elev - self.ymax))
+        self.max_top_elev = float(np.nanmax(self.top_elev))
+        self.end_point = float(self.start_point[-1])
+        self.fix_x = 0.15 * self.end_point
+        self.height_row = (self.max_top_elev - self.min_top_elev) * 0.97 / 5
+
+
+    def _get_array(self, items, key, size=None):
+        """ Get values @key of @items as an array of floats (nan if it's null), padded with nan up to @size """
+
+        values = np.array([item[key] for item in items], dtype=float)
+        if size is not None and len(values) != size:
+            values = np.resize(values, size)
+            values[len(items):] = np.nan
+        return values
+
+
+    def _get_row_y(self, rows):
+        return self.min_top_elev - np.asarray(rows, dtype=float) * self.height_row
+
+
+    def _get_line_style(self, values):
+        """ Get (style, color, width) of the stylesheet @values, or None if the line must not be drawn """
+
+        if values is None or values.get('style') in (None, '', ' ', 'None'):
+            return None
+        return values['style'], values['color'], values['width']
+
+
+    def _get_infra_style(self, data_type):
+
+        # TODO: Enhance this function, manage all case for data_type, harmonie REAL/TOP-REAL...
+        if data_type in ('REAL', 'TOP-REAL'):
+            return self._get_line_style(self.stylesheet['infra']['real'])
+        elif data_type == 'INTERPOLATED':
+            return self._get_line_style(self.stylesheet['infra']['interpolated'])
+        return None
+
+
+    def _add_lines(self, axes, segments, styles, zorder):
+        """ Add @segments (array of polylines with the same number of points) with @styles, a (style, color, width)
+            for every segment or a single one for all of them. Segments without style are not drawn
+        """
+
+        if len(segments) == 0:
+            return
+        if not isinstance(styles, list):
+            if styles is None:
+                return
+            styles = [styles]
+        else:
+            keep = [style is not None for style in styles]
+            if not all(keep):
+                segments = segments[np.array(keep, dtype=bool)]
+                styles = [style for style in styles if style is not None]
+            if len(segments) == 0:
+                return
+
+        linestyles, colors, linewidths = zip(*styles)
+        collection = LineCollection(segments, linestyles=list(linestyles), colors=list(colors),
+                                    linewidths=[float(width) for width in linewidths], zorder=zorder)
+        axes.add_collection(collection, autolim=True)
+
+
+    def _get_polylines(self, xs, ys):
+        """ Get an array of polylines from the arrays of coordinates of every point (@xs, @ys) """
+
+        return np.stack((np.column_stack(xs), np.column_stack(ys)), axis=-1)
+
+
+    def _get_vertical_lines(self, xs, rows):
+        """ Get a vertical segment between every pair of @rows at every x of @xs """
+
+        xs = np.repeat(np.asarray(xs, dtype=float), len(rows))
+        ys = np.tile(self._get_row_y(rows), (len(xs) // len(rows), 1))
+        return np.stack((np.column_stack((xs, xs)), ys), axis=-1)
+
+
+    def _draw_infra(self, axes):
+        """ Draw nodes and arcs. Every node is a polyline of 4 points for its bottom and another one for its top """
+
+        x = self.start_point
+        left = x - self.geom / 2
+        right = x + self.geom / 2
+        top = self.top_elev
+        bottom = self.top_elev - self.ymax
+
+        # Points where the arcs meet the nodes: 'in' from the previous arc, 'out' to the next one
+        inf_in = np.empty(self.n)
+        inf_in[1:] = bottom[1:] + self.z2[:-1]
+        sup_in = np.empty(self.n)
+        sup_in[1:] = inf_in[1:] + self.cat_geom[:-1]
+        inf_out = bottom + self.z1
+        sup_out = inf_out + self.cat_geom
+
+        # First node starts on its top (or on its arc if it's not a 'TOP' node) and last node ends on its bottom
+        inf_in[0] = sup_in[0] = top[0] if self.node_top[0] else sup_out[0]
+        inf_out[-1] = sup_out[-1] = bottom[-1]
+        sup_left = np.where(self.node_top, top, sup_in)
+        sup_right = np.where(self.node_top, top, sup_out)
+        if not self.node_top[-1]:
+            sup_right[-1] = sup_in[-1]
+
+        node_inf = self._get_polylines((left, left, right, right), (inf_in, bottom, bottom, inf_out))
+        node_sup = self._get_polylines((left, left, right, right), (sup_in, sup_left, sup_right, sup_out))
+        node_styles = [self._get_infra_style(data_type) for data_type in self.node_data_type]
+        self._add_lines(axes, np.concatenate((node_inf, node_sup)), node_styles * 2, 100)
+
+        # Arcs are interpolated if any of its nodes is, except the first node, which doesn't count
+        arc_inf = self._get_polylines((right[:-1], left[1:]), (inf_out[:-1], inf_in[1:]))
+        arc_sup = self._get_polylines((right[:-1], left[1:]), (sup_out[:-1], sup_in[1:]))
+        arc_styles = []
+        for i in range(self.n - 1):
+            prev_data_type = self.node_data_type[i] if i > 0 else 'REAL'
+            if i == self.n - 2:
+                data_type = prev_data_type
+            elif 'INTERPOLATED' in (prev_data_type, self.node_data_type[i + 1]):
+                data_type = 'INTERPOLATED'
+            else:
+                data_type = 'REAL'
+            arc_styles.append(self._get_infra_style(data_type))
+        self._add_lines(axes, np.concatenate((arc_inf, arc_sup)), arc_styles * 2, 100)
+
+
+    def _draw_terrain(self, axes):
+
+        if len(self.terrain_x) < 2:
+            return
+
+        style = self._get_line_style(self.stylesheet['terrain'])
+        color = self.stylesheet['terrain']['color']
+
+        # Draw markers
+        x = np.concatenate((self.terrain_x[:1], self.terrain_x[2:]))
+        y = np.concatenate((self.terrain_y1[:1], self.terrain_y2[1:-1]))
+        axes.plot(x, y, linestyle='None', marker='|', color=color)
+
+        # Draw lines
+        segments = self._get_polylines((self.terrain_x[:-1], self.terrain_x[1:]),
+                                       (self.terrain_y1[:-1], self.terrain_y2[:-1]))
+        self._add_lines(axes, segments, style, 2)
+
+
+    def _draw_guitar_lines(self, axes):
+        """ Draw the lines of the table and the marks of every node and terrain point """
+
+        style = self._get_line_style(self.stylesheet['guitar']['lines'])
+        fix_x = self.fix_x
+
+        # Horizontal lines: long ones for the whole table, short ones only for the rows of ordinates
+        rows = np.array([1, 1.9, 5.10, 5.85, 2.70, 3.50, 4.30])
+        x_start = np.array([-fix_x] * 4 + [-fix_x * 0.75] * 3)
+        y = self._get_row_y(rows)
+        segments = self._get_polylines((np.full(len(rows), self.end_point), x_start), (y, y))
+        self._add_lines(axes, segments, style, 100)
+
+        # Vertical lines of the legend
+        segments = self._get_polylines((np.array([-fix_x * 0.75, -fix_x]), np.array([-fix_x * 0.75, -fix_x])),
+                                       (self._get_row_y([1.9, 1]), self._get_row_y([5.10, 5.85])))
+        self._add_lines(axes, segments, style, 100)
+
+        # Marks of nodes (with the separator of the arc texts) and terrain points
+        aux_style = self._get_line_style(self.stylesheet['guitar']['auxiliarlines'])
+        segments = [self._get_vertical_lines(self.start_point, ((1, 1.9),) + self.aux_rows)]
+        if len(self.terrain_x) > 1:
+            segments.append(self._get_vertical_lines(self.terrain_x[1:], self.aux_rows))
+        self._add_lines(axes, np.concatenate(segments), aux_style, 100)
+
+
+    def _draw_grid(self, axes):
+
+        line_style = self._get_line_style(self.stylesheet['grid']['lines'])
+        boundary_style = self._get_line_style(self.stylesheet['grid']['boundary'])
+        text = self._get_text_values(self.stylesheet['grid']['text'])
+
+        end_point = self.end_point
+        geom = float(self.geom[-1])
+        bottom = self.min_top_elev - self.height_row
+        top = int(math.ceil(self.max_top_elev) + 1)
+
+        # Draw main text
+        reference_plane = self.legend.get('referencePlane', "REFERENCE")
+        axes.text(-self.fix_x, self._get_row_y(1.0), f"{reference_plane}: {bottom:.2f}\n ", fontsize=8.5,
+                  verticalalignment='center', **text)
+
+        # Draw boundary
+        segments = np.array([((0, bottom), (0, top)), ((end_point, bottom), (end_point, top)),
+                             ((0, top), (end_point, top))], dtype=float)
+        self._add_lines(axes, segments, boundary_style, 100)
+
+        # Draw horizontal lines on even levels
+        first = int(math.ceil(bottom))
+        last = int(math.floor(self.max_top_elev))
+        last += 2 if last % 2 == 0 else 1
+        levels = np.arange(first + first % 2, last + 1, 2) if first < last else np.array([], dtype=int)
+        segments = self._get_polylines((np.zeros(len(levels)), np.full(len(levels), end_point)), (levels, levels))
+        self._add_lines(axes, segments, line_style, 1)
+        for x, alignment in ((-geom * 1.5, 'right'), (end_point + geom * 1.5, 'left')):
+            axes.add_artist(GwProfileLabels(np.full(len(levels), x), levels, levels, axis=1, fontsize=7.5,
+                                            horizontalalignment=alignment, verticalalignment='center', **text))
+
+        # Draw vertical lines every 50 units of distance
+        distances = np.arange(50, int(math.floor(end_point)), 50)
+        segments = self._get_polylines((distances, distances),
+                                       (np.full(len(distances), bottom), np.full(len(distances), top)))
+        self._add_lines(axes, segments, line_style, 1)
+        axes.add_artist(GwProfileLabels(distances, np.full(len(distances), top),
+                                        [f"{distance}\n " for distance in distances], fontsize=6.5,
+                                        horizontalalignment='center', **text))
+
+
+    def _get_text_values(self, values):
+        return {'color': values['color'], 'fontweight': values['weight']}
+
+
+    def _fill_guitar_text_legend(self, axes):
+
+        text = self._get_text_values(self.stylesheet['guitar']['text'])
+        title = self._get_text_values(self.stylesheet['title']['text'])
+        title_size = self.stylesheet['title']['text']['size']
+        legend = self.legend
+        fix_x = self.fix_x
+
+        axes.text(-fix_x * 0.6, self._get_row_y(1.35), legend['catalog'], fontsize=7.5,
+                  horizontalalignment='center', **text)
+        axes.text(-fix_x * 0.6, self._get_row_y(1.68), legend['dimensions'], fontsize=7.5,
+                  horizontalalignment='center', **text)
+        axes.text(-fix_x * 0.865, self._get_row_y(3.5), legend['ordinates'], fontsize=7.5, rotation='vertical',
+                  horizontalalignment='center', verticalalignment='center', **text)
+        for key, row in (('topelev', 2.35), ('ymax', 3.15), ('elev', 3.95), ('distance', 4.75)):
+            axes.text(-fix_x * 0.70, self._get_row_y(row), legend[key], fontsize=7.5, verticalalignment='center',
+                      **text)
+        axes.text(-fix_x * 0.6, self._get_row_y(5.5), legend['code'], fontsize=7.5,
+                  horizontalalignment='center', verticalalignment='center', **text)
+
+        # Print title and date
+        axes.text(-fix_x, self._get_row_y(6.25), self.title, fontsize=title_size, verticalalignment='center',
+                  **title)
+        axes.text(-fix_x, self._get_row_y(6.5), self.date, fontsize=title_size * 0.7, verticalalignment='center',
+                  **title)
+
+
+    def _fill_guitar_text_nodes(self, labels):
+        """ Add to @labels the texts of the columns of every node and the texts of every arc """
+
+        arcs = self.arcs
+        last = self.n - 1
+
+        for index, x in enumerate(self.start_point.tolist()):
+            descript = self.node_descript[index]
+            if index == 0:
+                ymax = f" \n{descript['ymax']}\n{arcs[0]['y1']}"
+                elev = f" \n{descript['elev']}\n{arcs[0]['elev1']}"
+            elif index < last:
+                values = (arcs[index - 1]['y2'], descript['ymax'], arcs[index]['y1'],
+                          arcs[index - 1]['elev2'], descript['elev'], arcs[index]['elev1'])
+                if any(value in (None, 'None') for value in values):
+                    self.none_values.append(descript['code'])
+                ymax = f"{values[0]}\n{values[1]}\n{values[2]}"
+                elev = f"{values[3]}\n{values[4]}\n{values[5]}"
+            else:
+                ymax = f"{arcs[index - 1]['y2']}\n{descript['ymax']}"
+                elev = f"{arcs[index - 1]['elev2']}\n{descript['elev']}"
+
+            labels['top_elev'].append((x, f" \n{descript['top_elev']}\n "))
+            labels['code'].append((x, descript['code']))
+            labels['ymax'].append((x, ymax))
+            labels['elev'].append((x, elev))
+            labels['distance'].append((x, descript['total_distance']))
+
+            # Fill catalog and dimensions of the arc in the middle of it
+            if index < last:
+                center = x + self.length[index] / 2
+                labels['catalog'].append((center, self.arc_descript[index]['catalog']))
+                labels['dimensions'].append((center, self.arc_descript[index]['dimensions']))
+
+
+    def _fill_guitar_text_terrain(self, labels):
+        """ Add to @labels the texts of the columns of the terrain points that are vnodes """
+
+        for index in range(1, len(self.terrain_x)):
+            descript = self.terrain_descript[index]
+            if descript is None:
+                continue
+            x = self.terrain_x[index]
+            labels['top_elev'].append((x, f" \n{descript['top_elev']}\n "))
+            labels['code'].append((x, descript['code']))
+            labels['ymax'].append((x, descript['ymax']))
+            labels['elev'].append((x, descript['elev']))
+            labels['distance'].append((x, descript['total_distance']))
+
+
+    def _draw_guitar_labels(self, axes, labels):
+        """ Draw the texts of every row of the guitar of @labels, a list of (x, text) for every row """
+
+        text = self._get_text_values(self.stylesheet['guitar']['text'])
+        vertical = dict(fontsize=6, rotation='vertical', horizontalalignment='center', verticalalignment='center',
+                        **text)
+        props = {'catalog': dict(fontsize=7.5, horizontalalignment='center', **text),
+                 'dimensions': dict(fontsize=7.5, horizontalalignment='center', **text),
+                 'code': dict(fontsize=7.5, horizontalalignment='center', verticalalignment='center', **text)}
+
+        for key, row in self.label_rows.items():
+            xs = [x for x, value in labels[key]]
+            y = np.full(len(xs), self._get_row_y(row))
+            axes.add_artist(GwProfileLabels(xs, y, [value for x, value in labels[key]], **props.get(key, vertical)))
+
+    # endregion
+
+
+def export_profile(job_path):
+    """ Draw the profile of the json file @job_path with the Agg backend and save it to every file of its 'files'.
+        The job is written by GwProfileExport: {"data": ..., "title": ..., "date": ..., "files": [...], "dpi": 300}.
+        Return the codes of the nodes with missing values
+    """
+
+    with open(job_path, encoding='utf-8') as job_file:
+        job = json.load(job_file)
+
+    renderer = GwProfileRenderer(job['data'], job.get('title'), job.get('date'))
+    figure = renderer.draw(Figure(figsize=GwProfileRenderer.figure_size))
+    FigureCanvasAgg(figure)
+    for path in job['files']:
+        figure.savefig(path, dpi=job.get('dpi', 300))
+    return renderer.none_values
+
+
+if __name__ == '__main__':
+    # Worker process of the profile export: python profile_renderer.py <job file>
+    # It doesn't import anything of the plugin, so it runs with the Python of QGIS without loading QGIS
+    print(json.dumps({'none_values': export_profile(sys.argv[1])}))
@@ -0,0 +1,94 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import re
+
+
+class GwRptLineError(Exception):
+    """ Raised when a line of the rpt file can't be imported. @reason is 'overlap' or 'velocity' """
+
+    def __init__(self, reason, tokens):
+
+        super().__init__(reason)
+        self.reason = reason
+        self.tokens = tokens
+
+
+class GwRptTokenizer:
+    """ Split the lines of a SWMM/EPANET rpt file into values and find the target table of each line.
+        Patterns are compiled once and the targets from config_fprocess are indexed by the first one and two
+        tokens of a line, so every line costs a single dict lookup instead of a scan of all the targets.
+    """
+
+    re_joined_numbers = re.compile(r'[0-9][-]\d{1,2}[.]]*')
+    re_overlap = re.compile(r'(\d\..*\.\d)')
+    re_time = re.compile(r'^([012]?[0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]$')
+
+    def __init__(self, sources):
+        """ :param sources: Dict {first tokens of the line: tablename}, in config_fprocess order (dict) """
+
+        # When several targets match the same line the last one in @sources wins, so keep the position of each key
+        self.targets = {key: (position, tablename) for position, (key, tablename) in enumerate(sources.items())}
+        # While we don't find a match with the target, target and col40 must be null
+        self.target = "null"
+        self.col40 = "null"
+
+
+    def split(self, row):
+        """ Split @row into its values. Raise GwRptLineError if the line is not valid to import """
+
+        dirty_list = row.split()
+
+        sp_n = []
+        for token in dirty_list:
+            # Cheap substring checks first, regular expressions only for the tokens that might match them
+            if '-' in token and self.re_joined_numbers.search(token):
+                last_index = 0
+                for i, c in enumerate(token):
+                    if "-" == c:
+                        sp_n.append(token[last_index:i])
+                        last_index = i
+
+                # noinspection PyUnboundLocalVariable
+                sp_n.append(token[last_index:i])
+
+            elif token.count('.') > 1 and self.re_overlap.search(token):
+                if 'Version' not in dirty_list and 'VERSION' not in dirty_list:
+                    raise GwRptLineError('overlap', dirty_list)
+            elif '>50' in token:
+                raise GwRptLineError('velocity', dirty_list)
+            else:
+                sp_n.append(token)
+
+        return sp_n
+
+
+    def set_target(self, sp_n):
+        """ Update self.target and self.col40 if the first tokens of @sp_n match a target """
+
+        # Lines with less than two values never match a target
+        if len(sp_n) < 2:
+            return
+
+        match_1 = self.targets.get(sp_n[0])
+        match_2 = self.targets.get(f'{sp_n[0]} {sp_n[1]}')
+        if match_1 is None and match_2 is None:
+            return
+
+        if match_1 is None or (match_2 is not None and match_2[0] > match_1[0]):
+            match_1 = match_2
+        self.target = "'" + match_1[1] + "'"
+        if len(sp_n) > 3 and self.re_time.search(sp_n[3]):
+            self.col40 = "'" + sp_n[3] + "'"
+
+
+    def tokenize(self, row):
+        """ Split @row and update the current target. Return the list of values of the line """
+
+        sp_n = self.split(row)
+        self.set_target(sp_n)
+        return sp_n
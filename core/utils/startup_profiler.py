@@ -0,0 +1,263 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import configparser
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from importlib.abc import MetaPathFinder
+
+from .step_timer import GwStepTimer
+
+
+class _GwImportTimer(MetaPathFinder):
+    """ Finder that times the execution of the modules of @package found by the other finders """
+
+    def __init__(self, package, imports):
+
+        self.package = package
+        self.imports = imports
+
+
+    def find_spec(self, fullname, path, target=None):
+
+        if fullname != self.package and not fullname.startswith(f"{self.package}."):
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        if loader is None or not hasattr(loader, 'exec_module'):
+            return spec
+
+        exec_module = loader.exec_module
+
+        def _exec_module(module):
+            t0 = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                self.imports[fullname] = time.perf_counter() - t0
+
+        loader.exec_module = _exec_module
+        return spec
+
+
+class GwStartupProfiler:
+    """ Record where the time goes when the plugin starts and a project is loaded: imports of the plugin modules,
+        phases of initGui and project_read, database calls (by function name) and creation of the toolbars.
+        The report of every project load is saved as a json file in the user log folder.
+        Nothing is recorded unless it's enabled (giswater.config or init.config, option 'startup_profiler')
+    """
+
+    db_functions = ('get_row', 'get_rows', 'execute_sql')
+    re_db_function = re.compile(r'\b(gw_\w+)\s*\(')
+
+    def __init__(self, enabled=False):
+
+        self.enabled = enabled
+        self.imports = {}
+        self.lock = threading.Lock()
+        self.report_path = None
+        self._db_module = None
+        self._db_originals = {}
+        self._reset()
+
+
+    @classmethod
+    def from_config(cls, path):
+        """ Create the profiler enabled or not according option 'startup_profiler' of section 'system' of @path """
+
+        parser = configparser.ConfigParser(comment_prefixes=";", allow_no_value=True, strict=False)
+        try:
+            parser.read(path)
+            value = parser.get('system', 'startup_profiler', fallback='FALSE') or 'FALSE'
+        except configparser.Error:
+            value = 'FALSE'
+        return cls(value.split('#')[0].strip().upper() == 'TRUE')
+
+
+    @contextmanager
+    def record_imports(self, package):
+        """ Record the import time of the modules of @package imported inside the with statement.
+            Times are inclusive: they contain the time of the modules imported by every module
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        finder = _GwImportTimer(package, self.imports)
+        sys.meta_path.insert(0, finder)
+        try:
+            yield
+        finally:
+            sys.meta_path.remove(finder)
+
+
+    def start(self, db_module):
+        """ Start recording a load: the total time of the report is counted from here. Database calls are recorded
+            wrapping the query functions of @db_module. Calls while a load is being recorded are ignored
+        """
+
+        if not self.enabled or self._db_module is not None:
+            return
+
+        # Don't count the time since the previous report
+        self._reset()
+        self._db_module = db_module
+        for function_name in self.db_functions:
+            function = getattr(db_module, function_name, None)
+            if function is not None:
+                self._db_originals[function_name] = function
+                setattr(db_module, function_name, self._wrap_db_function(function))
+
+
+    def stop_db_calls(self):
+        """ Restore the original query functions """
+
+        for function_name, function in self._db_originals.items():
+            setattr(self._db_module, function_name, function)
+        self._db_originals = {}
+        self._db_module = None
+
+
+    @contextmanager
+    def phase(self, name):
+        """ Record the time of the with statement as phase @name """
+
+        with self.phases.step(name) as values:
+            yield values
+
+
+    @contextmanager
+    def toolbar(self, name):
+        """ Record the time of the with statement as the creation of toolbar @name """
+
+        with self.toolbars.step(name) as values:
+            yield values
+
+
+    def add_phases(self, step_timer):
+        """ Add the steps recorded by @step_timer as phases """
+
+        for record in step_timer.steps.values():
+            self.phases.add(f"{step_timer.name}: {record['step']}", record['seconds'], record['rows'], record['bytes'])
+
+
+    def finish(self, folder, extra_values=None):
+        """ Stop recording and save the report into @folder. Return the path of the report """
+
+        if not self.enabled:
+            return None
+
+        self.stop_db_calls()
+        report = {'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                  'total_seconds': round(self.phases.get_total(), 3)}
+        report.update(extra_values or {})
+        report['imports'] = [{'module': module, 'seconds': round(seconds, 4)}
+                             for module, seconds in sorted(self.imports.items(), key=lambda item: -item[1])]
+        report['phases'] = self._get_records(self.phases)
+        report['db_calls'] = sorted(self._get_records(self.db_calls), key=lambda record: -record['seconds'])
+        report['toolbars'] = self._get_records(self.toolbars)
+
+        try:
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"startup_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+        except OSError:
+            self._reset()
+            return None
+
+        # Imports only happen once, don't repeat them in the reports of the next loads
+        self.imports = {}
+        self._reset()
+        self.report_path = path
+        return path
+
+
+    @staticmethod
+    def get_report_lines(path):
+        """ Get the report saved in @path as text lines """
+
+        with open(path, encoding='utf-8') as file:
+            report = json.load(file)
+
+        lines = [f"Startup profile {report['date']}  (total {report['total_seconds']:.2f} s)"]
+        for key, value in report.items():
+            if not isinstance(value, list):
+                if key not in ('date', 'total_seconds'):
+                    lines.append(f"{key}: {value}")
+                continue
+            lines.append("")
+            lines.append(key.upper().replace('_', ' '))
+            for record in value:
+                name = record.get('module') or record.get('step')
+                calls = f"x{record['calls']}" if record.get('calls', 1) > 1 else ''
+                lines.append(f"  {record['seconds']:>9.3f} s {calls:>6}  {name}")
+
+        return lines
+
+
+    # region private functions
+
+    def _reset(self):
+
+        self.phases = GwStepTimer("Phases")
+        self.db_calls = GwStepTimer("Database calls")
+        self.toolbars = GwStepTimer("Toolbars")
+
+
+    def _wrap_db_function(self, function):
+
+        @wraps(function)
+        def _function(sql, *args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return function(sql, *args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - t0
+                with self.lock:
+                    self.db_calls.add(self._get_db_call_name(sql), seconds)
+
+        return _function
+
+
+    def _get_db_call_name(self, sql):
+        """ Get the name of the database function called by @sql, or the beginning of @sql if it doesn't call any """
+
+        match = self.re_db_function.search(str(sql))
+        if match:
+            return match.group(1)
+        return ' '.join(str(sql).split())[:80]
+
+
+    def _get_records(self, step_timer):
+
+        records = []
+        for record in step_timer.steps.values():
+            record = dict(record)
+            record['seconds'] = round(record['seconds'], 4)
+            records.append(record)
+        return records
+
+    # endregion
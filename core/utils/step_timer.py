@@ -0,0 +1,91 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import csv
+import os
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class GwStepTimer:
+    """ Record the wall time, rows and bytes of the steps of a process.
+        Steps with the same name (i.e. one call per chunk) are accumulated in the same record.
+    """
+
+    columns = ['step', 'calls', 'seconds', 'rows', 'bytes']
+
+    def __init__(self, name):
+
+        self.name = name
+        self.steps = {}
+        self.t0 = time.perf_counter()
+        self.t_lap = self.t0
+
+
+    @contextmanager
+    def step(self, name):
+        """ Time the block of a with statement. Rows and bytes can be set into the yielded dict """
+
+        values = {'rows': None, 'bytes': None}
+        t0 = time.perf_counter()
+        try:
+            yield values
+        finally:
+            self.add(name, time.perf_counter() - t0, values['rows'], values['bytes'])
+
+
+    def add(self, name, seconds, rows=None, bytes=None):
+
+        record = self.steps.setdefault(name, {'step': name, 'calls': 0, 'seconds': 0.0, 'rows': None, 'bytes': None})
+        record['calls'] += 1
+        record['seconds'] += seconds
+        if rows is not None:
+            record['rows'] = (record['rows'] or 0) + rows
+        if bytes is not None:
+            record['bytes'] = (record['bytes'] or 0) + bytes
+
+
+    def lap(self, name, rows=None, bytes=None):
+        """ Record the time since the previous lap (or since the timer was created) as step @name """
+
+        now = time.perf_counter()
+        self.add(name, now - self.t_lap, rows, bytes)
+        self.t_lap = now
+
+
+    def get_total(self):
+        return time.perf_counter() - self.t0
+
+
+    def get_lines(self):
+        """ Get the records as text lines of a table, with the total wall time at the end """
+
+        lines = [f"{self.name} timing:", f"{'Step':<40}{'Calls':>7}{'Seconds':>11}{'Rows':>12}{'Bytes':>14}"]
+        for record in self.steps.values():
+            rows = '' if record['rows'] is None else record['rows']
+            _bytes = '' if record['bytes'] is None else record['bytes']
+            lines.append(f"{record['step']:<40}{record['calls']:>7}{record['seconds']:>11.2f}{rows:>12}{_bytes:>14}")
+        lines.append(f"{'Total':<40}{'':>7}{self.get_total():>11.2f}")
+        return lines
+
+
+    def save_csv(self, path, **extra_values):
+        """ Append the records to the csv history file @path. @extra_values are added as first columns of every row """
+
+        write_header = not os.path.exists(path)
+        date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        columns = ['date', 'process'] + list(extra_values.keys()) + self.columns
+        with open(path, 'a', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=columns, delimiter=';')
+            if write_header:
+                writer.writeheader()
+            for record in self.steps.values():
+                row = dict(date=date, process=self.name, **extra_values, **record)
+                row['seconds'] = round(row['seconds'], 3)
+                writer.writerow(row)
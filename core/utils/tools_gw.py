@@ -7,10 +7,12 @@ or (at your option) any later version.
 # -*- coding: utf-8 -*-
 import configparser
 import inspect
+import io
 import json
 import os
 import random
 import re
+import shutil
 import sys
 import sqlite3
 import webbrowser
@@ -44,6 +46,10 @@ from ..ui.ui_manager import GwSelectorUi
 from . import tools_backend_calls
 from ..load_project_menu import GwMenuLoad
 from ..utils.select_manager import GwSelectManager
+from ..utils.config_store import GwConfigStore
+from ..utils.metadata_cache import GwMetadataCache
+from ..utils.startup_profiler import GwStartupProfiler
+from ..threads.network_graph_load import GwNetworkGraphLoad
 from ..toolbars.toc import epa_world_button
 from ... import global_vars
 from ...libs import lib_vars, tools_qgis, tools_qt, tools_log, tools_os, tools_db
@@ -122,13 +128,11 @@ def get_config_parser(section: str, parameter: str, config_type, file_name, pref
         tools_log.log_warning(f"get_config_parser: Reference config_type = '{config_type}' it is not managed")
         return None
 
-    # Get configuration filepath and parser object
+    # Get configuration filepath
     path = global_vars.configs[file_name][0]
-    parser = global_vars.configs[file_name][1]
 
     if plugin != 'core':
         path = f"{lib_vars.user_folder_dir}{os.sep}{plugin}{os.sep}config{os.sep}{file_name}.config"
-        parser = None
         chk_user_params = False
 
     # Needed to avoid errors with giswater plugins
@@ -139,16 +143,8 @@ def get_config_parser(section: str, parameter: str, config_type, file_name, pref
     value = None
     raw_parameter = parameter
     try:
-        if parser is None:
-            if plugin == 'core':
-                tools_log.log_info(f"Creating parser for file: {path}")
-            parser = configparser.ConfigParser(comment_prefixes=";", allow_no_value=True, strict=False)
-            parser.read(path)
-
-        # If project has already been loaded and filename is 'init' or 'session', always read and parse file
-        if force_reload or (global_vars.project_loaded and file_name in ('init', 'session')):
-            parser = configparser.ConfigParser(comment_prefixes=";", allow_no_value=True, strict=False)
-            parser.read(path)
+        # Parsers are kept in memory and only parsed again if the file has been modified outside the plugin
+        parser = _get_config_store().get_parser(path, reload=force_reload)
 
         if config_type == 'user' and prefix and global_vars.project_type is not None:
             parameter = f"{global_vars.project_type}_{parameter}"
@@ -193,17 +189,10 @@ def set_config_parser(section: str, parameter: str, value: str = None, config_ty
 
     try:
 
-        parser = configparser.ConfigParser(comment_prefixes=";", allow_no_value=True, strict=False)
-        parser.read(path)
-
         raw_parameter = parameter
         if config_type == 'user' and prefix and global_vars.project_type is not None:
             parameter = f"{global_vars.project_type}_{parameter}"
 
-        # Check if section exists in file
-        if section not in parser:
-            parser.add_section(section)
-
         # Cast to str because parser only allow strings
         value = f"{value}"
         if value is not None:
@@ -215,22 +204,119 @@ def set_config_parser(section: str, parameter: str, value: str = None, config_ty
                 prev = get_config_parser(section, parameter, config_type, file_name, False, True, False)
                 if prev is not None and "#" in prev:
                     value += f" #{prev.split('#')[1]}"
-            parser.set(section, parameter, value)
+            # The file is written by the config store a moment later, together with the next changes
+            _get_config_store().set_value(path, section, parameter, value)
             # Check if the parameter exists in the inventory, if not creates it
             if chk_user_params and config_type in "user":
                 _check_user_params(section, raw_parameter, file_name, prefix)
         else:
-            parser.set(section, parameter)  # This is just for writing comments
-
-        with open(path, 'w') as configfile:
-            parser.write(configfile)
-            configfile.close()
+            _get_config_store().set_value(path, section, parameter)  # This is just for writing comments
 
     except Exception as e:
         tools_log.log_warning(f"set_config_parser exception [{type(e).__name__}]: {e}")
         return
 
 
+def get_metadata_cache():
+    """ Get the cache of catalog tables of the session, creating it the first time """
+
+    if global_vars.metadata_cache is None:
+        global_vars.metadata_cache = GwMetadataCache()
+    return global_vars.metadata_cache
+
+
+def reset_metadata_cache(warm=False):
+    """ Forget the cached catalog tables and database functions (on project load and after schema updates) """
+
+    global_vars.checked_functions = set()
+    get_metadata_cache().clear()
+    if warm:
+        global_vars.metadata_cache.warm()
+
+
+def get_network_graph(load=True):
+    """ Get the network graph of the session. If it isn't loaded or it's stale, start loading it in background
+        (when @load) and return the current graph, which is None until the first load finishes
+    """
+
+    graph = global_vars.network_graph
+    if load and (graph is None or graph.stale):
+        _load_network_graph()
+    return graph
+
+
+def reset_network_graph():
+    """ Forget the network graph (on project load) """
+
+    disconnect_signal('network_graph')
+    global_vars.network_graph = None
+    global_vars.network_graph_task = None
+
+
+def invalidate_network_graph():
+    """ Mark the network graph as stale after a change of the topology made by a database function,
+        it's loaded again next time it's requested
+    """
+
+    if global_vars.network_graph is not None:
+        global_vars.network_graph.stale = True
+
+
+def trace_network_graph(node_ids, downstream=True):
+    """ Get the network upstream or downstream of @node_ids computed with the network graph.
+        Return None if the graph is not loaded yet or it's stale, then the database function must be used
+    """
+
+    graph = get_network_graph()
+    if graph is None or graph.stale:
+        return None
+    return graph.trace(node_ids, downstream)
+
+
+def select_network_graph_result(result):
+    """ Select in layer 'v_edit_arc' the arcs of @result of the network graph (empty result clears the selection) """
+
+    layer_arc = tools_qgis.get_layer_by_tablename('v_edit_arc')
+    if layer_arc is None:
+        return
+    if result:
+        layer_arc.selectByIds(result['fids'])
+    else:
+        layer_arc.removeSelection()
+
+
+def get_startup_profiler():
+    """ Get the startup profiler of the session (disabled if it hasn't been created on plugin load) """
+
+    if global_vars.startup_profiler is None:
+        global_vars.startup_profiler = GwStartupProfiler()
+    return global_vars.startup_profiler
+
+
+def save_startup_profile():
+    """ Save the report of the startup profiler into the user log folder """
+
+    profiler = get_startup_profiler()
+    if not profiler.enabled:
+        return None
+
+    log_folder = f"{lib_vars.user_folder_dir}{os.sep}core{os.sep}log"
+    plugin_version = tools_qgis.get_plugin_metadata('version', 0, lib_vars.plugin_dir)
+    path = profiler.finish(log_folder, {'plugin_version': plugin_version, 'project_type': global_vars.project_type,
+                                        'schema_name': lib_vars.schema_name})
+    if path:
+        tools_log.log_info(f"Startup profile saved: {path}")
+    return path
+
+
+def flush_config_parsers():
+    """ Write to disk the pending changes of the configuration files """
+
+    _merge_user_params()
+    if global_vars.config_store is not None:
+        global_vars.config_store.flush()
+
+
 def save_current_tab(dialog, tab_widget, selector_name):
     """
     Save the name of current tab used by the user into QSettings()
@@ -622,21 +708,17 @@ def add_layer_database(tablename=None, the_geom="the_geom", field_id="id", group
         # therefore, we define it with "-1"
         if style_id in (None, "-1"):
             # Get style_id from tablename
-            sql = f"SELECT id FROM sys_style WHERE idval = '{tablename_og}'"
-            row = tools_db.get_row(sql)
-            if row:
-                style_id = row[0]
+            metadata_cache = get_metadata_cache()
+            row = metadata_cache.get_style_id(tablename_og)
+            if row is not None:
+                style_id = row
 
             # Get style_id for Gw Epa Style
-            sql = f"SELECT id FROM sys_style WHERE idval = '{tablename_og} SWMM point of view'"
-            row = tools_db.get_row(sql)
-            if row:
-                style_id_epa = row[0]
-            else:
-                sql = f"SELECT id FROM sys_style WHERE idval = '{tablename_og} EPANET point of view'"
-                row = tools_db.get_row(sql)
-                if row:
-                    style_id_epa = row[0]
+            row = metadata_cache.get_style_id(f"{tablename_og} SWMM point of view")
+            if row is None:
+                row = metadata_cache.get_style_id(f"{tablename_og} EPANET point of view")
+            if row is not None:
+                style_id_epa = row
 
         # Apply style to layer if it has one configured
         if style_id not in (None, "-1"):
@@ -655,13 +737,9 @@ def add_layer_database(tablename=None, the_geom="the_geom", field_id="id", group
             config_layer_attributes(json_result, layer, alias)
 
             # Manage valueRelation
-            valueRelation = None
-            sql = f"SELECT addparam FROM sys_table WHERE id = '{tablename_og}'"
-            row = tools_db.get_row(sql)
-            if row:
-                valueRelation = row[0]
-                if valueRelation:
-                    valueRelation = valueRelation.get('valueRelation')
+            valueRelation = get_metadata_cache().get_table_addparam(tablename_og)
+            if valueRelation:
+                valueRelation = valueRelation.get('valueRelation')
             if valueRelation:
                 for vr in valueRelation:
                     vr_layer = tools_qgis.get_layer_by_tablename(vr['targerLayer'])  # Get 'Layer'
@@ -793,128 +871,152 @@ def add_layer_temp(dialog, data, layer_name, force_tab=True, reset_text=True, ta
 
 
 def config_layer_attributes(json_result, layer, layer_name, thread=None):
+    """ Configure the fields of @layer according to @json_result of gw_fct_getinfofromid """
 
-    for field in json_result['body']['data']['fields']:
-        valuemap_values = {}
+    fields_config = get_layer_attributes_config(json_result)
+    set_layer_attributes_config(layer, fields_config, layer_name, thread)
 
-        # Get column index
-        field_index = layer.fields().indexFromName(field['columnname'])
+
+def get_layer_attributes_config(json_result):
+    """ Get the configuration of every field from @json_result of gw_fct_getinfofromid.
+        It doesn't access the layer, so it can be called from a task
+        :return: List of dicts with keys columnname, hidden, label, constraints, readonly, widget and value_relation
+    """
+
+    fields_config = []
+    for field in json_result['body']['data']['fields']:
+        field_config = {'columnname': field['columnname'], 'label': field['label'], 'constraints': [],
+                        'readonly': None, 'value_relation': None}
 
         # Hide selected fields according table config_form_fields.hidden
         if 'hidden' in field:
-            config = layer.attributeTableConfig()
-            columns = config.columns()
-            for column in columns:
-                if column.name == str(field['columnname']):
-                    column.hidden = field['hidden']
-                    break
-            config.setColumns(columns)
-            layer.setAttributeTableConfig(config)
-
-        # Set alias column
-        if field['label']:
-            layer.setFieldAlias(field_index, field['label'])
+            field_config['hidden'] = field['hidden']
 
         # widgetcontrols
         widgetcontrols = field.get('widgetcontrols')
         if widgetcontrols:
             if widgetcontrols.get('setQgisConstraints') is True:
-                layer.setFieldConstraint(field_index, QgsFieldConstraints.ConstraintNotNull,
-                                         QgsFieldConstraints.ConstraintStrengthSoft)
-                layer.setFieldConstraint(field_index, QgsFieldConstraints.ConstraintUnique,
-                                         QgsFieldConstraints.ConstraintStrengthHard)
+                field_config['constraints'].append((QgsFieldConstraints.ConstraintNotNull,
+                                                    QgsFieldConstraints.ConstraintStrengthSoft))
+                field_config['constraints'].append((QgsFieldConstraints.ConstraintUnique,
+                                                    QgsFieldConstraints.ConstraintStrengthHard))
 
         if field.get('ismandatory') is False:
-            layer.setFieldConstraint(field_index, QgsFieldConstraints.ConstraintNotNull,
-                                     QgsFieldConstraints.ConstraintStrengthSoft)
+            field_config['constraints'].append((QgsFieldConstraints.ConstraintNotNull,
+                                                QgsFieldConstraints.ConstraintStrengthSoft))
 
         # Manage editability
-        # Get layer config
-        config = layer.editFormConfig()
-        try:
-            # Set field editability
-            config.setReadOnly(field_index, not field['iseditable'])
-        except KeyError:
-            pass
-        finally:
-            # Set layer config
-            layer.setEditFormConfig(config)
+        if 'iseditable' in field:
+            field_config['readonly'] = not field['iseditable']
 
-        # delete old values on ValueMap
-        editor_widget_setup = QgsEditorWidgetSetup('ValueMap', {'map': valuemap_values})
-        layer.setEditorWidgetSetup(field_index, editor_widget_setup)
+        # Widget used when there is no ValueRelation (or the layer of the ValueRelation isn't in the project)
+        valuemap_values = {}
+        if field['widgettype'] == 'combo':
+            if 'comboIds' in field:
+                # Set values
+                for i in range(0, len(field['comboIds'])):
+                    valuemap_values[field['comboNames'][i]] = field['comboIds'][i]
+            field_config['widget'] = ('ValueMap', {'map': valuemap_values})
+        elif field['widgettype'] == 'check':
+            field_config['widget'] = ('CheckBox', {'CheckedState': 'true', 'UncheckedState': 'false'})
+        elif field['widgettype'] == 'datetime':
+            field_config['widget'] = ('DateTime', {'allow_null': True,
+                                                   'calendar_popup': True,
+                                                   'display_format': 'yyyy-MM-dd',
+                                                   'field_format': 'yyyy-MM-dd',
+                                                   'field_iso_format': False})
+        elif field['widgettype'] == 'textarea':
+            field_config['widget'] = ('TextEdit', {'IsMultiline': 'True'})
+        elif field['widgettype'] == 'text':
+            # multiline: key comes from widgecontrol but it's used here in order to set false when key is missing
+            if widgetcontrols and 'setMultiline' in widgetcontrols:
+                field_config['widget'] = ('TextEdit', {'IsMultiline': widgetcontrols['setMultiline']})
+            else:
+                field_config['widget'] = ('TextEdit', {'IsMultiline': False})
+        else:
+            field_config['widget'] = ('TextEdit', {'IsMultiline': 'False'})
 
-        # Manage ValueRelation configuration
-        use_vr = 'widgetcontrols' in field and field['widgetcontrols'] \
-                 and 'valueRelation' in field['widgetcontrols'] and field['widgetcontrols']['valueRelation']
+        # Manage ValueRelation configuration (text fields always use TextEdit)
+        use_vr = widgetcontrols and widgetcontrols.get('valueRelation') and field['widgettype'] != 'text'
         if use_vr:
-            value_relation = field['widgetcontrols']['valueRelation']
+            value_relation = widgetcontrols['valueRelation']
             if value_relation.get('activated'):
-                try:
-                    vr_layer = value_relation['layer']
-                    vr_layer = tools_qgis.get_layer_by_tablename(vr_layer).id()  # Get layer id
-                    vr_key_column = value_relation['keyColumn']  # Get 'Key'
-                    vr_value_column = value_relation['valueColumn']  # Get 'Value'
-                    vr_allow_nullvalue = value_relation['nullValue']  # Get null values
-                    vr_filter_expression = value_relation['filterExpression']  # Get 'FilterExpression'
-                    if vr_filter_expression is None:
-                        vr_filter_expression = ''
-
-                    # Create and apply ValueRelation config
-                    editor_widget_setup = QgsEditorWidgetSetup('ValueRelation', {'Layer': f'{vr_layer}',
-                                                                                 'Key': f'{vr_key_column}',
-                                                                                 'Value': f'{vr_value_column}',
-                                                                                 'AllowNull': f'{vr_allow_nullvalue}',
-                                                                                 'FilterExpression': f'{vr_filter_expression}'})
-                    layer.setEditorWidgetSetup(field_index, editor_widget_setup)
-
-                except Exception as e:
-                    if thread:
-                        thread.exception = e
-                        thread.vr_errors.add(layer_name)
-                        if 'layer' in value_relation:
-                            thread.vr_missing.add(value_relation['layer'])
-                        thread.message = f"ValueRelation for {thread.vr_errors} switched to ValueMap because " \
-                                         f"layers {thread.vr_missing} are not present on QGIS project"
-                    use_vr = False
-
-        if not use_vr:
-            # Manage new values in ValueMap
-            if field['widgettype'] == 'combo':
-                if 'comboIds' in field:
-                    # Set values
-                    for i in range(0, len(field['comboIds'])):
-                        valuemap_values[field['comboNames'][i]] = field['comboIds'][i]
-                # Set values into valueMap
-                editor_widget_setup = QgsEditorWidgetSetup('ValueMap', {'map': valuemap_values})
-                layer.setEditorWidgetSetup(field_index, editor_widget_setup)
-            elif field['widgettype'] == 'check':
-                config = {'CheckedState': 'true', 'UncheckedState': 'false'}
-                editor_widget_setup = QgsEditorWidgetSetup('CheckBox', config)
-                layer.setEditorWidgetSetup(field_index, editor_widget_setup)
-            elif field['widgettype'] == 'datetime':
-                config = {'allow_null': True,
-                          'calendar_popup': True,
-                          'display_format': 'yyyy-MM-dd',
-                          'field_format': 'yyyy-MM-dd',
-                          'field_iso_format': False}
-                editor_widget_setup = QgsEditorWidgetSetup('DateTime', config)
-                layer.setEditorWidgetSetup(field_index, editor_widget_setup)
-            elif field['widgettype'] == 'textarea':
-                editor_widget_setup = QgsEditorWidgetSetup('TextEdit', {'IsMultiline': 'True'})
-                layer.setEditorWidgetSetup(field_index, editor_widget_setup)
-            else:
-                editor_widget_setup = QgsEditorWidgetSetup('TextEdit', {'IsMultiline': 'False'})
-                layer.setEditorWidgetSetup(field_index, editor_widget_setup)
-
-        # multiline: key comes from widgecontrol but it's used here in order to set false when key is missing
-        if field['widgettype'] == 'text':
-            if field['widgetcontrols'] and 'setMultiline' in field['widgetcontrols']:
-                editor_widget_setup = QgsEditorWidgetSetup('TextEdit',
-                                                           {'IsMultiline': field['widgetcontrols']['setMultiline']})
+                field_config['value_relation'] = value_relation
             else:
-                editor_widget_setup = QgsEditorWidgetSetup('TextEdit', {'IsMultiline': False})
-            layer.setEditorWidgetSetup(field_index, editor_widget_setup)
+                # delete old values on ValueMap
+                field_config['widget'] = ('ValueMap', {'map': {}})
+
+        fields_config.append(field_config)
+
+    return fields_config
+
+
+def set_layer_attributes_config(layer, fields_config, layer_name, thread=None):
+    """ Apply @fields_config (from get_layer_attributes_config) to @layer. It must be called from the main thread.
+        The attribute table and edit form configurations are set only once for all the fields
+    """
+
+    # Hide selected fields according table config_form_fields.hidden
+    hidden_columns = {field['columnname']: field['hidden'] for field in fields_config if 'hidden' in field}
+    if hidden_columns:
+        table_config = layer.attributeTableConfig()
+        columns = table_config.columns()
+        for column in columns:
+            if column.name in hidden_columns:
+                column.hidden = hidden_columns[column.name]
+        table_config.setColumns(columns)
+        layer.setAttributeTableConfig(table_config)
+
+    form_config = layer.editFormConfig()
+    for field in fields_config:
+
+        # Get column index
+        field_index = layer.fields().indexFromName(field['columnname'])
+
+        # Set alias column
+        if field['label']:
+            layer.setFieldAlias(field_index, field['label'])
+
+        for constraint, strength in field['constraints']:
+            layer.setFieldConstraint(field_index, constraint, strength)
+
+        # Set field editability
+        if field['readonly'] is not None:
+            form_config.setReadOnly(field_index, field['readonly'])
+
+        editor_widget_setup = None
+        value_relation = field['value_relation']
+        if value_relation:
+            try:
+                vr_layer = value_relation['layer']
+                vr_layer = tools_qgis.get_layer_by_tablename(vr_layer).id()  # Get layer id
+                vr_key_column = value_relation['keyColumn']  # Get 'Key'
+                vr_value_column = value_relation['valueColumn']  # Get 'Value'
+                vr_allow_nullvalue = value_relation['nullValue']  # Get null values
+                vr_filter_expression = value_relation['filterExpression']  # Get 'FilterExpression'
+                if vr_filter_expression is None:
+                    vr_filter_expression = ''
+
+                # Create ValueRelation config
+                editor_widget_setup = QgsEditorWidgetSetup('ValueRelation', {'Layer': f'{vr_layer}',
+                                                                             'Key': f'{vr_key_column}',
+                                                                             'Value': f'{vr_value_column}',
+                                                                             'AllowNull': f'{vr_allow_nullvalue}',
+                                                                             'FilterExpression': f'{vr_filter_expression}'})
+            except Exception as e:
+                if thread:
+                    thread.exception = e
+                    thread.vr_errors.add(layer_name)
+                    if 'layer' in value_relation:
+                        thread.vr_missing.add(value_relation['layer'])
+                    thread.message = f"ValueRelation for {thread.vr_errors} switched to ValueMap because " \
+                                     f"layers {thread.vr_missing} are not present on QGIS project"
+
+        if editor_widget_setup is None:
+            editor_widget_setup = QgsEditorWidgetSetup(*field['widget'])
+        layer.setEditorWidgetSetup(field_index, editor_widget_setup)
+
+    layer.setEditFormConfig(form_config)
 
 
 def load_missing_layers(filter, group="GW Layers", sub_group=None):
@@ -1171,12 +1273,15 @@ def set_tabs_enabled(dialog):
         tools_qt.set_widget_text(dialog, btn_accept, 'Close')
 
 
-def set_style_mapzones():
-    """ Puts the received styles, in the received layers in the json sent by the gw_fct_getstylemapzones function """
+def set_style_mapzones(json_return=None):
+    """ Puts the received styles, in the received layers in the json sent by the gw_fct_getstylemapzones function
+        :param json_return: Response of gw_fct_getstylemapzones if it has already been called (json)
+    """
 
-    extras = f'"mapzones":""'
-    body = create_body(extras=extras)
-    json_return = execute_procedure('gw_fct_getstylemapzones', body)
+    if json_return is None:
+        extras = f'"mapzones":""'
+        body = create_body(extras=extras)
+        json_return = execute_procedure('gw_fct_getstylemapzones', body)
     if not json_return or json_return['status'] == 'Failed':
         return False
 
@@ -1250,8 +1355,10 @@ def set_style_mapzones():
         lyr.triggerRepaint()
 
 
-def manage_feature_cat():
-    """ Manage records from table 'cat_feature' """
+def manage_feature_cat(result=None):
+    """ Manage records from table 'cat_feature'
+        :param result: Response of gw_fct_getcatfeaturevalues if it has already been called (json)
+    """
 
     # Dictionary to keep every record of table 'cat_feature'
     # Key: field tablename
@@ -1259,7 +1366,8 @@ def manage_feature_cat():
     feature_cat = {}
 
     body = create_body()
-    result = execute_procedure('gw_fct_getcatfeaturevalues', body)
+    if not result:
+        result = execute_procedure('gw_fct_getcatfeaturevalues', body)
     # If result ara none, probably the conection has broken so try again
     if not result:
         result = execute_procedure('gw_fct_getcatfeaturevalues', body)
@@ -2226,6 +2334,87 @@ def get_actions_from_json(json_result, sql):
         tools_qt.manage_exception(None, f"{type(e).__name__}: {e}", sql, lib_vars.schema_name)
 
 
+def copy_rows(tablename, rows, schema_name=None, commit=True, aux_conn=None, batch_size=10000):
+    """ Bulk load rows into @tablename using PostgreSQL 'COPY FROM STDIN'
+    :param tablename: Name of the table to fill (text)
+    :param rows: Iterable of rows, each one a dict {column name: value}. None values are loaded as NULL (iterable)
+    :param schema_name: Schema of the table. None: schema of the project, '': the one found through the search_path
+    :param commit: Commit after every batch of rows (bool)
+    :param aux_conn: Auxiliar connection to database used by threads (psycopg2.connection)
+    :param batch_size: Number of rows sent with every COPY command (int)
+    :return: Number of rows loaded, None if failed (int)
+    On error the failed batch is undone through a savepoint: the transaction of the caller is not rolled back
+    """
+
+    if schema_name is None:
+        schema_name = lib_vars.schema_name
+    if schema_name:
+        tablename = f"{schema_name}.{tablename}"
+
+    conn = aux_conn if aux_conn else tools_db.dao.conn
+    total = 0
+    batch = []
+    cursor = None
+    # Savepoints only exist inside a transaction block
+    use_savepoint = not getattr(conn, 'autocommit', False)
+    try:
+        cursor = conn.cursor()
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                total += _copy_batch(cursor, tablename, batch, use_savepoint)
+                if commit:
+                    conn.commit()
+                batch = []
+        if batch:
+            total += _copy_batch(cursor, tablename, batch, use_savepoint)
+            if commit:
+                conn.commit()
+    except Exception as e:
+        tools_log.log_warning(f"copy_rows exception [{type(e).__name__}]: {e}")
+        lib_vars.session_vars['last_error'] = e
+        return None
+    finally:
+        if cursor is not None and not cursor.closed:
+            cursor.close()
+
+    return total
+
+
+def _copy_batch(cursor, tablename, batch, use_savepoint=False):
+    """ Send @batch rows with one COPY command in text format. Columns are the union of the keys of all rows.
+        With @use_savepoint, the COPY is preceded by savepoint 'gw_copy_rows' to undo it on error """
+
+    columns = list(OrderedDict.fromkeys(column for row in batch for column in row))
+    buffer = io.StringIO()
+    for row in batch:
+        values = []
+        for column in columns:
+            value = row.get(column)
+            if value is None:
+                values.append("\\N")
+            else:
+                values.append(str(value).replace("\\", "\\\\").replace("\t", "\\t")
+                              .replace("\n", "\\n").replace("\r", "\\r"))
+        buffer.write("\t".join(values) + "\n")
+    buffer.seek(0)
+
+    sql = f"COPY {tablename} ({', '.join(columns)}) FROM STDIN"
+    if not use_savepoint:
+        cursor.copy_expert(sql, buffer)
+        return len(batch)
+
+    cursor.execute("SAVEPOINT gw_copy_rows")
+    try:
+        cursor.copy_expert(sql, buffer)
+    except Exception:
+        cursor.execute("ROLLBACK TO SAVEPOINT gw_copy_rows")
+        raise
+    cursor.execute("RELEASE SAVEPOINT gw_copy_rows")
+
+    return len(batch)
+
+
 def exec_pg_function(function_name, parameters=None, commit=True, schema_name=None, log_sql=False, rubber_band=None,
         aux_conn=None, is_thread=False, check_function=True):
     """ Manage execution of database function @function_name
@@ -2279,27 +2468,15 @@ def execute_procedure(function_name, parameters=None, schema_name=None, commit=T
     """
 
     # Check if function exists
-    if check_function:
-        row = tools_db.check_function(function_name, schema_name, commit, aux_conn=aux_conn)
-        if row in (None, ''):
-            tools_qgis.show_warning("Function not found in database", parameter=function_name)
-            return None
+    if check_function and not _check_function_cached(function_name, schema_name, commit, aux_conn):
+        tools_qgis.show_warning("Function not found in database", parameter=function_name)
+        return None
 
     # Manage schema_name and parameters
-    if schema_name:
-        sql = f"SELECT {schema_name}.{function_name}("
-    elif schema_name is None and lib_vars.schema_name:
-        sql = f"SELECT {lib_vars.schema_name}.{function_name}("
-    else:
-        sql = f"SELECT {function_name}("
-    if parameters:
-        sql += f"{parameters}"
-    sql += f");"
+    sql = f"SELECT {_get_procedure_call(function_name, parameters, schema_name)};"
 
     # Get log_sql for developers
-    dev_log_sql = get_config_parser('log', 'log_sql', "user", "init", False)
-    if dev_log_sql in ("True", "False"):
-        log_sql = tools_os.set_boolean(dev_log_sql)
+    log_sql = _get_dev_log_sql(log_sql)
 
     # Execute database function
     row = tools_db.get_row(sql, commit=commit, log_sql=log_sql, aux_conn=aux_conn)
@@ -2308,31 +2485,53 @@ def execute_procedure(function_name, parameters=None, schema_name=None, commit=T
         tools_log.log_warning(sql)
         return None
 
-    # Get json result
-    json_result = row[0]
-    if log_sql:
-        tools_log.log_db(json_result, header="SERVER RESPONSE")
+    return _manage_procedure_result(row[0], sql, log_sql, rubber_band, is_thread)
 
-    # All functions called from python should return 'status', if not, something has probably failed in postrgres
-    if 'status' not in json_result:
-        manage_json_exception(json_result, sql)
-        return False
 
-    # If failed, manage exception
-    if json_result.get('status') == 'Failed':
-        manage_json_exception(json_result, sql, is_thread=is_thread)
-        return json_result
+def execute_procedures(calls, schema_name=None, commit=True, log_sql=True, aux_conn=None, is_thread=False,
+        check_function=True, retry_single=False):
+    """ Execute several independent database functions in one round trip ('SELECT f1(...), f2(...), ...')
+        The calls run in a single statement: if one of the functions raises an error the whole batch fails
+        and the response of every function is None, unless @retry_single is set
+    :param calls: List of tuples (function_name, parameters). Functions must not depend on the result of each other
+    :param retry_single: If the batch fails, execute the functions again one by one, so that only the response
+        of the failing ones is None
+    :return: List with the response of every function, in the same order as @calls (list of json)
+    """
 
-    try:
-        if json_result["body"]["feature"]["geometry"] and lib_vars.data_epsg != lib_vars.project_epsg:
-            json_result = manage_json_geometry(json_result)
-    except Exception:
-        pass
+    results = [None] * len(calls)
+    columns = []
+    indexes = []
+    for i, (function_name, parameters) in enumerate(calls):
+        if check_function and not _check_function_cached(function_name, schema_name, commit, aux_conn):
+            tools_qgis.show_warning("Function not found in database", parameter=function_name)
+            continue
+        columns.append(_get_procedure_call(function_name, parameters, schema_name))
+        indexes.append(i)
 
-    if not is_thread:
-        manage_json_response(json_result, sql, rubber_band)
+    if not columns:
+        return results
 
-    return json_result
+    sql = f"SELECT {', '.join(columns)};"
+    log_sql = _get_dev_log_sql(log_sql)
+    row = tools_db.get_row(sql, commit=commit, log_sql=log_sql, aux_conn=aux_conn)
+    if not row:
+        tools_log.log_warning(f"Function error: {', '.join(calls[i][0] for i in indexes)}")
+        tools_log.log_warning(sql)
+        if retry_single:
+            for i in indexes:
+                function_name, parameters = calls[i]
+                results[i] = execute_procedure(function_name, parameters, schema_name, commit, log_sql,
+                                               aux_conn=aux_conn, is_thread=is_thread, check_function=False)
+        return results
+
+    for i, column, json_result in zip(indexes, columns, row):
+        if not json_result:
+            tools_log.log_warning(f"Function error: {calls[i][0]}")
+            continue
+        results[i] = _manage_procedure_result(json_result, f"SELECT {column};", log_sql, None, is_thread)
+
+    return results
 
 
 def manage_json_geometry(json_result):
@@ -2659,22 +2858,35 @@ def get_layers_from_feature_type(feature_type):
     """ Get layers of the group @feature_type """
 
     list_items = []
-    sql = (f"SELECT child_layer "
-           f"FROM cat_feature "
-           f"WHERE upper(feature_type) = '{feature_type.upper()}' "
-           f"UNION SELECT DISTINCT parent_layer "
-           f"FROM cat_feature "
-           f"WHERE upper(feature_type) = '{feature_type.upper()}';")
-    rows = tools_db.get_rows(sql)
-    if rows:
-        for row in rows:
-            layer = tools_qgis.get_layer_by_tablename(row[0])
-            if layer:
-                list_items.append(layer)
+    for tablename in get_metadata_cache().get_feature_layers(feature_type):
+        layer = tools_qgis.get_layer_by_tablename(tablename)
+        if layer:
+            list_items.append(layer)
 
     return list_items
 
 
+def get_user_roles():
+    """ Get the names of all the roles current_user is member of (directly or through other roles).
+        They are read in one query and stored for the whole session
+    """
+
+    if global_vars.user_roles is None:
+        sql = "SELECT rolname FROM pg_roles WHERE pg_has_role(current_user, oid, 'member')"
+        rows = tools_db.get_rows(sql)
+        if rows is None:
+            return set()
+        global_vars.user_roles = {row[0] for row in rows}
+
+    return global_vars.user_roles
+
+
+def check_role_user(role_name):
+    """ Check if current_user is member of role @role_name """
+
+    return role_name in get_user_roles()
+
+
 def get_role_permissions(qgis_project_role):
 
     role_master = False
@@ -2683,17 +2895,17 @@ def get_role_permissions(qgis_project_role):
     role_epa = False
     role_basic = False
 
-    role_admin = tools_db.check_role_user("role_admin")
+    role_admin = check_role_user("role_admin")
     if not role_admin:
-        role_master = tools_db.check_role_user("role_master")
+        role_master = check_role_user("role_master")
         if not role_master:
-            role_epa = tools_db.check_role_user("role_epa")
+            role_epa = check_role_user("role_epa")
             if not role_epa:
-                role_edit = tools_db.check_role_user("role_edit")
+                role_edit = check_role_user("role_edit")
                 if not role_edit:
-                    role_om = tools_db.check_role_user("role_om")
+                    role_om = check_role_user("role_om")
                     if not role_om:
-                        role_basic = tools_db.check_role_user("role_basic")
+                        role_basic = check_role_user("role_basic")
 
     if role_basic or qgis_project_role == 'role_basic':
         return 'role_basic'
@@ -2714,7 +2926,8 @@ def get_role_permissions(qgis_project_role):
 def get_config_value(parameter='', columns='value', table='config_param_user', sql_added=None, log_info=True):
 
     tools_db.check_db_connection()
-    if not tools_db.check_table(table):
+    metadata_cache = get_metadata_cache()
+    if not metadata_cache.check_table(table):
         tools_log.log_warning(f"Table not found: {table}")
         return None
 
@@ -2724,6 +2937,12 @@ def get_config_value(parameter='', columns='value', table='config_param_user', s
     if table == 'config_param_user':
         sql += " AND cur_user = current_user"
     sql += ";"
+
+    # Values of config_param_system are cached until the schema is updated or they are changed with gw_fct_setconfig
+    if table == 'config_param_system':
+        return metadata_cache.get_config_value(parameter, columns, sql_added,
+                                               partial(tools_db.get_row, sql, log_info=log_info))
+
     row = tools_db.get_row(sql, log_info=log_info)
     return row
 
@@ -3757,6 +3976,8 @@ def user_params_to_userconfig():
 def recreate_config_files():
     filenames = ['init', 'session']
 
+    flush_config_parsers()
+
     for filename in filenames:
         filepath = f"{lib_vars.user_folder_dir}{os.sep}core{os.sep}config{os.sep}{filename}.config"
         if os.path.exists(filepath):
@@ -3778,6 +3999,7 @@ def remove_deprecated_config_vars():
     if lib_vars.user_folder_dir is None:
         return
 
+    flush_config_parsers()
     init_parser = configparser.ConfigParser(comment_prefixes=";", allow_no_value=True, strict=False)
     session_parser = configparser.ConfigParser(comment_prefixes=";", allow_no_value=True, strict=False)
     path_folder = os.path.join(tools_os.get_datadir(), lib_vars.user_folder_dir)
@@ -3975,6 +4197,37 @@ def get_vertex_flag(default_value):
     return vertex_flag
 
 
+def get_epa_software(project_type=None):
+    """ Get the path of the EPA software (EPANET for ws, SWMM for ud) used by Go2Epa.
+        A locally installed engine set in 'epanet_path' or 'swmm_path' of [btn_go2epa] (init.config) has priority
+        over the executable bundled with the plugin, which only runs on Windows. It can also be a command in the PATH.
+        If it's not found, the bundled executable is used
+    """
+
+    if project_type is None:
+        project_type = global_vars.project_type
+
+    if project_type == 'ws':
+        parameter = 'epanet_path'
+        opener = f"{lib_vars.plugin_dir}{os.sep}resources{os.sep}epa{os.sep}epanet{os.sep}epanet.exe"
+    elif project_type == 'ud':
+        parameter = 'swmm_path'
+        opener = f"{lib_vars.plugin_dir}{os.sep}resources{os.sep}epa{os.sep}swmm{os.sep}swmm5.exe"
+    else:
+        return None
+
+    local_opener = get_config_parser('btn_go2epa', parameter, "user", "init", prefix=False)
+    if local_opener:
+        local_opener = shutil.which(local_opener) or local_opener
+        if os.path.exists(local_opener):
+            return local_opener
+        tools_log.log_warning(f"EPA software not found: {local_opener}")
+    if 'nt' in sys.builtin_module_names and os.path.exists(opener):
+        return opener
+
+    return None
+
+
 def get_sysversion_addparam():
     """ Gets addparam field from table sys_version """
 
@@ -4011,6 +4264,7 @@ def reset_position_dialog(show_message=False, plugin='core', file_name='session'
     """ Reset position dialog x/y """
 
     try:
+        flush_config_parsers()
         parser = configparser.ConfigParser(comment_prefixes=';', allow_no_value=True, strict=False)
         config_folder = f"{lib_vars.user_folder_dir}{os.sep}{plugin}{os.sep}config"
 
@@ -4066,6 +4320,146 @@ def _delete_feature_psector(dialog, feature_type, list_id, state=None):
     tools_db.execute_sql(sql)
 
 
+def _check_function_cached(function_name, schema_name=None, commit=True, aux_conn=None):
+    """ Check if database function exists. Existing functions are remembered for the whole session """
+
+    key = (schema_name or lib_vars.schema_name, function_name)
+    if key in global_vars.checked_functions:
+        return True
+
+    row = tools_db.check_function(function_name, schema_name, commit, aux_conn=aux_conn)
+    if row in (None, ''):
+        return False
+
+    global_vars.checked_functions.add(key)
+    return True
+
+
+def _get_procedure_call(function_name, parameters=None, schema_name=None):
+    """ Get the call of @function_name qualified with the schema, without 'SELECT' """
+
+    if schema_name:
+        call = f"{schema_name}.{function_name}("
+    elif schema_name is None and lib_vars.schema_name:
+        call = f"{lib_vars.schema_name}.{function_name}("
+    else:
+        call = f"{function_name}("
+    if parameters:
+        call += f"{parameters}"
+    call += f")"
+
+    return call
+
+
+def _get_dev_log_sql(log_sql):
+    """ Get log_sql for developers """
+
+    dev_log_sql = get_config_parser('log', 'log_sql', "user", "init", False)
+    if dev_log_sql in ("True", "False"):
+        log_sql = tools_os.set_boolean(dev_log_sql)
+
+    return log_sql
+
+
+def _manage_procedure_result(json_result, sql, log_sql, rubber_band=None, is_thread=False):
+    """ Manage the json result of a database function called by execute_procedure """
+
+    if log_sql:
+        tools_log.log_db(json_result, header="SERVER RESPONSE")
+
+    # All functions called from python should return 'status', if not, something has probably failed in postrgres
+    if 'status' not in json_result:
+        manage_json_exception(json_result, sql)
+        return False
+
+    # If failed, manage exception
+    if json_result.get('status') == 'Failed':
+        manage_json_exception(json_result, sql, is_thread=is_thread)
+        return json_result
+
+    try:
+        if json_result["body"]["feature"]["geometry"] and lib_vars.data_epsg != lib_vars.project_epsg:
+            json_result = manage_json_geometry(json_result)
+    except Exception:
+        pass
+
+    if not is_thread:
+        manage_json_response(json_result, sql, rubber_band)
+
+    return json_result
+
+
+def _load_network_graph():
+    """ Start the task that builds the network graph from layer 'v_edit_arc' """
+
+    task = global_vars.network_graph_task
+    try:
+        if task is not None and task.isActive():
+            return
+    except RuntimeError:
+        pass
+
+    layer_arc = tools_qgis.get_layer_by_tablename('v_edit_arc')
+    if layer_arc is None:
+        return
+
+    task = GwNetworkGraphLoad("Load network graph", layer_arc, global_vars.project_type)
+    task.graph_loaded.connect(partial(_set_network_graph, layer_arc))
+    global_vars.network_graph_task = task
+    QgsApplication.taskManager().addTask(task)
+
+
+def _set_network_graph(layer_arc, graph):
+    """ Set the graph loaded and keep it updated with the edits of @layer_arc """
+
+    global_vars.network_graph = graph
+    global_vars.network_graph_task = None
+    disconnect_signal('network_graph')
+    connect_signal(layer_arc.committedFeaturesAdded, partial(_update_network_graph, layer_arc),
+                   'network_graph', 'layer_arc_committedFeaturesAdded_update_network_graph')
+    connect_signal(layer_arc.committedAttributeValuesChanges, partial(_update_network_graph, layer_arc),
+                   'network_graph', 'layer_arc_committedAttributeValuesChanges_update_network_graph')
+    connect_signal(layer_arc.committedGeometriesChanges, partial(_update_network_graph, layer_arc),
+                   'network_graph', 'layer_arc_committedGeometriesChanges_update_network_graph')
+    connect_signal(layer_arc.committedFeaturesRemoved, _remove_network_graph_arcs,
+                   'network_graph', 'layer_arc_committedFeaturesRemoved_remove_network_graph_arcs')
+
+    # Valves of the graph are read from the nodes: any edit of them makes the graph stale
+    if global_vars.project_type != 'ws':
+        return
+    for layer in tools_qgis.get_project_layers():
+        table_name = tools_qgis.get_layer_source_table_name(layer)
+        if table_name is None or not (table_name == 'v_edit_node' or table_name.startswith('ve_node')):
+            continue
+        for signal in ('committedFeaturesAdded', 'committedAttributeValuesChanges', 'committedFeaturesRemoved'):
+            connect_signal(getattr(layer, signal), lambda *args: invalidate_network_graph(),
+                           'network_graph', f'{layer.id()}_{signal}_invalidate_network_graph')
+
+
+def _update_network_graph(layer_arc, layer_id, changes):
+    """ Read again the arcs committed in @layer_arc and update them in the network graph.
+        Nodes are set by the database, so they are read from the layer after the commit
+    """
+
+    graph = global_vars.network_graph
+    if graph is None:
+        return
+
+    # committedFeaturesAdded sends a list of features, the other signals a dict {fid: changes}
+    fids = [feature.id() for feature in changes] if isinstance(changes, list) else list(changes.keys())
+    request = QgsFeatureRequest().setFilterFids(fids).setFlags(QgsFeatureRequest.NoGeometry)
+    for feature in layer_arc.getFeatures(request):
+        # NULL values of the layer are falsy
+        graph.update_arc(feature['arc_id'], feature['node_1'] or None, feature['node_2'] or None, feature.id())
+
+
+def _remove_network_graph_arcs(layer_id, fids):
+
+    graph = global_vars.network_graph
+    if graph is not None:
+        graph.remove_fids(fids)
+
+
 def _check_user_params(section, parameter, file_name, prefix=False):
     """ Check if a parameter exists in the config/user_params.config
         If it doesn't exist, it creates it and assigns 'None' as a default value
@@ -4078,17 +4472,40 @@ def _check_user_params(section, parameter, file_name, prefix=False):
     if prefix and global_vars.project_type is not None:
         parameter = f"_{parameter}"
 
+    # Parameters already registered as missing are not looked up again
+    if (f"{file_name}.{section}", parameter) in global_vars.user_params_missing:
+        return
+
     # Get the value of the parameter (the one get_config_parser is looking for) in the inventory
     check_value = get_config_parser(f"{file_name}.{section}", parameter, "project", "user_params", False,
                                     get_comment=True, chk_user_params=False)
-    # If it doesn't exist in the inventory, add it with "None" as value
+    # If it doesn't exist in the inventory, register it. It will be added with "None" as value by _merge_user_params
     if check_value is None:
-        set_config_parser(f"{file_name}.{section}", parameter, None, "project", "user_params", prefix=False,
-                          chk_user_params=False)
+        global_vars.user_params_missing.add((f"{file_name}.{section}", parameter))
     else:
         return check_value
 
 
+def _merge_user_params():
+    """ Add the parameters registered by _check_user_params to the inventory config/user_params.config """
+
+    if not global_vars.user_params_missing:
+        return
+
+    missing = global_vars.user_params_missing
+    global_vars.user_params_missing = set()
+    for section, parameter in sorted(missing):
+        set_config_parser(section, parameter, None, "project", "user_params", prefix=False, chk_user_params=False)
+
+
+def _get_config_store():
+    """ Get the store of configuration files parsers of the session, creating it the first time """
+
+    if global_vars.config_store is None:
+        global_vars.config_store = GwConfigStore()
+    return global_vars.config_store
+
+
 def _get_parser_from_filename(filename):
     """ Get parser of file @filename.config """
 
@@ -4101,14 +4518,13 @@ def _get_parser_from_filename(filename):
     else:
         return None, None
 
-    parser = configparser.ConfigParser(comment_prefixes=";", allow_no_value=True, strict=False)
     filepath = f"{folder}{os.sep}config{os.sep}{filename}.config"
     if not os.path.exists(filepath):
         tools_log.log_warning(f"File not found: {filepath}")
         return filepath, None
 
     try:
-        parser.read(filepath)
+        parser = _get_config_store().get_parser(filepath, reload=True)
     except (configparser.DuplicateSectionError, configparser.DuplicateOptionError, configparser.ParsingError) as e:
         tools_qgis.show_critical(f"Error parsing file: {filepath}", parameter=e)
         return filepath, None
@@ -30,6 +30,9 @@ configs['session'] = [None, None]       # Session configuration file: session.co
 configs['dev'] = [None, None]           # Developer configuration file: dev.config (located in plugin config folder)
 configs['giswater'] = [None, None]      # Plugin configuration file: giswater.config (located in plugin config folder)
 configs['user_params'] = [None, None]   # Settings configuration file: user_params.config (plugin config folder)
+config_store = None                     # Instance of class GwConfigStore. Keeps the parsers of the configuration files in memory
+startup_profiler = None                 # Instance of class GwStartupProfiler. Records the load times when option 'startup_profiler' is enabled
+user_params_missing = set()             # Set of (section, parameter) not found in user_params.config, added to it by tools_gw.flush_config_parsers
 project_type = None                     # Project type get from table "sys_version"
 signal_manager = None                   # Instance of class GwSignalManager. Found in "/core/utils/signal_manager.py"
 giswater_settings = None                # Instance of class QSettings. QGIS settings related to Giswater variables such as toolbars and checkable actions
@@ -41,6 +44,11 @@ load_project_menu = None
 # region global user variables (values are initialized on load project without changes during session)
 shortcut_keys = []                      # An instance of used shortcut_keys for Giswater menu. This keys are configurated on file "init.config" from user config path "/user/AppData/Roaming/Giswater/"
 feature_cat = None                      # Dictionary to keep every record of table 'cat_feature'. Stored here to avoid executing gw_fct_getcatfeaturevalues multiple times
+checked_functions = set()               # Set of (schema_name, function_name) known to exist. Stored here to avoid checking them before every call of execute_procedure
+user_roles = None                       # Set of roles of the current user. Stored here to avoid one query for every role check
+metadata_cache = None                   # Instance of class GwMetadataCache. Tables sys_style, sys_table, cat_feature and config_param_system read once per project load
+network_graph = None                    # Instance of class GwNetworkGraph. Arcs and valves of the network loaded in background, used to preview network analysis
+network_graph_task = None               # Instance of class GwNetworkGraphLoad while the network graph is being loaded
 # endregion
 
 
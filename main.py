@@ -19,7 +19,7 @@ from .core.admin.admin_btn import GwAdminButton
 from .core.load_project import GwLoadProject
 from .core.utils import tools_gw
 from .core.utils.signal_manager import GwSignalManager
-from .libs import lib_vars, tools_qgis, tools_os, tools_log
+from .libs import lib_vars, tools_qgis, tools_os, tools_log, tools_db
 from .core.ui.dialog import GwDialog
 from .core.ui.main_window import GwMainWindow
 
@@ -46,7 +46,11 @@ class Giswater(QObject):
         """ Create the menu entries and toolbar icons inside the QGIS GUI """
 
         # Initialize plugin
-        if self._init_plugin():
+        profiler = tools_gw.get_startup_profiler()
+        profiler.start(tools_db)
+        with profiler.phase("initGui: init plugin"):
+            initialized = self._init_plugin()
+        if initialized:
             # Force project read (to work with PluginReloader)
             self._project_read(False, False)
 
@@ -119,6 +123,12 @@ class Giswater(QObject):
         except Exception as e:
             tools_log.log_info(f"Exception in unload when self._unset_toc_buttons(): {e}")
 
+        try:
+            # Write pending changes of the configuration files
+            tools_gw.flush_config_parsers()
+        except Exception as e:
+            tools_log.log_info(f"Exception in unload when tools_gw.flush_config_parsers(): {e}")
+
         try:
             # Remove file handler when reloading
             if hide_gw_button:
@@ -234,6 +244,11 @@ class Giswater(QObject):
         if python_enable_console == 'TRUE':
             tools_qgis.enable_python_console()
 
+        # Enable startup profiler if parameter 'startup_profiler' = True (imports are only recorded from giswater.config)
+        startup_profiler = tools_gw.get_config_parser('log', 'startup_profiler', 'user', 'init', False)
+        if tools_os.set_boolean(startup_profiler, False):
+            tools_gw.get_startup_profiler().enabled = True
+
         # Set init parameter 'exec_procedure_max_retries'
         try:
             global_vars.exec_procedure_max_retries = int(tools_gw.get_config_parser('system', 'exec_procedure_max_retries', 'user', 'init', False))
@@ -383,8 +398,14 @@ class Giswater(QObject):
             lib_vars.logger.add_file_handler()
 
         # Create class to manage code that performs project configuration
+        profiler = tools_gw.get_startup_profiler()
+        profiler.start(tools_db)
         self.load_project = GwLoadProject()
-        self.load_project.project_read(show_warning, self)
+        with profiler.phase("Project read"):
+            self.load_project.project_read(show_warning, self)
+        if self.load_project.startup_timer:
+            profiler.add_phases(self.load_project.startup_timer)
+        tools_gw.save_startup_profile()
 
 
     def save_project(self):
@@ -0,0 +1,236 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+"""
+Benchmark of GwProfileRenderer against the previous implementation of GwProfileButton._draw_profile
+(Decimal coordinates and one pyplot call for every segment and text), read from git history.
+It doesn't need QGIS, run it with: python test/benchmark_profile_renderer.py [--revision REV] [number_of_nodes ...]
+"""
+import argparse
+import ast
+import importlib.util
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def _load_renderer_module():
+
+    path = os.path.join(_REPO_DIR, 'core', 'utils', 'profile_renderer.py')
+    spec = importlib.util.spec_from_file_location('profile_renderer', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _get_stylesheet():
+
+    line = {'color': '#000000', 'style': 'solid', 'width': 1.0}
+    return {'infra': {'real': {'color': '#000000', 'style': 'solid', 'width': 1.5},
+                      'interpolated': {'color': '#808080', 'style': 'dashed', 'width': 1.0}},
+            'guitar': {'lines': line, 'auxiliarlines': {'color': '#808080', 'style': 'solid', 'width': 0.5},
+                       'text': {'color': '#000000', 'weight': 'normal'}},
+            'grid': {'lines': {'color': '#d3d3d3', 'style': 'solid', 'width': 0.5}, 'boundary': line,
+                     'text': {'color': '#000000', 'weight': 'normal'}},
+            'terrain': {'color': '#008000', 'style': 'dashdot', 'width': 1.0},
+            'title': {'text': {'color': '#000000', 'weight': 'bold', 'size': 12}}}
+
+
+def _create_profile(count):
+    """ Data of gw_fct_getprofilevalues for a sewer profile of @count nodes """
+
+    random.seed(count)
+    nodes = []
+    arcs = []
+    terrains = []
+    total_x = 0.0
+    top_elev = 100.0
+    for i in range(count):
+        ymax = round(random.uniform(1.5, 4), 2)
+        elev = round(top_elev - ymax, 2)
+        data_type = 'INTERPOLATED' if i % 7 == 3 else 'REAL'
+        descript = {'top_elev': top_elev, 'ymax': ymax, 'elev': elev, 'code': f'N{i}',
+                    'total_distance': round(total_x, 2)}
+        nodes.append({'node_id': str(i), 'top_elev': top_elev, 'ymax': ymax, 'elev': elev, 'cat_geom1': 1.0,
+                      'descript': json.dumps(descript), 'data_type': data_type, 'surface_type': 'TOP'})
+        terrains.append({'total_x': total_x, 'top_n1': top_elev, 'top_n2': top_elev,
+                         'label_n1': json.dumps(descript), 'surface_type': 'NODE'})
+        if i == count - 1:
+            break
+
+        length = round(random.uniform(20, 60), 2)
+        next_top_elev = round(top_elev - random.uniform(0, 0.5), 2)
+        y1 = round(random.uniform(0, 0.3), 2)
+        y2 = round(random.uniform(0, 0.3), 2)
+        arcs.append({'arc_id': str(i), 'node_1': str(i), 'node_2': str(i + 1), 'length': length, 'z1': y1, 'z2': y2,
+                     'cat_geom1': 0.6, 'elev1': round(elev + y1, 2), 'elev2': round(elev + y2, 2), 'y1': y1,
+                     'y2': y2, 'descript': json.dumps({'catalog': 'PVC400', 'dimensions': f'{length}m / 0.5%'})})
+
+        # Vnode of a link in the middle of the arc
+        if i % 3 == 0:
+            vnode_x = round(total_x + length / 2, 2)
+            vnode_elev = round((top_elev + next_top_elev) / 2, 2)
+            label = {'top_elev': vnode_elev, 'ymax': 2.0, 'elev': round(vnode_elev - 2, 2), 'code': f'V{i}',
+                     'total_distance': vnode_x}
+            terrains.append({'total_x': vnode_x, 'top_n1': top_elev, 'top_n2': vnode_elev,
+                             'label_n1': json.dumps(label), 'surface_type': 'VNODE'})
+            terrains[-2]['top_n2'] = vnode_elev
+        terrains[-1]['top_n2'] = next_top_elev
+
+        total_x += length
+        top_elev = next_top_elev
+
+    legend = {'catalog': 'CATALOG', 'dimensions': 'DIMENSIONS', 'ordinates': 'ORDINATES', 'topelev': 'TOP ELEV',
+              'ymax': 'YMAX', 'elev': 'ELEV', 'distance': 'DISTANCE', 'code': 'CODE',
+              'referencePlane': 'REFERENCE'}
+    return {'node': nodes, 'arc': arcs, 'terrain': terrains, 'stylesheet': _get_stylesheet(), 'legend': legend}
+
+
+# Methods of GwProfileButton that draw the profile in the previous implementation
+_LEGACY_METHODS = ('_draw_profile', '_set_profile_layout', '_set_profile_variables', '_fill_profile_variables',
+                   '_draw_start_node', '_draw_guitar_vertical_lines', '_draw_guitar_auxiliar_lines',
+                   '_fill_guitar_text_legend', '_draw_nodes', '_fill_guitar_text_node', '_fill_guitar_text_terrain',
+                   '_draw_end_node', '_set_guitar_parameters', '_draw_guitar_horitzontal_lines', '_draw_grid',
+                   '_draw_terrain', '_get_stylesheet')
+
+
+class _GwLegacyTransformer(ast.NodeTransformer):
+    """ Remove the dialog and the QGIS window from the drawing methods of the previous implementation """
+
+    def visit_FunctionDef(self, node):
+
+        self.generic_visit(node)
+        if node.name == '_draw_profile':
+            # The png export after the drawing is not part of the benchmark
+            end = next(i for i, stmt in enumerate(node.body)
+                       if isinstance(stmt, ast.Assign) and ast.unparse(stmt.targets[0]) == 'self.plot')
+            node.body = node.body[:end + 1]
+        node.body = [stmt for stmt in node.body if 'set_window_title' not in ast.unparse(stmt)] or [ast.Pass()]
+        return node
+
+
+    def visit_Call(self, node):
+
+        self.generic_visit(node)
+        function_name = ast.unparse(node.func)
+        if function_name == 'tools_qt.get_text':
+            return ast.parse('self.title', mode='eval').body
+        if function_name == 'tools_qt.get_calendar_date':
+            return ast.parse('self.date', mode='eval').body
+        return node
+
+
+def _get_legacy_revision():
+    """ Parent of the commit that added GwProfileRenderer """
+
+    path = os.path.join('core', 'utils', 'profile_renderer.py')
+    commit = subprocess.check_output(['git', 'log', '--diff-filter=A', '--format=%H', '--', path],
+                                     cwd=_REPO_DIR, text=True).split()[-1]
+    return f"{commit}^"
+
+
+def _load_legacy_class(revision):
+    """ Build a class with the drawing methods of GwProfileButton at git @revision """
+
+    path = 'core/toolbars/om/profile_button.py'
+    source = subprocess.check_output(['git', 'show', f"{revision}:{path}"], cwd=_REPO_DIR, text=True)
+    module = ast.parse(source)
+    body = []
+    for node in module.body:
+        if isinstance(node, ast.ClassDef) and node.name == 'GwNodeData':
+            body.append(node)
+        elif isinstance(node, ast.ClassDef) and node.name == 'GwProfileButton':
+            methods = [item for item in node.body if isinstance(item, ast.FunctionDef) and item.name in _LEGACY_METHODS]
+            body.append(ast.ClassDef(name='GwLegacyProfile', bases=[], keywords=[], body=methods, decorator_list=[]))
+    module = ast.fix_missing_locations(_GwLegacyTransformer().visit(ast.Module(body=body, type_ignores=[])))
+
+    namespace = {'Decimal': Decimal, 'OrderedDict': OrderedDict, 'json': json, 'math': math, 'plt': plt}
+    exec(compile(module, f"{revision}:{path}", 'exec'), namespace)
+    legacy_class = namespace['GwLegacyProfile']
+
+    def __init__(self, data, title, date):
+        self.profile_json = {'body': {'data': data}}
+        self.title = title
+        self.date = date
+        self.initNode = data['node'][0]['node_id']
+        self.endNode = data['node'][-1]['node_id']
+        self.nodes = []
+        self.links = []
+        self.none_values = []
+        self.lastnode_datatype = 'REAL'
+
+    legacy_class.__init__ = __init__
+    return legacy_class
+
+
+def _draw_legacy(data, legacy_class):
+
+    plt.close('all')
+    plt.figure(1, figsize=(10.4, 4.8))
+    profile = legacy_class(data, "PROFILE", "01/01/2024")
+    profile._draw_profile(data['arc'], data['node'], data['terrain'])
+    figure = plt.gcf()
+    figure.canvas.draw()
+    return figure
+
+
+def _draw_renderer(data, renderer_class):
+
+    figure = renderer_class(data, "PROFILE", "01/01/2024").draw()
+    FigureCanvasAgg(figure).draw()
+    return figure
+
+
+def main(counts=(50, 500, 2000), revision=None):
+
+    module = _load_renderer_module()
+    legacy_class = _load_legacy_class(revision or _get_legacy_revision())
+
+    print(f"{'Nodes':>6} {'Previous (s)':>13} {'Renderer (s)':>13} {'Speedup':>8}")
+    for count in counts:
+        data = _create_profile(count)
+
+        start = time.perf_counter()
+        legacy = _draw_legacy(data, legacy_class)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        current = _draw_renderer(data, module.GwProfileRenderer)
+        current_time = time.perf_counter() - start
+
+        # Both drawings must cover the same area of the profile
+        legacy_limits = legacy.axes[0].dataLim.bounds
+        current_limits = current.axes[0].dataLim.bounds
+        if any(not math.isclose(a, b, rel_tol=1e-6, abs_tol=1e-6) for a, b in zip(legacy_limits, current_limits)):
+            print(f"ERROR: drawing limits differ from the previous implementation: "
+                  f"{legacy_limits} != {current_limits}")
+            return 1
+
+        print(f"{count:>6} {legacy_time:>13.2f} {current_time:>13.2f} {legacy_time / current_time:>7.1f}x")
+    plt.close('all')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('counts', nargs='*', type=int, default=[50, 500, 2000])
+    parser.add_argument('--revision', help="git revision of the previous implementation")
+    args = parser.parse_args()
+    sys.exit(main(args.counts, args.revision))
@@ -0,0 +1,140 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the rpt line tokenizer used by GwEpaFileManager against the previous per-line implementation.
+It doesn't need QGIS, run it with: python test/benchmark_rpt_tokenizer.py [number_of_lines]
+"""
+import importlib.util
+import os
+import random
+import re
+import sys
+import time
+
+
+def _load_tokenizer_module():
+
+    path = os.path.join(os.path.dirname(__file__), os.pardir, 'core', 'utils', 'rpt_tokenizer.py')
+    spec = importlib.util.spec_from_file_location('rpt_tokenizer', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _get_sources():
+    """ Targets similar to the ones of config_fprocess for fid 140 """
+
+    sources = {}
+    for i in range(40):
+        sources[f'Target{i} Summary'] = f'rpt_target{i}_sum'
+        sources[f'Section{i}'] = f'rpt_section{i}'
+    sources['Node Depth'] = 'rpt_nodedepth_sum'
+    sources['Link Flow'] = 'rpt_arcflow_sum'
+    return sources
+
+
+def _create_lines(count):
+
+    random.seed(0)
+    headers = ["  Node Depth Summary", "  Link Flow Summary", "  Target3 Summary", "  Section7 00:00:00"]
+    lines = []
+    for i in range(count):
+        if i % 5000 == 0:
+            lines.append(random.choice(headers) + "\n")
+        elif i % 997 == 0:
+            lines.append("  ****************************\n")
+        else:
+            lines.append(f"  J{i:<10} JUNCTION {random.random():10.3f} {random.random():10.3f} "
+                         f"{random.randint(0, 23):02d}:{random.randint(0, 59):02d} "
+                         f"{random.random() * 100:10.2f}-{random.randint(1, 9)}.{random.randint(0, 9)}\n")
+    return lines
+
+
+def _legacy_tokenize(lines, sources):
+    """ Previous implementation of GwEpaFileManager._read_rpt_file (without the json building) """
+
+    target = "null"
+    col40 = "null"
+    result = []
+    for row in lines:
+        if '**' in row or '--' in row:
+            continue
+
+        dirty_list = row.rstrip().split()
+        sp_n = []
+        for x in range(0, len(dirty_list)):
+            if bool(re.search(r'[0-9][-]\d{1,2}[.]]*', str(dirty_list[x]))):
+                last_index = 0
+                for i, c in enumerate(dirty_list[x]):
+                    if "-" == c:
+                        sp_n.append(dirty_list[x][last_index:i])
+                        last_index = i
+                sp_n.append(dirty_list[x][last_index:i])
+            elif bool(re.search(r'(\d\..*\.\d)', str(dirty_list[x]))):
+                if 'Version' not in dirty_list and 'VERSION' not in dirty_list:
+                    raise ValueError(dirty_list)
+            elif bool(re.search('>50', str(dirty_list[x]))):
+                raise ValueError(dirty_list)
+            else:
+                sp_n.append(dirty_list[x])
+
+        for k, v in sources.items():
+            try:
+                if k in (f'{sp_n[0]} {sp_n[1]}', f'{sp_n[0]}'):
+                    target = "'" + v + "'"
+                    _time = re.compile('^([012]?[0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]$')
+                    if _time.search(sp_n[3]):
+                        col40 = "'" + sp_n[3] + "'"
+            except IndexError:
+                pass
+
+        if len(sp_n) > 0:
+            result.append((target, col40, sp_n))
+    return result
+
+
+def _tokenize(lines, sources, tokenizer_class):
+
+    tokenizer = tokenizer_class(sources)
+    result = []
+    for row in lines:
+        if '**' in row or '--' in row:
+            continue
+        sp_n = tokenizer.tokenize(row)
+        if len(sp_n) > 0:
+            result.append((tokenizer.target, tokenizer.col40, sp_n))
+    return result
+
+
+def main(count=1000000):
+
+    module = _load_tokenizer_module()
+    sources = _get_sources()
+    lines = _create_lines(count)
+
+    start = time.perf_counter()
+    legacy = _legacy_tokenize(lines, sources)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = _tokenize(lines, sources, module.GwRptTokenizer)
+    current_time = time.perf_counter() - start
+
+    if legacy != current:
+        print("ERROR: tokenizer results differ from the previous implementation")
+        return 1
+
+    print(f"Lines: {count}, parsed rows: {len(current)}")
+    print(f"Previous tokenizer:   {legacy_time:8.2f} s")
+    print(f"GwRptTokenizer:       {current_time:8.2f} s")
+    print(f"Speedup:              {legacy_time / current_time:8.2f} x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000))
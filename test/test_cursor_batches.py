@@ -0,0 +1,110 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+"""
+Tests of iter_batches. It doesn't need QGIS nor a database, run it with: python -m pytest test/test_cursor_batches.py
+"""
+import importlib.util
+import os
+import unittest
+
+
+def _load_cursor_batches_module():
+
+    path = os.path.join(os.path.dirname(__file__), os.pardir, 'core', 'utils', 'cursor_batches.py')
+    spec = importlib.util.spec_from_file_location('cursor_batches', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+cursor_batches = _load_cursor_batches_module()
+
+
+class GwTestCursor:
+    """ Cursor of GwTestConnection with the rows of the connection """
+
+    def __init__(self, rows, name=None):
+
+        self.rows = rows
+        self.name = name
+        self.itersize = 2000
+        self.position = 0
+        self.closed = False
+
+
+    def execute(self, sql):
+        self.sql = sql
+
+
+    def fetchmany(self, size):
+
+        rows = self.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+
+    def close(self):
+        self.closed = True
+
+
+class GwTestConnection:
+    """ Connection that, like psycopg2, refuses named cursors in autocommit mode """
+
+    def __init__(self, rows, autocommit=False):
+
+        self.rows = rows
+        self.autocommit = autocommit
+        self.cursors = []
+
+
+    def cursor(self, name=None):
+
+        if name is not None and self.autocommit:
+            raise Exception("can't use a named cursor outside of transactions")
+        cursor = GwTestCursor(self.rows, name)
+        self.cursors.append(cursor)
+        return cursor
+
+
+class GwTestCursorBatches(unittest.TestCase):
+
+    def test_named_cursor(self):
+
+        conn = GwTestConnection([(i,) for i in range(5)])
+        batches = list(cursor_batches.iter_batches(conn, "SELECT 1", 2, name='gw_test'))
+
+        self.assertEqual(batches, [[(0,), (1,)], [(2,), (3,)], [(4,)]])
+        self.assertEqual(conn.cursors[0].name, 'gw_test')
+        self.assertEqual(conn.cursors[0].itersize, 2)
+        self.assertTrue(conn.cursors[0].closed)
+
+
+    def test_autocommit(self):
+        """ Autocommit connections can't declare a named cursor, a plain one is used """
+
+        conn = GwTestConnection([(i,) for i in range(5)], autocommit=True)
+        batches = list(cursor_batches.iter_batches(conn, "SELECT 1", 2, name='gw_test'))
+
+        self.assertEqual(batches, [[(0,), (1,)], [(2,), (3,)], [(4,)]])
+        self.assertIsNone(conn.cursors[0].name)
+        self.assertTrue(conn.cursors[0].closed)
+
+
+    def test_close(self):
+        """ The cursor is closed when the batches are not read until the end """
+
+        conn = GwTestConnection([(i,) for i in range(5)])
+        batches = cursor_batches.iter_batches(conn, "SELECT 1", 2, name='gw_test')
+        next(batches)
+        batches.close()
+
+        self.assertTrue(conn.cursors[0].closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
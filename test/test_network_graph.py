@@ -0,0 +1,87 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+"""
+Tests of GwNetworkGraph. It doesn't need QGIS, run it with: python -m pytest test/test_network_graph.py
+"""
+import importlib.util
+import os
+import unittest
+
+
+def _load_network_graph_module():
+
+    path = os.path.join(os.path.dirname(__file__), os.pardir, 'core', 'utils', 'network_graph.py')
+    spec = importlib.util.spec_from_file_location('network_graph', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+network_graph = _load_network_graph_module()
+
+
+def _create_graph(count):
+    """ Line of @count arcs: arc i goes from node i to node i + 1 and its feature id is i """
+
+    arcs = ((f'a{i}', f'n{i}', f'n{i + 1}', i) for i in range(count))
+    return network_graph.GwNetworkGraph().build(arcs)
+
+
+class GwTestNetworkGraph(unittest.TestCase):
+
+    def test_remove_fids(self):
+
+        graph = _create_graph(10)
+        graph.remove_fids([2, 5])
+
+        self.assertEqual(len(graph), 8)
+        self.assertFalse(graph.has_arc('a2'))
+        self.assertFalse(graph.has_arc('a5'))
+        self.assertEqual(sorted(graph.trace(['n0'])['fids']), [0, 1])
+
+
+    def test_remove_fids_compact(self):
+        """ Removing enough arcs to rebuild the arrays must not renumber the arcs still to remove """
+
+        graph = _create_graph(3000)
+        graph.remove_fids(range(0, 3000, 2))
+
+        self.assertEqual(len(graph), 1500)
+        self.assertFalse(graph.removed)
+        self.assertEqual(sorted(graph.arc_fids), list(range(1, 3000, 2)))
+        self.assertEqual(graph.get_arc_nodes('a1'), ('n1', 'n2'))
+        self.assertIsNone(graph.get_arc_nodes('a0'))
+
+
+    def test_update_arc(self):
+
+        graph = _create_graph(5)
+        graph.update_arc('a5', 'n5', 'n6', 5)
+        graph.update_arc('a2', 'n2', 'n9')
+
+        self.assertEqual(sorted(graph.trace(['n0'])['arcs']), ['a0', 'a1', 'a2'])
+        self.assertEqual(sorted(graph.trace(['n6'], downstream=False)['fids']), [3, 4, 5])
+
+
+    def test_get_isolation(self):
+
+        graph = _create_graph(6)
+        graph.set_valve('n1')
+        graph.set_valve('n4', closed=True)
+
+        isolation = graph.get_isolation('a2')
+        self.assertEqual(sorted(isolation['arcs']), ['a1', 'a2', 'a3'])
+        self.assertEqual(isolation['valves'], ['n1'])
+        self.assertEqual(isolation['closed_valves'], ['n4'])
+
+        isolation = graph.get_isolation('a2', unaccess=['n1'])
+        self.assertEqual(sorted(isolation['arcs']), ['a0', 'a1', 'a2', 'a3'])
+
+
+if __name__ == '__main__':
+    unittest.main()